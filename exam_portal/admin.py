@@ -6,8 +6,12 @@ from django.contrib import admin
 from django.utils.html import format_html
 from .models import (
     UserProfile, Student, ExamOfficer, Lecturer, UnitAssignment,
-    ExamApplication, OCRResult, ApplicationReview, ExamMarking, Notification
+    ExamApplication, OCRResult, OCRJob, OCRCacheEntry, StoredDocument, ArchivedDocument, NormalizedDocument,
+    DocumentPreview, ApplicationReview, ExamMarking, Notification, EmailOutbox, Report, ApplicationStatusEvent,
+    AuditEvent
 )
+from .audit import AuditedModelAdmin, record
+from .events import transition_applications
 
 
 # ============================================================================
@@ -15,7 +19,7 @@ from .models import (
 # ============================================================================
 
 @admin.register(UserProfile)
-class UserProfileAdmin(admin.ModelAdmin):
+class UserProfileAdmin(AuditedModelAdmin, admin.ModelAdmin):
     list_display = ('user', 'user_type', 'phone_number', 'created_at')
     list_filter = ('user_type', 'created_at')
     search_fields = ('user__username', 'user__email', 'phone_number')
@@ -27,7 +31,7 @@ class UserProfileAdmin(admin.ModelAdmin):
 # ============================================================================
 
 @admin.register(Student)
-class StudentAdmin(admin.ModelAdmin):
+class StudentAdmin(AuditedModelAdmin, admin.ModelAdmin):
     list_display = ('registration_number', 'full_name', 'email', 'school', 'program', 'created_at')
     list_filter = ('school', 'program', 'created_at')
     search_fields = ('registration_number', 'first_name', 'last_name', 'email')
@@ -59,7 +63,7 @@ class StudentAdmin(admin.ModelAdmin):
 # ============================================================================
 
 @admin.register(ExamOfficer)
-class ExamOfficerAdmin(admin.ModelAdmin):
+class ExamOfficerAdmin(AuditedModelAdmin, admin.ModelAdmin):
     list_display = ('officer_id', 'full_name', 'email', 'department', 'created_at')
     list_filter = ('department', 'created_at')
     search_fields = ('officer_id', 'first_name', 'last_name', 'email')
@@ -97,7 +101,7 @@ class UnitAssignmentInline(admin.TabularInline):
 
 
 @admin.register(Lecturer)
-class LecturerAdmin(admin.ModelAdmin):
+class LecturerAdmin(AuditedModelAdmin, admin.ModelAdmin):
     list_display = ('lecturer_id', 'full_name', 'email', 'department', 'unit_count', 'created_at')
     list_filter = ('department', 'created_at')
     search_fields = ('lecturer_id', 'first_name', 'last_name', 'email')
@@ -134,7 +138,7 @@ class LecturerAdmin(admin.ModelAdmin):
 # ============================================================================
 
 @admin.register(UnitAssignment)
-class UnitAssignmentAdmin(admin.ModelAdmin):
+class UnitAssignmentAdmin(AuditedModelAdmin, admin.ModelAdmin):
     list_display = ('unit_code', 'unit_name', 'lecturer_name', 'program', 'year', 'semester', 'active')
     list_filter = ('active', 'program', 'year', 'semester', 'created_at')
     search_fields = ('unit_code', 'unit_name', 'lecturer__first_name', 'lecturer__last_name')
@@ -152,7 +156,8 @@ class UnitAssignmentAdmin(admin.ModelAdmin):
 class OCRResultInline(admin.StackedInline):
     model = OCRResult
     extra = 0
-    readonly_fields = ('extracted_text', 'ocr_summary', 'confidence_score', 'keywords_found', 'processed_at')
+    readonly_fields = ('extracted_text', 'ocr_summary', 'engine_confidence', 'confidence_score',
+                      'keywords_found', 'processed_at')
     can_delete = False
 
 
@@ -171,14 +176,15 @@ class ExamMarkingInline(admin.StackedInline):
 
 
 @admin.register(ExamApplication)
-class ExamApplicationAdmin(admin.ModelAdmin):
+class ExamApplicationAdmin(AuditedModelAdmin, admin.ModelAdmin):
     list_display = ('application_id', 'student_name', 'unit_code', 'exam_type', 
                    'status_badge', 'auto_verified', 'submitted_at')
     list_filter = ('status', 'exam_type', 'auto_verified', 'year_of_study', 'semester_taken', 'submitted_at')
     search_fields = ('application_id', 'student__registration_number', 'student__first_name', 
                     'student__last_name', 'unit_code', 'unit_name')
-    readonly_fields = ('application_id', 'submitted_at', 'updated_at')
+    readonly_fields = ('application_id', 'status_changed_at', 'submitted_at', 'updated_at')
     inlines = [OCRResultInline, ApplicationReviewInline, ExamMarkingInline]
+    actions = ['mark_exam_received', 'mark_submitted_to_officer', 'mark_uploaded_to_portal']
     
     fieldsets = (
         ('Application Details', {
@@ -195,7 +201,7 @@ class ExamApplicationAdmin(admin.ModelAdmin):
             'fields': ('assigned_lecturer',)
         }),
         ('Timestamps', {
-            'fields': ('submitted_at', 'updated_at'),
+            'fields': ('status_changed_at', 'submitted_at', 'updated_at'),
             'classes': ('collapse',)
         }),
     )
@@ -222,6 +228,69 @@ class ExamApplicationAdmin(admin.ModelAdmin):
             color, obj.get_status_display()
         )
     status_badge.short_description = 'Status'
+    
+    # Bulk transitions go through transition_applications so each one is logged
+    def _transition(self, request, queryset, status):
+        count = transition_applications(queryset, status, actor=request.user)
+        record('admin.transition', actor=request.user, object_type=ExamApplication._meta.label_lower,
+               changes={'status': status, 'count': count})
+        label = dict(ExamApplication.STATUS_CHOICES)[status]
+        self.message_user(request, f'{count} application(s) marked as {label}.')
+    
+    @admin.action(description='Mark selected as exam script received')
+    def mark_exam_received(self, request, queryset):
+        self._transition(request, queryset, 'exam_received')
+    
+    @admin.action(description='Mark selected as submitted to exam officer')
+    def mark_submitted_to_officer(self, request, queryset):
+        self._transition(request, queryset, 'submitted_to_officer')
+    
+    @admin.action(description='Mark selected as uploaded to portal')
+    def mark_uploaded_to_portal(self, request, queryset):
+        self._transition(request, queryset, 'uploaded_to_portal')
+
+
+# ============================================================================
+# Application Status Event Admin
+# ============================================================================
+
+@admin.register(ApplicationStatusEvent)
+class ApplicationStatusEventAdmin(admin.ModelAdmin):
+    list_display = ('application_id', 'from_status', 'to_status', 'actor_id', 'seconds_in_status', 'created_at')
+    list_filter = ('to_status', 'created_at')
+    readonly_fields = ('application', 'from_status', 'to_status', 'actor', 'seconds_in_status', 'created_at')
+    
+    # The log is append-only
+    def has_add_permission(self, request):
+        return False
+    
+    def has_change_permission(self, request, obj=None):
+        return False
+    
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+
+# ============================================================================
+# Audit Event Admin
+# ============================================================================
+
+@admin.register(AuditEvent)
+class AuditEventAdmin(admin.ModelAdmin):
+    list_display = ('created_at', 'actor_id', 'action', 'object_type', 'object_id', 'object_repr')
+    list_filter = ('action', 'object_type', 'created_at')
+    search_fields = ('object_id', 'object_repr')
+    readonly_fields = ('actor', 'action', 'object_type', 'object_id', 'object_repr', 'changes', 'created_at')
+    
+    # The trail is append-only
+    def has_add_permission(self, request):
+        return False
+    
+    def has_change_permission(self, request, obj=None):
+        return False
+    
+    def has_delete_permission(self, request, obj=None):
+        return False
 
 
 # ============================================================================
@@ -233,7 +302,7 @@ class OCRResultAdmin(admin.ModelAdmin):
     list_display = ('application_id', 'confidence_score', 'verified', 'processed_at')
     list_filter = ('verified', 'processed_at')
     search_fields = ('application__application_id', 'extracted_text')
-    readonly_fields = ('application', 'extracted_text', 'ocr_summary', 'confidence_score', 
+    readonly_fields = ('application', 'extracted_text', 'ocr_summary', 'engine_confidence', 'confidence_score', 
                       'keywords_found', 'processed_at')
     
     def application_id(self, obj):
@@ -241,12 +310,90 @@ class OCRResultAdmin(admin.ModelAdmin):
     application_id.short_description = 'Application ID'
 
 
+# ============================================================================
+# OCR Cache Admin
+# ============================================================================
+
+@admin.register(OCRCacheEntry)
+class OCRCacheEntryAdmin(admin.ModelAdmin):
+    list_display = ('content_hash', 'engine_confidence', 'hits', 'created_at', 'last_hit_at')
+    search_fields = ('content_hash', 'extracted_text')
+    readonly_fields = ('content_hash', 'extracted_text', 'ocr_summary', 'engine_confidence',
+                      'keywords_found', 'hits', 'created_at', 'last_hit_at')
+
+
+# ============================================================================
+# Document Store Admin
+# ============================================================================
+
+@admin.register(StoredDocument)
+class StoredDocumentAdmin(admin.ModelAdmin):
+    list_display = ('name', 'size', 'ref_count', 'created_at', 'updated_at')
+    list_filter = ('created_at',)
+    search_fields = ('content_hash', 'name')
+    readonly_fields = ('content_hash', 'name', 'size', 'ref_count', 'created_at', 'updated_at')
+
+
+# ============================================================================
+# Archived Document Admin
+# ============================================================================
+
+@admin.register(ArchivedDocument)
+class ArchivedDocumentAdmin(admin.ModelAdmin):
+    list_display = ('name', 'archive', 'size', 'archived_at')
+    list_filter = ('archived_at',)
+    search_fields = ('name', 'archive')
+    readonly_fields = ('name', 'archive', 'offset', 'size', 'archived_at')
+
+
+# ============================================================================
+# Normalized Document Admin
+# ============================================================================
+
+@admin.register(NormalizedDocument)
+class NormalizedDocumentAdmin(admin.ModelAdmin):
+    list_display = ('original_hash', 'original_size', 'stored_size', 'bytes_saved', 'created_at')
+    list_filter = ('created_at',)
+    search_fields = ('original_hash', 'content_hash')
+    readonly_fields = ('original_hash', 'content_hash', 'original_size', 'stored_size',
+                      'original_name', 'created_at')
+
+
+# ============================================================================
+# Document Preview Admin
+# ============================================================================
+
+@admin.register(DocumentPreview)
+class DocumentPreviewAdmin(admin.ModelAdmin):
+    list_display = ('content_hash', 'status', 'width', 'height', 'attempts', 'created_at', 'finished_at')
+    list_filter = ('status', 'created_at')
+    search_fields = ('content_hash', 'source_name')
+    readonly_fields = ('content_hash', 'source_name', 'preview', 'thumbnail', 'width', 'height',
+                      'attempts', 'error', 'created_at', 'started_at', 'finished_at')
+
+
+# ============================================================================
+# OCR Job Admin
+# ============================================================================
+
+@admin.register(OCRJob)
+class OCRJobAdmin(admin.ModelAdmin):
+    list_display = ('id', 'application_id', 'status', 'attempts', 'created_at', 'finished_at')
+    list_filter = ('status', 'created_at')
+    search_fields = ('application__application_id', 'error')
+    readonly_fields = ('created_at', 'started_at', 'finished_at')
+    
+    def application_id(self, obj):
+        return obj.application.application_id
+    application_id.short_description = 'Application ID'
+
+
 # ============================================================================
 # Application Review Admin
 # ============================================================================
 
 @admin.register(ApplicationReview)
-class ApplicationReviewAdmin(admin.ModelAdmin):
+class ApplicationReviewAdmin(AuditedModelAdmin, admin.ModelAdmin):
     list_display = ('application_id', 'reviewer_name', 'decision_badge', 'reviewed_at')
     list_filter = ('decision', 'reviewed_at')
     search_fields = ('application__application_id', 'reviewed_by__first_name', 
@@ -281,7 +428,7 @@ class ApplicationReviewAdmin(admin.ModelAdmin):
 # ============================================================================
 
 @admin.register(ExamMarking)
-class ExamMarkingAdmin(admin.ModelAdmin):
+class ExamMarkingAdmin(AuditedModelAdmin, admin.ModelAdmin):
     list_display = ('application_id', 'lecturer_name', 'marks', 'marked_at')
     list_filter = ('marked_at', 'updated_at')
     search_fields = ('application__application_id', 'lecturer__first_name', 
@@ -302,11 +449,11 @@ class ExamMarkingAdmin(admin.ModelAdmin):
 # ============================================================================
 
 @admin.register(Notification)
-class NotificationAdmin(admin.ModelAdmin):
-    list_display = ('student_reg', 'title', 'notification_type', 'is_read', 'created_at')
+class NotificationAdmin(AuditedModelAdmin, admin.ModelAdmin):
+    list_display = ('student_reg', 'title', 'notification_type', 'is_read', 'update_count', 'created_at')
     list_filter = ('notification_type', 'is_read', 'created_at')
     search_fields = ('student__registration_number', 'title', 'message')
-    readonly_fields = ('created_at',)
+    readonly_fields = ('update_count', 'created_at')
     
     fieldsets = (
         ('Notification Details', {
@@ -316,10 +463,33 @@ class NotificationAdmin(admin.ModelAdmin):
             'fields': ('title', 'message')
         }),
         ('Status', {
-            'fields': ('is_read', 'created_at')
+            'fields': ('is_read', 'update_count', 'created_at')
         }),
     )
     
     def student_reg(self, obj):
         return obj.student.registration_number
-    student_reg.short_description = 'Student Reg No.'
\ No newline at end of file
+    student_reg.short_description = 'Student Reg No.'
+
+
+@admin.register(EmailOutbox)
+class EmailOutboxAdmin(admin.ModelAdmin):
+    list_display = ('id', 'to_email', 'subject', 'status', 'attempts', 'send_after', 'sent_at')
+    list_filter = ('status', 'created_at')
+    search_fields = ('to_email', 'subject', 'error')
+    raw_id_fields = ('notification',)
+    readonly_fields = ('created_at', 'started_at', 'sent_at')
+
+
+# ============================================================================
+# Report Admin
+# ============================================================================
+
+@admin.register(Report)
+class ReportAdmin(admin.ModelAdmin):
+    list_display = ('id', 'school', 'year_taken', 'semester_taken', 'exam_type', 'status',
+                    'application_count', 'size', 'created_at', 'finished_at')
+    list_filter = ('status', 'school', 'exam_type', 'created_at')
+    search_fields = ('data_version', 'error')
+    readonly_fields = ('data_version', 'artifact', 'size', 'application_count', 'requested_by',
+                       'attempts', 'error', 'created_at', 'started_at', 'finished_at')
@@ -0,0 +1,288 @@
+# ============================================================================
+# analytics.py - Cross-Tab Analytics over Exam Applications
+# ============================================================================
+#
+# crosstab() pivots applications by any of DIMENSIONS, returning for every
+# cell of the pivot and for every dimension on its own (margins):
+#   - count
+#   - auto-verified and marked rates
+#   - mean mark and mark percentiles
+#
+# Counts, rates and mark sums come from one SQL GROUP BY over all the
+# dimensions; margins are summed from those cells. Percentiles need the
+# marks themselves, so a second query fetches only the mark column of
+# marked applications, ordered by the same dimensions: each cell's marks
+# are a contiguous slice of it, sorted in memory (cheaper than adding the
+# mark to the ORDER BY). With NumPy the slices are sorted and interpolated
+# in bulk; without it in pure Python. Results are cached per filter
+# signature (see admin_analytics).
+#
+# Configure with settings.ANALYTICS (merged over DEFAULTS).
+
+import hashlib
+import json
+import math
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - optional dependency
+    np = None
+
+# Query parameter -> ExamApplication lookup
+DIMENSIONS = {
+    'school': 'student__school',
+    'program': 'student__program',
+    'status': 'status',
+    'exam_type': 'exam_type',
+    'year_taken': 'year_taken',
+}
+
+DEFAULTS = {
+    'CACHE_TIMEOUT': 300,
+    'PERCENTILES': [50, 90],
+    'FETCH_SIZE': 10000,
+    # Most percentiles one request may ask for
+    'MAX_PERCENTILES': 10,
+}
+
+
+def analytics_config():
+    from django.conf import settings
+    return {**DEFAULTS, **getattr(settings, 'ANALYTICS', {})}
+
+
+def parse_query(params):
+    """
+    ``(dimensions, filters, percentiles)`` from request GET parameters:
+    ``?dimensions=school,status&exam_type=resit&percentiles=50,90``.
+    Every dimension can also be filtered, repeating it for several values.
+    Raises ValueError for anything invalid.
+    """
+    dimensions = [d for d in params.get('dimensions', 'school').split(',') if d]
+    unknown = [d for d in dimensions if d not in DIMENSIONS]
+    if unknown or not dimensions or len(set(dimensions)) != len(dimensions):
+        raise ValueError(f"dimensions must be distinct names from: {', '.join(DIMENSIONS)}")
+
+    filters = {}
+    for dimension in DIMENSIONS:
+        values = [v for v in params.getlist(dimension) if v]
+        if dimension == 'year_taken':
+            try:
+                values = [int(v) for v in values]
+            except ValueError:
+                raise ValueError('year_taken must be an integer')
+        if values:
+            filters[dimension] = sorted(set(values))
+
+    config = analytics_config()
+    percentiles = config['PERCENTILES']
+    if params.get('percentiles'):
+        try:
+            percentiles = sorted({float(p) for p in params['percentiles'].split(',')})
+        except ValueError:
+            raise ValueError('percentiles must be numbers')
+    if any(not 0 <= p <= 100 for p in percentiles):
+        raise ValueError('percentiles must be between 0 and 100')
+    if len(percentiles) > config['MAX_PERCENTILES']:
+        raise ValueError(f"at most {config['MAX_PERCENTILES']} percentiles may be requested")
+    return dimensions, filters, percentiles
+
+
+def query_signature(dimensions, filters, percentiles):
+    """Stable cache key part for a parsed query"""
+    canonical = json.dumps([dimensions, filters, percentiles], sort_keys=True)
+    return hashlib.sha1(canonical.encode()).hexdigest()
+
+
+def _applications(filters):
+    from django.db.models import FloatField
+    from django.db.models.functions import Cast
+    from .models import ExamApplication
+
+    return ExamApplication.objects.filter(
+        **{f'{DIMENSIONS[d]}__in': values for d, values in filters.items()}
+    ).annotate(mark=Cast('marking__marks', FloatField()))
+
+
+def fetch_groups(dimensions, filters):
+    """
+    ``(labels, count, verified, marked, mark_sum)`` for every non-empty
+    cell, from one GROUP BY ordered by the dimensions
+    """
+    from django.db.models import Count, Q, Sum
+
+    fields = [DIMENSIONS[d] for d in dimensions]
+    groups = _applications(filters).values(*fields).annotate(
+        count=Count('pk'),
+        verified=Count('pk', filter=Q(auto_verified=True)),
+        marked=Count('mark'),
+        mark_sum=Sum('mark'),
+    ).order_by(*fields)
+    return [
+        (tuple(group[field] for field in fields), group['count'], group['verified'], group['marked'],
+         group['mark_sum'] or 0.0)
+        for group in groups
+    ]
+
+
+def fetch_marks(dimensions, filters, fetch_size):
+    """
+    Marks of marked applications ordered by the dimensions, so that they
+    line up with fetch_groups() cell by cell
+    """
+    from django.db import connections
+
+    applications = _applications(filters).filter(mark__isnull=False)
+    fields = [DIMENSIONS[d] for d in dimensions]
+    sql, params = applications.order_by(*fields).values_list('mark').query.sql_with_params()
+
+    marks = []
+    # A plain cursor skips per-row model conversion
+    with connections[applications.db].cursor() as cursor:
+        cursor.execute(sql, params)
+        while batch := cursor.fetchmany(fetch_size):
+            marks.extend(mark for mark, in batch)
+    return marks
+
+
+def _sort_key(value):
+    # None sorts first and never compares with a label
+    return (value is not None, value)
+
+
+def _stats(count, verified, marked, mark_sum, percentiles):
+    return {
+        'count': int(count),
+        'verified_rate': round(float(verified / count), 4) if count else None,
+        'marked_rate': round(float(marked / count), 4) if count else None,
+        'mean_mark': round(float(mark_sum / marked), 2) if marked else None,
+        'mark_percentiles': {
+            f'p{p:g}': None if value is None or math.isnan(value) else round(float(value), 2)
+            for p, value in percentiles.items()
+        },
+    }
+
+
+def _margin_codes(groups, dimension):
+    """``(codes, labels)``: each cell's position among the dimension's sorted labels"""
+    labels = sorted({labels[dimension] for labels, *_ in groups}, key=_sort_key)
+    index = {label: code for code, label in enumerate(labels)}
+    return [index[labels[dimension]] for labels, *_ in groups], labels
+
+
+# ============================================================================
+# NumPy implementation
+# ============================================================================
+
+def _group_percentiles(counts, values, percentiles):
+    """
+    Linearly interpolated percentiles within each group, for ``values``
+    sorted by group and then value, the groups ``counts`` long each
+    """
+    starts = np.cumsum(counts) - counts
+    result = {}
+    for p in percentiles:
+        if not len(values):
+            result[p] = np.full(len(counts), np.nan)
+            continue
+        position = np.maximum(counts - 1, 0) * (p / 100)
+        low = np.clip(starts + np.floor(position).astype(np.int64), 0, len(values) - 1)
+        high = np.clip(starts + np.ceil(position).astype(np.int64), 0, len(values) - 1)
+        interpolated = values[low] + (values[high] - values[low]) * (position - np.floor(position))
+        result[p] = np.where(counts > 0, interpolated, np.nan)
+    return result
+
+
+def _crosstab_numpy(groups, marks, dimension_count, percentiles):
+    totals = np.array([group[1:] for group in groups], dtype=np.float64).reshape(-1, 4)
+    marked = totals[:, 2].astype(np.int64)
+    marks = np.array(marks, dtype=np.float64)
+    # Cell of every mark, when the marks were fetched
+    mark_cells = np.repeat(np.arange(len(groups)), marked) if len(marks) else marks.astype(np.int64)
+    marks = marks[np.lexsort((marks, mark_cells))]
+
+    def summarize(labels, totals, marked, marks):
+        group_percentiles = _group_percentiles(marked, marks, percentiles)
+        return [
+            (label, _stats(*totals[i], {p: values[i] for p, values in group_percentiles.items()}))
+            for i, label in enumerate(labels)
+        ]
+
+    cells = summarize([labels for labels, *_ in groups], totals, marked, marks)
+    margins = []
+    for dimension in range(dimension_count):
+        codes, labels = _margin_codes(groups, dimension)
+        codes = np.array(codes, dtype=np.int64)
+        margin_totals = np.stack([np.bincount(codes, weights=column, minlength=len(labels))
+                                  for column in totals.T], axis=1)
+        mark_codes = codes[mark_cells]
+        margins.append(summarize([(label,) for label in labels], margin_totals,
+                                 margin_totals[:, 2].astype(np.int64),
+                                 marks[np.lexsort((marks, mark_codes))]))
+    return cells, margins
+
+
+# ============================================================================
+# Pure Python implementation
+# ============================================================================
+
+def _percentile(ordered, p):
+    if not ordered:
+        return None
+    position = (len(ordered) - 1) * (p / 100)
+    low, high = math.floor(position), math.ceil(position)
+    return ordered[low] + (ordered[high] - ordered[low]) * (position - low)
+
+
+def _crosstab_python(groups, marks, dimension_count, percentiles):
+    cells = []
+    cell_marks = []
+    start = 0
+    for labels, count, verified, marked, mark_sum in groups:
+        ordered = sorted(marks[start:start + marked])
+        start += marked
+        cell_marks.append(ordered)
+        cells.append((labels, _stats(count, verified, marked, mark_sum,
+                                     {p: _percentile(ordered, p) for p in percentiles})))
+
+    margins = []
+    for dimension in range(dimension_count):
+        codes, labels = _margin_codes(groups, dimension)
+        totals = [[0, 0, 0, 0.0] for _ in labels]
+        margin_marks = [[] for _ in labels]
+        for code, group, ordered in zip(codes, groups, cell_marks):
+            for i, value in enumerate(group[1:]):
+                totals[code][i] += value
+            margin_marks[code].extend(ordered)
+        margin = []
+        for label, total, ordered in zip(labels, totals, margin_marks):
+            ordered.sort()
+            margin.append(((label,), _stats(*total, {p: _percentile(ordered, p) for p in percentiles})))
+        margins.append(margin)
+    return cells, margins
+
+
+def crosstab(dimensions, filters, percentiles, fetch_size=None):
+    """Pivot of applications by ``dimensions``, JSON-ready"""
+    fetch_size = fetch_size or analytics_config()['FETCH_SIZE']
+    groups = fetch_groups(dimensions, filters)
+    if groups:
+        # Without percentiles the marks themselves are not needed
+        marks = fetch_marks(dimensions, filters, fetch_size) if percentiles else []
+        compute = _crosstab_numpy if np is not None else _crosstab_python
+        cells, margins = compute(groups, marks, len(dimensions), percentiles)
+        # Cells come in database order; margins are already sorted
+        cells.sort(key=lambda cell: tuple(map(_sort_key, cell[0])))
+    else:
+        cells, margins = [], [[] for _ in dimensions]
+
+    return {
+        'dimensions': dimensions,
+        'filters': filters,
+        'total': sum(group[1] for group in groups),
+        'cells': [{'key': dict(zip(dimensions, labels)), **stats} for labels, stats in cells],
+        'margins': {
+            dimension: [{'value': labels[0], **stats} for labels, stats in margin]
+            for dimension, margin in zip(dimensions, margins)
+        },
+    }
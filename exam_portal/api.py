@@ -0,0 +1,497 @@
+# ============================================================================
+# api.py - JSON API
+# ============================================================================
+#
+# Read/write JSON endpoints under /api/ for applications, notifications,
+# markings and unit assignments, with the same role checks as the HTML
+# views (api_role_required answers 401/403 instead of redirecting). Writes
+# go through the same forms and workflow steps as the HTML views; unsafe
+# methods need the session's CSRF token (X-CSRFToken header).
+#
+#   ?fields=a,b,c   sparse fieldsets: only those columns are selected
+#                   (values_list) and serialized
+#   ?cursor=...     keyset pagination, newest first; follow "next"
+#   ?limit=n        page size (default PAGE_SIZE, at most MAX_PAGE_SIZE)
+#
+# Every GET carries an ETag and Last-Modified derived from updated_at and
+# answers If-None-Match / If-Modified-Since with 304, so polling clients
+# should send the ETag back. For a list the stamp is the latest updated_at
+# (plus the row count for per-user scopes) over an index on (<scope
+# column>, updated_at) and a token the cache bumps on deletions, which
+# Last-Modified alone would miss; for an application it comes from the
+# read-through application cache, so an unchanged poll costs no query.
+
+import hashlib
+import json
+
+from django.db.models import Count, Max
+from django.forms.models import model_to_dict
+from django.http import HttpResponse, JsonResponse
+from django.urls import reverse
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+from django.views.decorators.http import require_http_methods
+
+from . import audit
+from .cache import deletion_stamp, get_application_or_404
+from .decorators import api_role_required
+from .forms import ApplicationReviewForm, ExamApplicationForm, ExamMarkingForm, UnitAssignmentForm
+from .models import ExamApplication, ExamMarking, Notification, UnitAssignment
+from .uploads import document_uploads
+from .workflow import mark_application, review_application, submit_application
+
+PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+
+
+class Resource:
+    """
+    How one model is exposed: ``fields`` maps API names to ORM lookups and
+    ``scopes`` maps each role allowed to read it to a function returning
+    the filter kwargs that limit it to the rows that role may see.
+    """
+
+    def __init__(self, model, fields, default_fields, scopes):
+        self.model = model
+        self.fields = fields
+        self.default_fields = default_fields
+        self.scopes = scopes
+
+    def queryset(self, request):
+        return self.model.objects.filter(**self.scopes[request.role](request)).order_by('-pk')
+
+    def stamp(self, request):
+        """
+        ``(latest updated_at, token)`` changing with any write to the rows
+        the user may see, from index lookups only.
+        """
+        scope = self.scopes[request.role](request)
+        aggregates = {'last': Max('updated_at')}
+        if scope:
+            # Rows can leave a scope (e.g. reassigned) without a newer
+            # updated_at in it; the count is cheap on (scope, updated_at)
+            aggregates['count'] = Count('pk')
+        stamp = self.model.objects.filter(**scope).aggregate(**aggregates)
+        return stamp['last'], (stamp.get('count'), deletion_stamp(self.model))
+
+    def parse_fields(self, params):
+        """API field names requested with ``?fields=``; raises ValueError"""
+        if not params.get('fields'):
+            return self.default_fields
+        names = [name for name in params['fields'].split(',') if name]
+        unknown = [name for name in names if name not in self.fields]
+        if unknown or not names:
+            raise ValueError(f"fields must be names from: {', '.join(self.fields)}")
+        return list(dict.fromkeys(names))
+
+    def lookups(self, names):
+        return [self.fields[name] for name in names]
+
+
+def _own_profile(field):
+    return lambda request: {field: request.role_profile.pk}
+
+
+def _everything(request):
+    return {}
+
+
+APPLICATIONS = Resource(
+    ExamApplication,
+    fields={
+        'id': 'application_id',
+        'student': 'student__registration_number',
+        'year_of_study': 'year_of_study',
+        'exam_type': 'exam_type',
+        'unit_name': 'unit_name',
+        'unit_code': 'unit_code',
+        'year_taken': 'year_taken',
+        'semester_taken': 'semester_taken',
+        'status': 'status',
+        'status_changed_at': 'status_changed_at',
+        'auto_verified': 'auto_verified',
+        'lecturer': 'assigned_lecturer__lecturer_id',
+        'submitted_at': 'submitted_at',
+        'updated_at': 'updated_at',
+    },
+    default_fields=['id', 'student', 'exam_type', 'unit_code', 'unit_name', 'year_taken',
+                    'semester_taken', 'status', 'lecturer', 'submitted_at', 'updated_at'],
+    scopes={
+        'student': _own_profile('student_id'),
+        'lecturer': _own_profile('assigned_lecturer_id'),
+        'officer': _everything,
+        'admin': _everything,
+    },
+)
+
+NOTIFICATIONS = Resource(
+    Notification,
+    fields={
+        'id': 'pk',
+        'application': 'application__application_id',
+        'notification_type': 'notification_type',
+        'title': 'title',
+        'message': 'message',
+        'is_read': 'is_read',
+        'update_count': 'update_count',
+        'created_at': 'created_at',
+        'updated_at': 'updated_at',
+    },
+    default_fields=['id', 'application', 'notification_type', 'title', 'message', 'is_read', 'update_count',
+                    'created_at'],
+    scopes={
+        'student': _own_profile('student_id'),
+        'admin': _everything,
+    },
+)
+
+MARKINGS = Resource(
+    ExamMarking,
+    fields={
+        'id': 'pk',
+        'application': 'application__application_id',
+        'lecturer': 'lecturer__lecturer_id',
+        'marks': 'marks',
+        'comments': 'comments',
+        'marked_at': 'marked_at',
+        'updated_at': 'updated_at',
+    },
+    default_fields=['id', 'application', 'lecturer', 'marks', 'comments', 'marked_at', 'updated_at'],
+    scopes={
+        'student': _own_profile('application__student_id'),
+        'lecturer': _own_profile('lecturer_id'),
+        'officer': _everything,
+        'admin': _everything,
+    },
+)
+
+UNIT_ASSIGNMENTS = Resource(
+    UnitAssignment,
+    fields={
+        'id': 'pk',
+        'lecturer': 'lecturer__lecturer_id',
+        'unit_code': 'unit_code',
+        'unit_name': 'unit_name',
+        'program': 'program',
+        'year': 'year',
+        'semester': 'semester',
+        'active': 'active',
+        'created_at': 'created_at',
+        'updated_at': 'updated_at',
+    },
+    default_fields=['id', 'lecturer', 'unit_code', 'unit_name', 'program', 'year', 'semester', 'active'],
+    scopes={
+        'lecturer': _own_profile('lecturer_id'),
+        'officer': _everything,
+        'admin': _everything,
+    },
+)
+
+
+# ============================================================================
+# Helpers
+# ============================================================================
+
+def _error(message, status=400, **extra):
+    return JsonResponse({'error': message, **extra}, status=status)
+
+
+def _form_error(form):
+    return _error('invalid data', errors=form.errors.get_json_data())
+
+
+def _json_body(request):
+    """The request body as a dict; raises ValueError"""
+    try:
+        data = json.loads(request.body or b'{}')
+    except (UnicodeDecodeError, json.JSONDecodeError):
+        raise ValueError('request body must be JSON')
+    if not isinstance(data, dict):
+        raise ValueError('request body must be a JSON object')
+    return data
+
+
+def _conditional(request, stamp, last_modified):
+    """
+    ``(etag, last_modified, response)``: ``response`` is a 304 when a GET
+    client's copy is current, else None.
+    """
+    etag = quote_etag(hashlib.sha1(repr(stamp).encode()).hexdigest())
+    last_modified = int(last_modified.timestamp()) if last_modified else None
+    response = None
+    if request.method in ('GET', 'HEAD'):
+        response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    return etag, last_modified, response
+
+
+def _json(data, etag, last_modified, status=200):
+    response = JsonResponse(data, status=status)
+    _validators(response, etag, last_modified)
+    return response
+
+
+def _validators(response, etag, last_modified):
+    response['ETag'] = etag
+    if last_modified is not None:
+        response['Last-Modified'] = http_date(last_modified)
+    # Clients may keep the copy but must revalidate before using it
+    response['Cache-Control'] = 'private, no-cache'
+    return response
+
+
+def list_response(request, resource, queryset=None):
+    """One cursor-paginated page of ``resource`` for a GET list request"""
+    queryset = resource.queryset(request) if queryset is None else queryset
+    try:
+        names = resource.parse_fields(request.GET)
+    except ValueError as exc:
+        return _error(str(exc))
+    try:
+        limit = max(1, min(int(request.GET.get('limit', PAGE_SIZE)), MAX_PAGE_SIZE))
+        cursor = int(request.GET['cursor']) if request.GET.get('cursor') else None
+    except ValueError:
+        return _error('limit and cursor must be integers')
+
+    # Stamped over everything the user may see, so rows leaving the
+    # request's filters (e.g. ?status=) change it too
+    last, token = resource.stamp(request)
+    etag, last_modified, not_modified = _conditional(
+        request, (resource.model._meta.label, request.GET.urlencode(), last, token), last,
+    )
+    if not_modified is not None:
+        return _validators(not_modified, etag, last_modified)
+
+    page = queryset if cursor is None else queryset.filter(pk__lt=cursor)
+    # Only the requested columns, plus the pk for the cursor; no model instances
+    rows = list(page.values_list('pk', *resource.lookups(names))[:limit + 1])
+    next_cursor = rows[limit - 1][0] if len(rows) > limit else None
+    data = {
+        'results': [dict(zip(names, row[1:])) for row in rows[:limit]],
+        'next': f'{request.path}?{_query(request, cursor=next_cursor)}' if next_cursor else None,
+    }
+    return _json(data, etag, last_modified)
+
+
+def _query(request, **changes):
+    params = request.GET.copy()
+    for key, value in changes.items():
+        params[key] = value
+    return params.urlencode()
+
+
+def detail_response(request, resource, pk, status=200):
+    """``resource`` row ``pk`` (already access checked) for a GET request"""
+    try:
+        names = resource.parse_fields(request.GET)
+    except ValueError as exc:
+        return _error(str(exc))
+    row = resource.model.objects.filter(pk=pk).values_list('updated_at', *resource.lookups(names)).first()
+    if row is None:
+        return _error('not found', status=404)
+    etag, last_modified, not_modified = _conditional(request, (resource.model._meta.label, pk, names, row[0]), row[0])
+    if not_modified is not None:
+        return _validators(not_modified, etag, last_modified)
+    return _json(dict(zip(names, row[1:])), etag, last_modified, status=status)
+
+
+def _scoped_or_404(request, resource, pk):
+    if not resource.queryset(request).filter(pk=pk).exists():
+        return _error('not found', status=404)
+    return None
+
+
+# ============================================================================
+# Applications
+# ============================================================================
+
+# Role -> application field that must match the role row
+APPLICATION_OWNERSHIP = {
+    'student': 'student_id',
+    'lecturer': 'assigned_lecturer_id',
+}
+
+
+def _application(request, app_id):
+    """Cached application the user may see; raises Http404"""
+    field = APPLICATION_OWNERSHIP.get(request.role)
+    ownership = {field: request.role_profile.pk} if field else {}
+    return get_application_or_404(app_id, **ownership)
+
+
+@document_uploads
+@require_http_methods(['GET', 'HEAD', 'POST'])
+@api_role_required('student', 'lecturer', 'officer', 'admin')
+def applications(request):
+    """GET lists the applications the user may see; POST (students) submits one"""
+    if request.method != 'POST':
+        return list_response(request, APPLICATIONS, APPLICATIONS.queryset(request).filter(
+            **({'status': request.GET['status']} if request.GET.get('status') else {})
+        ))
+
+    if request.role != 'student':
+        return _error('only students can submit applications', status=403)
+    # multipart/form-data: the supporting document is a file
+    form = ExamApplicationForm(request.POST, request.FILES)
+    if not form.is_valid():
+        return _form_error(form)
+    application = submit_application(form, request.role_profile)
+    response = detail_response(request, APPLICATIONS, application.pk, status=201)
+    response['Location'] = reverse('api_application', args=[application.application_id])
+    return response
+
+
+@require_http_methods(['GET', 'HEAD'])
+@api_role_required('student', 'lecturer', 'officer', 'admin')
+def application(request, app_id):
+    """One application; unchanged ones are answered from the cache with 304"""
+    application = _application(request, app_id)
+    try:
+        names = APPLICATIONS.parse_fields(request.GET)
+    except ValueError as exc:
+        return _error(str(exc))
+    etag, last_modified, not_modified = _conditional(
+        request, (ExamApplication._meta.label, application.pk, names, application.updated_at),
+        application.updated_at,
+    )
+    if not_modified is not None:
+        return _validators(not_modified, etag, last_modified)
+    return detail_response(request, APPLICATIONS, application.pk)
+
+
+@require_http_methods(['POST'])
+@api_role_required('officer')
+def application_review(request, app_id):
+    """Officer decision on an application: ``{"decision": ..., "comments": ...}``"""
+    application = _application(request, app_id)
+    try:
+        form = ApplicationReviewForm(_json_body(request))
+    except ValueError as exc:
+        return _error(str(exc))
+    if not form.is_valid():
+        return _form_error(form)
+    review_application(application, form, request.role_profile)
+    return detail_response(request, APPLICATIONS, application.pk, status=201)
+
+
+@require_http_methods(['GET', 'HEAD', 'PUT'])
+@api_role_required('student', 'lecturer', 'officer', 'admin')
+def application_marking(request, app_id):
+    """GET the application's marking; PUT (assigned lecturer) sets ``marks``/``comments``"""
+    application = _application(request, app_id)
+    marking = ExamMarking.objects.filter(application_id=application.pk).first()
+    if request.method != 'PUT':
+        if marking is None:
+            return _error('not marked', status=404)
+        return detail_response(request, MARKINGS, marking.pk)
+
+    if request.role != 'lecturer':
+        return _error('only the assigned lecturer can mark', status=403)
+    try:
+        form = ExamMarkingForm(_json_body(request), instance=marking)
+    except ValueError as exc:
+        return _error(str(exc))
+    if not form.is_valid():
+        return _form_error(form)
+    created = marking is None
+    marking = mark_application(application, form, request.role_profile)
+    return detail_response(request, MARKINGS, marking.pk, status=201 if created else 200)
+
+
+# ============================================================================
+# Notifications, markings and unit assignments
+# ============================================================================
+
+@require_http_methods(['GET', 'HEAD'])
+@api_role_required('student', 'admin')
+def notifications(request):
+    """The user's notifications, newest first; ``?unread=1`` for unread only"""
+    queryset = NOTIFICATIONS.queryset(request)
+    if request.GET.get('unread'):
+        queryset = queryset.filter(is_read=False)
+    return list_response(request, NOTIFICATIONS, queryset)
+
+
+@require_http_methods(['GET', 'HEAD', 'PATCH'])
+@api_role_required('student', 'admin')
+def notification(request, notification_id):
+    """One notification; PATCH ``{"is_read": true}`` marks it read"""
+    missing = _scoped_or_404(request, NOTIFICATIONS, notification_id)
+    if missing is not None:
+        return missing
+    if request.method != 'PATCH':
+        return detail_response(request, NOTIFICATIONS, notification_id)
+
+    try:
+        data = _json_body(request)
+    except ValueError as exc:
+        return _error(str(exc))
+    if set(data) != {'is_read'} or not isinstance(data['is_read'], bool):
+        return _error('only is_read (a boolean) can be changed')
+    notification = Notification.objects.get(pk=notification_id)
+    if notification.is_read != data['is_read']:
+        notification.is_read = data['is_read']
+        notification.save(update_fields=['is_read', 'updated_at'])
+        audit.record('notification.read' if notification.is_read else 'notification.unread', notification)
+    return detail_response(request, NOTIFICATIONS, notification_id)
+
+
+@require_http_methods(['GET', 'HEAD'])
+@api_role_required('student', 'lecturer', 'officer', 'admin')
+def markings(request):
+    """Markings the user may see, newest first"""
+    return list_response(request, MARKINGS)
+
+
+@require_http_methods(['GET', 'HEAD', 'POST'])
+@api_role_required('lecturer', 'officer', 'admin')
+def unit_assignments(request):
+    """GET lists unit assignments; POST (admins) creates one"""
+    if request.method != 'POST':
+        queryset = UNIT_ASSIGNMENTS.queryset(request)
+        if request.GET.get('active'):
+            queryset = queryset.filter(active=request.GET['active'] not in ('0', 'false'))
+        return list_response(request, UNIT_ASSIGNMENTS, queryset)
+
+    if request.role != 'admin':
+        return _error('only admins can assign units', status=403)
+    try:
+        form = UnitAssignmentForm(_json_body(request))
+    except ValueError as exc:
+        return _error(str(exc))
+    if not form.is_valid():
+        return _form_error(form)
+    assignment = form.save()
+    audit.record('unit_assignment.create', assignment, changes=audit.form_changes(form))
+    return detail_response(request, UNIT_ASSIGNMENTS, assignment.pk, status=201)
+
+
+@require_http_methods(['GET', 'HEAD', 'PATCH', 'DELETE'])
+@api_role_required('lecturer', 'officer', 'admin')
+def unit_assignment(request, assignment_id):
+    """One unit assignment; admins PATCH any of its fields or DELETE it"""
+    missing = _scoped_or_404(request, UNIT_ASSIGNMENTS, assignment_id)
+    if missing is not None:
+        return missing
+    if request.method in ('GET', 'HEAD'):
+        return detail_response(request, UNIT_ASSIGNMENTS, assignment_id)
+
+    if request.role != 'admin':
+        return _error('only admins can change unit assignments', status=403)
+    assignment = UnitAssignment.objects.get(pk=assignment_id)
+    if request.method == 'DELETE':
+        audit.record('unit_assignment.delete', assignment)
+        assignment.delete()
+        return HttpResponse(status=204)
+
+    try:
+        data = _json_body(request)
+    except ValueError as exc:
+        return _error(str(exc))
+    form = UnitAssignmentForm(
+        {**model_to_dict(assignment, fields=UnitAssignmentForm._meta.fields), **data}, instance=assignment
+    )
+    if not form.is_valid():
+        return _form_error(form)
+    form.save()
+    audit.record('unit_assignment.edit', assignment, changes=audit.form_changes(form))
+    return detail_response(request, UNIT_ASSIGNMENTS, assignment_id)
@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class ExamPortalConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'exam_portal'
+
+    def ready(self):
+        # Connect cache invalidation and query timing signals
+        from . import cache, overload  # noqa: F401
@@ -0,0 +1,345 @@
+# ============================================================================
+# audit.py - Buffered Audit Trail
+# ============================================================================
+#
+# record() appends one AuditEvent per mutating action (admin student/officer/
+# lecturer management, applications, reviews, markings, Django admin
+# changes). Status transitions are logged separately (events.py).
+#
+# Events are not inserted one by one: each worker process buffers them in
+# memory and writes them with a single bulk_create when
+#   - FLUSH_SIZE events are pending,
+#   - the oldest pending event is FLUSH_INTERVAL seconds old (checked by
+#     AuditMiddleware at request end, and by a timer while the worker idles),
+#   - the worker exits.
+# Events recorded inside a transaction are buffered only once it commits.
+#
+# If the database is unavailable the batch is appended as JSON lines to
+# FALLBACK_PATH; replay_audit_log imports it once the database is back.
+#
+# Configure with settings.AUDIT (merged over DEFAULTS).
+
+import atexit
+import datetime
+import json
+import os
+import threading
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import DatabaseError, close_old_connections, connection, transaction
+from django.db.models import Model
+from django.utils import timezone
+
+from . import metrics
+from .events import current_actor_id
+
+DEFAULTS = {
+    'FLUSH_SIZE': 200,
+    'FLUSH_INTERVAL': 5,
+    # Defaults to BASE_DIR/var/audit-fallback.jsonl
+    'FALLBACK_PATH': None,
+}
+
+# Form fields never copied into the trail
+SECRET_FIELDS = ('password', 'confirm_password')
+
+AUDIT_FLUSHES = metrics.Counter('audit_flushes', 'Audit buffer flushes written to the database')
+AUDIT_EVENTS = metrics.Counter('audit_events', 'Audit events written to the database')
+AUDIT_FALLBACK_EVENTS = metrics.Counter('audit_fallback_events', 'Audit events written to the fallback file')
+
+
+def audit_config():
+    return {**DEFAULTS, **getattr(settings, 'AUDIT', {})}
+
+
+def fallback_path():
+    path = audit_config()['FALLBACK_PATH']
+    return str(path or os.path.join(settings.BASE_DIR, 'var', 'audit-fallback.jsonl'))
+
+
+def _json_safe(value):
+    # Dates, decimals and UUIDs as the JSONField and the fallback file store them
+    return json.loads(json.dumps(value, cls=DjangoJSONEncoder))
+
+
+def _field_value(value):
+    # Related objects are recorded by primary key, as form.initial has them
+    return value.pk if isinstance(value, Model) else value
+
+
+def form_changes(form):
+    """``{field: [old, new]}`` for the fields a bound, valid form changed"""
+    return _json_safe({
+        name: [form.initial.get(name), _field_value(form.cleaned_data.get(name))]
+        for name in form.changed_data if name not in SECRET_FIELDS
+    })
+
+
+class AuditBuffer:
+    """Per-worker queue of audit events awaiting a batched insert"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        # Serializes writers so batches reach the database in order
+        self._flush_lock = threading.Lock()
+        self._events = []
+        self._oldest = None
+        self._timer = None
+
+    def add(self, event):
+        config = audit_config()
+        with self._lock:
+            self._events.append(event)
+            if self._oldest is None:
+                self._oldest = time.monotonic()
+            full = len(self._events) >= config['FLUSH_SIZE']
+            if not full and self._timer is None:
+                self._timer = threading.Timer(config['FLUSH_INTERVAL'], self._timed_flush)
+                self._timer.daemon = True
+                self._timer.start()
+        if full:
+            self.flush()
+
+    def due(self):
+        oldest = self._oldest
+        return oldest is not None and time.monotonic() - oldest >= audit_config()['FLUSH_INTERVAL']
+
+    def pending(self):
+        return len(self._events)
+
+    def flush(self):
+        """Write every pending event; returns how many were written"""
+        with self._flush_lock:
+            with self._lock:
+                events, self._events, self._oldest = self._events, [], None
+                if self._timer is not None:
+                    self._timer.cancel()
+                    self._timer = None
+            if events:
+                write_events(events)
+            return len(events)
+
+    def _timed_flush(self):
+        with self._lock:
+            self._timer = None
+        try:
+            self.flush()
+        finally:
+            # The timer thread got its own connection; don't leak it
+            connection.close()
+
+
+def write_events(events):
+    """bulk_create ``events`` (dicts), or append them to the fallback file"""
+    from .models import AuditEvent
+
+    try:
+        AuditEvent.objects.bulk_create([AuditEvent(**event) for event in events], batch_size=500)
+    except DatabaseError:
+        write_fallback(events)
+        # The connection may be unusable now; let the next query reconnect
+        close_old_connections()
+        return
+    AUDIT_FLUSHES.inc()
+    AUDIT_EVENTS.inc(len(events))
+
+
+def write_fallback(events):
+    path = fallback_path()
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    lines = ''.join(
+        json.dumps({**event, 'created_at': event['created_at'].isoformat()}) + '\n'
+        for event in events
+    )
+    # One append-mode write per batch so concurrent workers don't interleave lines
+    with open(path, 'a', encoding='utf-8') as fallback:
+        fallback.write(lines)
+        fallback.flush()
+        os.fsync(fallback.fileno())
+    AUDIT_FALLBACK_EVENTS.inc(len(events))
+
+
+def replay_fallback():
+    """
+    Import the fallback file into the database; returns the number of events.
+    The file is moved aside first so workers keep appending to a fresh one,
+    and removed only once its events are committed.
+    """
+    from django.utils.dateparse import parse_datetime
+    from .models import AuditEvent
+
+    path = fallback_path()
+    replaying = path + '.replay'
+    imported = 0
+    while True:
+        # A leftover from an interrupted replay is imported first
+        if not os.path.exists(replaying):
+            if not os.path.exists(path):
+                return imported
+            os.replace(path, replaying)
+
+        events = []
+        with open(replaying, encoding='utf-8') as fallback:
+            for line in fallback:
+                if line.strip():
+                    event = json.loads(line)
+                    event['created_at'] = parse_datetime(event['created_at'])
+                    events.append(AuditEvent(**event))
+        with transaction.atomic():
+            AuditEvent.objects.bulk_create(events, batch_size=500)
+        os.remove(replaying)
+        imported += len(events)
+
+
+buffer = AuditBuffer()
+atexit.register(buffer.flush)
+
+
+def record(action, obj=None, *, actor=None, changes=None, object_type=None, object_id=None):
+    """
+    Buffer one audit event. ``obj`` is the affected model instance (or pass
+    ``object_type``/``object_id``); ``actor`` defaults to the request user.
+    """
+    if obj is not None:
+        object_type = object_type or obj._meta.label_lower
+        object_id = obj.pk if object_id is None else object_id
+    if actor is None:
+        actor_id = current_actor_id()
+    else:
+        actor_id = actor.pk if actor.is_authenticated else None
+    event = {
+        'actor_id': actor_id,
+        'action': action,
+        'object_type': object_type or '',
+        'object_id': '' if object_id is None else str(object_id),
+        'object_repr': str(obj)[:200] if obj is not None else '',
+        'changes': _json_safe(changes or {}),
+        'created_at': timezone.now(),
+    }
+    # Runs immediately outside a transaction; dropped if it rolls back
+    transaction.on_commit(lambda: buffer.add(event))
+
+
+# ============================================================================
+# Query
+# ============================================================================
+
+QUERY_LIMIT = 100
+MAX_QUERY_LIMIT = 1000
+EPOCH = datetime.datetime(1970, 1, 1, tzinfo=datetime.timezone.utc)
+
+
+def _parse_time(value, name):
+    from django.utils.dateparse import parse_date, parse_datetime
+
+    moment = parse_datetime(value)
+    if moment is None:
+        day = parse_date(value)
+        if day is None:
+            raise ValueError(f'{name} must be an ISO date or datetime')
+        moment = datetime.datetime.combine(day, datetime.time.min)
+    if timezone.is_naive(moment):
+        moment = timezone.make_aware(moment)
+    return moment
+
+
+def query_events(params):
+    """
+    Newest-first events matching ``?actor=<user id>&object_type=&object_id=
+    &action=&since=&until=`` (each served by an index on the timeline),
+    paged with ``?cursor=`` from the previous page. Raises ValueError for
+    invalid parameters.
+    """
+    from django.db.models import Q
+    from .models import AuditEvent
+
+    events = AuditEvent.objects.order_by('-created_at', '-pk')
+    if params.get('actor'):
+        try:
+            events = events.filter(actor_id=int(params['actor']))
+        except ValueError:
+            raise ValueError('actor must be a user id')
+    if params.get('object_id') and not params.get('object_type'):
+        raise ValueError('object_id needs object_type')
+    for field in ('object_type', 'object_id', 'action'):
+        if params.get(field):
+            events = events.filter(**{field: params[field]})
+    if params.get('since'):
+        events = events.filter(created_at__gte=_parse_time(params['since'], 'since'))
+    if params.get('until'):
+        events = events.filter(created_at__lt=_parse_time(params['until'], 'until'))
+
+    # Keyset paging on (created_at, id): ids are not in time order since
+    # buffers flush out of order
+    if params.get('cursor'):
+        try:
+            micros, pk = map(int, params['cursor'].split('-'))
+        except ValueError:
+            raise ValueError('invalid cursor')
+        created_at = EPOCH + datetime.timedelta(microseconds=micros)
+        events = events.filter(Q(created_at__lt=created_at) | Q(created_at=created_at, pk__lt=pk))
+
+    try:
+        limit = max(1, min(int(params.get('limit', QUERY_LIMIT)), MAX_QUERY_LIMIT))
+    except ValueError:
+        raise ValueError('limit must be an integer')
+    page = list(events.values(
+        'id', 'created_at', 'actor_id', 'action', 'object_type', 'object_id', 'object_repr', 'changes'
+    )[:limit + 1])
+    cursor = None
+    if len(page) > limit:
+        page = page[:limit]
+        last = page[-1]
+        micros = (last['created_at'] - EPOCH) // datetime.timedelta(microseconds=1)
+        cursor = f"{micros}-{last['id']}"
+    return {'events': page, 'cursor': cursor}
+
+
+class AuditMiddleware:
+    """Flush the worker's audit buffer at request end once it is due"""
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        response = self.get_response(request)
+        if buffer.due():
+            buffer.flush()
+        return response
+
+    async def __acall__(self, request):
+        response = await self.get_response(request)
+        if buffer.due():
+            await sync_to_async(buffer.flush)()
+        return response
+
+
+# ============================================================================
+# Django admin
+# ============================================================================
+
+class AuditedModelAdmin:
+    """ModelAdmin mixin recording admin additions, changes and deletions"""
+
+    def log_addition(self, request, obj, message):
+        record('admin.add', obj, actor=request.user, changes={'message': message})
+        return super().log_addition(request, obj, message)
+
+    def log_change(self, request, obj, message):
+        record('admin.change', obj, actor=request.user, changes={'message': message})
+        return super().log_change(request, obj, message)
+
+    def log_deletions(self, request, queryset):
+        for obj in queryset:
+            record('admin.delete', obj, actor=request.user)
+        return super().log_deletions(request, queryset)
@@ -0,0 +1,25 @@
+# ============================================================================
+# backends.py - Authentication Backends
+# ============================================================================
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.backends import ModelBackend
+
+UserModel = get_user_model()
+
+# Reverse one-to-one relations joined onto every authenticated user so the
+# profile and role row come back with the user in a single query.
+USER_ROLE_RELATIONS = ('profile', 'student_profile', 'officer_profile', 'lecturer_profile')
+
+
+class RoleAwareModelBackend(ModelBackend):
+    """Model backend that loads the user together with its profile and role row"""
+
+    def get_user(self, user_id):
+        try:
+            user = UserModel._default_manager.select_related(
+                *USER_ROLE_RELATIONS
+            ).get(pk=user_id)
+        except UserModel.DoesNotExist:
+            return None
+        return user if self.user_can_authenticate(user) else None
@@ -0,0 +1,143 @@
+# ============================================================================
+# cache.py - Read-Through Object Cache for Exam Applications
+# ============================================================================
+#
+# Each application is cached under a key that includes a version token.
+# Invalidation replaces the token, and a reader fills the key of the token
+# it saw before querying, so a reader that loaded the row before a commit
+# cannot put its stale copy back where later readers will find it.
+
+import uuid
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete, pre_delete
+from django.dispatch import receiver
+from django.http import Http404
+
+from .models import ExamApplication, Student, Lecturer, OCRResult, ExamMarking, Notification, UnitAssignment
+
+# Relations stored with each cached application
+APPLICATION_CACHE_RELATIONS = ('student', 'assigned_lecturer', 'ocr_result', 'marking')
+
+
+def _application_cache():
+    return caches[getattr(settings, 'APPLICATION_CACHE_ALIAS', 'default')]
+
+
+def application_version_key(app_id):
+    return f'exam_portal:application-version:{app_id}'
+
+
+def application_cache_key(app_id, version):
+    return f'exam_portal:application:{app_id}:{version}'
+
+
+def get_cached_application(app_id):
+    """Fetch an application by application_id, reading through the cache"""
+    cache = _application_cache()
+    version_key = application_version_key(app_id)
+    version = cache.get(version_key)
+    if version is None:
+        # A fresh token rather than a counter: an evicted token can't be reissued
+        cache.add(version_key, uuid.uuid4().hex, None)
+        version = cache.get(version_key)
+    key = application_cache_key(app_id, version)
+
+    application = cache.get(key)
+    if application is None:
+        application = ExamApplication.objects.select_related(
+            *APPLICATION_CACHE_RELATIONS
+        ).filter(application_id=app_id).first()
+        if application is not None:
+            cache.set(key, application)
+    return application
+
+
+def get_application_or_404(app_id, **ownership):
+    """
+    Cached lookup that raises Http404 when the application does not exist
+    or any ``ownership`` attribute (e.g. ``student_id=...``) does not match.
+    """
+    application = get_cached_application(app_id)
+    if application is None:
+        raise Http404('No ExamApplication matches the given query.')
+
+    for attr, value in ownership.items():
+        if getattr(application, attr) != value:
+            raise Http404('No ExamApplication matches the given query.')
+    return application
+
+
+def invalidate_applications(app_ids):
+    """Drop cached applications once the current transaction commits"""
+    keys = [application_version_key(app_id) for app_id in app_ids]
+    if keys:
+        # Copies cached under the old versions expire on their own
+        transaction.on_commit(lambda: _application_cache().set_many(
+            {key: uuid.uuid4().hex for key in keys}, None
+        ))
+
+
+# ============================================================================
+# SIGNALS - Invalidate on writes to cached models
+# ============================================================================
+# Student and Lecturer use pre_delete: by post_delete the cascade / SET_NULL
+# has already detached the applications that need invalidating.
+
+@receiver(post_save, sender=ExamApplication)
+@receiver(post_delete, sender=ExamApplication)
+def invalidate_application(sender, instance, **kwargs):
+    invalidate_applications([instance.application_id])
+
+
+@receiver(post_save, sender=OCRResult)
+@receiver(post_delete, sender=OCRResult)
+@receiver(post_save, sender=ExamMarking)
+@receiver(post_delete, sender=ExamMarking)
+def invalidate_application_child(sender, instance, **kwargs):
+    invalidate_applications(
+        ExamApplication.objects.filter(pk=instance.application_id).values_list('application_id', flat=True)
+    )
+
+
+@receiver(post_save, sender=Student)
+@receiver(pre_delete, sender=Student)
+def invalidate_student_applications(sender, instance, **kwargs):
+    invalidate_applications(
+        ExamApplication.objects.filter(student_id=instance.pk).values_list('application_id', flat=True)
+    )
+
+
+@receiver(post_save, sender=Lecturer)
+@receiver(pre_delete, sender=Lecturer)
+def invalidate_lecturer_applications(sender, instance, **kwargs):
+    invalidate_applications(
+        ExamApplication.objects.filter(assigned_lecturer_id=instance.pk).values_list('application_id', flat=True)
+    )
+
+
+# ============================================================================
+# Deletion stamps
+# ============================================================================
+# A deleted row leaves no newer updated_at behind, so the API's collection
+# ETags (api.py) also include a token that changes on every deletion.
+
+def deletion_stamp_key(model):
+    return f'exam_portal:deletions:{model._meta.label_lower}'
+
+
+def deletion_stamp(model):
+    """Token that changes whenever a ``model`` row is deleted"""
+    return _application_cache().get(deletion_stamp_key(model))
+
+
+@receiver(post_delete, sender=ExamApplication)
+@receiver(post_delete, sender=ExamMarking)
+@receiver(post_delete, sender=Notification)
+@receiver(post_delete, sender=UnitAssignment)
+def stamp_deletion(sender, instance, **kwargs):
+    # A fresh value rather than a counter: concurrent deletions can't lose it
+    key = deletion_stamp_key(sender)
+    transaction.on_commit(lambda: _application_cache().set(key, uuid.uuid4().hex, None))
@@ -0,0 +1,137 @@
+# ============================================================================
+# decorators.py - Role Resolution & Access Decorators
+# ============================================================================
+
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.contrib import messages
+from django.contrib.auth.decorators import login_required
+from django.core.exceptions import ObjectDoesNotExist
+from django.http import JsonResponse
+from django.shortcuts import redirect
+
+ROLE_SESSION_KEY = '_exam_portal_role'
+
+# Role -> attribute on User holding the role row
+ROLE_PROFILE_ATTRS = {
+    'student': 'student_profile',
+    'officer': 'officer_profile',
+    'lecturer': 'lecturer_profile',
+}
+
+# Role -> URL name of the role's dashboard
+ROLE_DASHBOARDS = {
+    'admin': 'admin_dashboard',
+    'student': 'student_dashboard',
+    'officer': 'officer_dashboard',
+    'lecturer': 'lecturer_dashboard',
+}
+
+# Role -> (message, redirect URL name) used when access is refused
+ROLE_DENIED = {
+    'admin': ('Access denied.', 'dashboard_redirect'),
+    'student': ('Student profile not found.', 'login'),
+    'officer': ('Officer profile not found.', 'login'),
+    'lecturer': ('Lecturer profile not found.', 'login'),
+}
+
+
+def resolve_user_role(user):
+    """Work out the role of a user from the profile rows joined onto it"""
+    if user.is_superuser or user.is_staff:
+        return 'admin'
+
+    try:
+        user_type = user.profile.user_type
+    except ObjectDoesNotExist:
+        return None
+
+    attr = ROLE_PROFILE_ATTRS.get(user_type)
+    if attr is None or not hasattr(user, attr):
+        return None
+    return user_type
+
+
+def get_user_role(request):
+    """Return the role of the logged in user, cached in the session"""
+    if not request.user.is_authenticated:
+        return None
+
+    role = request.session.get(ROLE_SESSION_KEY)
+    if role is None:
+        role = resolve_user_role(request.user)
+        if role is not None:
+            request.session[ROLE_SESSION_KEY] = role
+    return role
+
+
+def role_dashboard_url(request):
+    """URL name of the dashboard for the logged in user, or None"""
+    return ROLE_DASHBOARDS.get(get_user_role(request))
+
+
+def authorize_role(request, roles):
+    """
+    True if the logged in user holds one of ``roles``. The matched role is
+    set as ``request.role`` and, for non-admin roles, the role row is
+    attached to the request as ``request.role_profile``.
+    """
+    role = get_user_role(request)
+    if role in roles:
+        request.role = role
+        if role == 'admin':
+            if request.user.is_superuser or request.user.is_staff:
+                return True
+        else:
+            try:
+                request.role_profile = getattr(request.user, ROLE_PROFILE_ATTRS[role])
+            except ObjectDoesNotExist:
+                pass
+            else:
+                return True
+        # The cached role no longer matches the user's rows
+        request.session.pop(ROLE_SESSION_KEY, None)
+    return False
+
+
+def role_required(*roles):
+    """Restrict a view, sync or async, to one or more roles (see authorize_role)"""
+    def denied(request):
+        # Views shared by several roles use the generic denial
+        message, url_name = ROLE_DENIED[roles[0] if len(roles) == 1 else 'admin']
+        messages.error(request, message)
+        return redirect(url_name)
+
+    def decorator(view_func):
+        if iscoroutinefunction(view_func):
+            @login_required
+            @wraps(view_func)
+            async def _async_wrapped_view(request, *args, **kwargs):
+                if await sync_to_async(authorize_role)(request, roles):
+                    return await view_func(request, *args, **kwargs)
+                return await sync_to_async(denied)(request)
+            return _async_wrapped_view
+
+        @login_required
+        @wraps(view_func)
+        def _wrapped_view(request, *args, **kwargs):
+            if authorize_role(request, roles):
+                return view_func(request, *args, **kwargs)
+            return denied(request)
+        return _wrapped_view
+    return decorator
+
+
+def api_role_required(*roles):
+    """role_required for JSON endpoints: 401 / 403 instead of redirects"""
+    def decorator(view_func):
+        @wraps(view_func)
+        def _wrapped_view(request, *args, **kwargs):
+            if not request.user.is_authenticated:
+                return JsonResponse({'error': 'authentication required'}, status=401)
+            if authorize_role(request, roles):
+                return view_func(request, *args, **kwargs)
+            return JsonResponse({'error': 'permission denied'}, status=403)
+        return _wrapped_view
+    return decorator
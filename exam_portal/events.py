@@ -0,0 +1,208 @@
+# ============================================================================
+# events.py - Application Status Event Log and Stage Latency
+# ============================================================================
+#
+# Every status transition appends one ApplicationStatusEvent recording the
+# previous and new status, the acting user and how long the application
+# spent in the previous status:
+#   - ExamApplication.save() (views, admin forms) through the signals at the
+#     end of models.py, which stamp status_changed_at in the same UPDATE so
+#     the only extra write is the event INSERT;
+#   - bulk paths through transition_applications(), which updates the rows
+#     and bulk-inserts their events in one transaction.
+# QuerySet.update(status=...) bypasses both and must not be used.
+#
+# Stage latency is rolled up incrementally: update_stage_latency() folds
+# events past a RollupCursor into log-scaled histograms (StageLatencyBucket)
+# per school, officer (who closed the stay) and lecturer (assigned), from
+# which stage_latency() reads percentiles to within about 5%.
+
+import math
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+
+_actor_request = ContextVar('status_actor_request', default=None)
+
+# Histogram buckets grow by this factor; percentiles are bucket midpoints
+BUCKET_GROWTH = 1.1
+ROLLUP_BATCH_SIZE = 5000
+ROLLUP_CURSOR = 'stage_latency'
+
+
+def current_actor_id():
+    """Primary key of the user making the current request, if any"""
+    request = _actor_request.get()
+    user = getattr(request, 'user', None)
+    return user.pk if user is not None and user.is_authenticated else None
+
+
+class StatusActorMiddleware:
+    """Make the request's user available to the status event signals"""
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        token = _actor_request.set(request)
+        try:
+            return self.get_response(request)
+        finally:
+            _actor_request.reset(token)
+
+    async def __acall__(self, request):
+        # Context variables are copied into sync_to_async threads, so the
+        # signals see the request there too
+        token = _actor_request.set(request)
+        try:
+            return await self.get_response(request)
+        finally:
+            _actor_request.reset(token)
+
+
+def transition_applications(applications, status, actor=None):
+    """
+    Move every application in the ``applications`` queryset to ``status``,
+    logging one event each. Returns the number of applications changed.
+    """
+    from django.db import transaction
+    from django.utils import timezone
+    from .cache import invalidate_applications
+    from .models import ApplicationStatusEvent, ExamApplication
+
+    actor_id = actor.pk if actor is not None else current_actor_id()
+    with transaction.atomic():
+        rows = list(
+            applications.select_for_update().exclude(status=status)
+            .values_list('pk', 'application_id', 'status', 'status_changed_at')
+        )
+        if not rows:
+            return 0
+        now = timezone.now()
+        ExamApplication.objects.filter(pk__in=[pk for pk, _, _, _ in rows]).update(
+            status=status, status_changed_at=now, updated_at=now
+        )
+        ApplicationStatusEvent.objects.bulk_create([
+            ApplicationStatusEvent(
+                application_id=pk,
+                from_status=previous,
+                to_status=status,
+                actor_id=actor_id,
+                seconds_in_status=(now - changed_at).total_seconds() if changed_at else None,
+                created_at=now,
+            )
+            for pk, _, previous, changed_at in rows
+        ], batch_size=1000)
+        invalidate_applications([app_id for _, app_id, _, _ in rows])
+    return len(rows)
+
+
+# ============================================================================
+# Stage latency
+# ============================================================================
+
+def latency_bucket(seconds):
+    return 0 if seconds < 1 else int(math.log(seconds, BUCKET_GROWTH)) + 1
+
+
+def bucket_seconds(bucket):
+    """Representative duration of a bucket (its geometric midpoint)"""
+    return 0.5 if bucket == 0 else BUCKET_GROWTH ** (bucket - 0.5)
+
+
+def update_stage_latency(batch_size=ROLLUP_BATCH_SIZE):
+    """Fold status events logged since the last call into the histograms"""
+    from collections import Counter
+    from django.db import transaction
+    from .models import ApplicationStatusEvent, RollupCursor, StageLatencyBucket
+
+    folded = 0
+    while True:
+        with transaction.atomic():
+            RollupCursor.objects.get_or_create(name=ROLLUP_CURSOR)
+            cursor = RollupCursor.objects.select_for_update().get(name=ROLLUP_CURSOR)
+            events = list(
+                ApplicationStatusEvent.objects.filter(pk__gt=cursor.position).order_by('pk')
+                .values_list('pk', 'from_status', 'seconds_in_status', 'application__student__school',
+                             'actor__officer_profile__officer_id',
+                             'application__assigned_lecturer__lecturer_id')[:batch_size]
+            )
+            if not events:
+                return folded
+
+            deltas = Counter()
+            for _, status, seconds, school, officer_id, lecturer_id in events:
+                if not status or seconds is None:
+                    continue
+                bucket = latency_bucket(seconds)
+                deltas['school', school or 'unknown', status, bucket] += 1
+                if officer_id:
+                    deltas['officer', officer_id, status, bucket] += 1
+                if lecturer_id:
+                    deltas['lecturer', lecturer_id, status, bucket] += 1
+
+            existing = {
+                (row.scope, row.scope_key, row.status, row.bucket): row
+                for row in StageLatencyBucket.objects.filter(
+                    scope_key__in={key[1] for key in deltas}, status__in={key[2] for key in deltas}
+                )
+            }
+            updated, created = [], []
+            for key, count in deltas.items():
+                row = existing.get(key)
+                if row is None:
+                    scope, scope_key, status, bucket = key
+                    created.append(StageLatencyBucket(scope=scope, scope_key=scope_key, status=status,
+                                                      bucket=bucket, count=count))
+                else:
+                    row.count += count
+                    updated.append(row)
+            StageLatencyBucket.objects.bulk_update(updated, ['count'], batch_size=1000)
+            StageLatencyBucket.objects.bulk_create(created, batch_size=1000)
+
+            cursor.position = events[-1][0]
+            cursor.save(update_fields=['position', 'updated_at'])
+            folded += len(events)
+
+
+def _histogram_percentile(buckets, total, p):
+    target = max(1, math.ceil(total * p / 100))
+    seen = 0
+    for bucket, count in buckets:
+        seen += count
+        if seen >= target:
+            return round(bucket_seconds(bucket), 1)
+    return None
+
+
+def stage_latency(scope=None, percentiles=(50, 90, 99)):
+    """
+    ``{scope: {key: {status: {'count': n, 'p50': seconds, ...}}}}`` from
+    the histograms; call update_stage_latency() first to include new events.
+    """
+    from collections import defaultdict
+    from .models import StageLatencyBucket
+
+    rows = StageLatencyBucket.objects.order_by('scope', 'scope_key', 'status', 'bucket')
+    if scope:
+        rows = rows.filter(scope=scope)
+    histograms = defaultdict(list)
+    for row_scope, key, status, bucket, count in rows.values_list(
+            'scope', 'scope_key', 'status', 'bucket', 'count'):
+        histograms[row_scope, key, status].append((bucket, count))
+
+    report = defaultdict(lambda: defaultdict(dict))
+    for (row_scope, key, status), buckets in histograms.items():
+        total = sum(count for _, count in buckets)
+        report[row_scope][key][status] = {
+            'count': total,
+            **{f'p{p}': _histogram_percentile(buckets, total, p) for p in percentiles},
+        }
+    return {row_scope: dict(keys) for row_scope, keys in report.items()}
@@ -6,6 +6,8 @@ from django import forms
 from django.contrib.auth.models import User
 from django.core.exceptions import ValidationError
 from .models import *
+from .ingest import image_error
+from .uploads import document_error
 import random
 import string
 
@@ -291,14 +293,12 @@ class ExamApplicationForm(forms.ModelForm):
     def clean_supporting_document(self):
         document = self.cleaned_data.get('supporting_document')
         if document:
-            # Validate file size (max 5MB)
-            if document.size > 5 * 1024 * 1024:
-                raise ValidationError('File size must not exceed 5MB.')
-            
-            # Validate file type
-            allowed_types = ['application/pdf', 'image/jpeg', 'image/png', 'image/jpg']
-            if document.content_type not in allowed_types:
-                raise ValidationError('Only PDF and image files (JPG, PNG) are allowed.')
+            # Size and type (by magic bytes) were checked while uploading
+            # Images are also decoded, so a corrupt body fails here and
+            # not when ingest recompresses it
+            error = document_error(document) or image_error(document)
+            if error:
+                raise ValidationError(error)
         
         return document
 
@@ -360,4 +360,20 @@ class UnitAssignmentForm(forms.ModelForm):
             'year': forms.NumberInput(attrs={'class': 'form-control'}),
             'semester': forms.Select(attrs={'class': 'form-control'}, choices=[('1', 'Semester 1'), ('2', 'Semester 2')]),
             'active': forms.CheckboxInput(attrs={'class': 'form-check-input'}),
-        }
\ No newline at end of file
+        }
+
+# ============================================================================
+# REPORT FORMS
+# ============================================================================
+
+class ReportRequestForm(forms.ModelForm):
+    """Form for admins to request a PDF summary report"""
+    class Meta:
+        model = Report
+        fields = ['school', 'year_taken', 'semester_taken', 'exam_type']
+        widgets = {
+            'school': forms.Select(attrs={'class': 'form-control'}),
+            'year_taken': forms.NumberInput(attrs={'class': 'form-control', 'min': '2000'}),
+            'semester_taken': forms.Select(attrs={'class': 'form-control'}),
+            'exam_type': forms.Select(attrs={'class': 'form-control'}),
+        }
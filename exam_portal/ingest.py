@@ -0,0 +1,208 @@
+# ============================================================================
+# ingest.py - Image Normalization on Upload
+# ============================================================================
+#
+# Phone photos of documents arrive as 8-12 MB JPEGs/PNGs. Before an upload
+# is stored, images are
+#   - rotated per their EXIF orientation, then stripped of EXIF (GPS etc.)
+#   - downscaled so the page is at most MAX_DPI, assuming the long edge of
+#     the photo spans PAGE_INCHES (A4)
+#   - re-encoded as progressive JPEG at QUALITY
+# The smaller of the original and re-encoded bytes is kept, except that an
+# original carrying EXIF is never kept. PDFs pass through unchanged.
+# ExamApplicationForm decodes images first (image_error), so a file with a
+# valid header but a corrupt or truncated body is a form error, not a 500.
+# The decoded image is kept on the upload and re-encoded from there, so
+# each image is decoded once per request. Because they shrink before they
+# are stored, images may be uploaded up to DOCUMENT_UPLOADS['MAX_IMAGE_SIZE']
+# (uploads.py) rather than MAX_SIZE.
+#
+# NormalizedDocument records each original's hash, so a repeated upload
+# reuses the earlier result without decoding again, and the bytes saved per
+# document (see the document_savings command). Originals are kept in cold
+# storage under ORIGINALS_ROOT only when KEEP_ORIGINALS is set.
+#
+# Configure with settings.DOCUMENT_INGEST (merged over DEFAULTS).
+
+import io
+import os
+
+from django.core.files.base import ContentFile
+
+from . import metrics
+from .uploads import content_hash
+
+try:
+    from PIL import Image, ImageOps
+except ImportError:  # pragma: no cover - optional dependency
+    Image = ImageOps = None
+
+DEFAULTS = {
+    'RECOMPRESS_IMAGES': True,
+    'MAX_DPI': 200,
+    'PAGE_INCHES': 11.69,
+    'QUALITY': 80,
+    'KEEP_ORIGINALS': False,
+    'ORIGINALS_ROOT': None,
+}
+
+IMAGE_TYPES = ('image/jpeg', 'image/png')
+
+IMAGE_ERROR = 'The image could not be read; it may be damaged or incomplete.'
+
+# What Pillow raises for images it cannot decode
+DECODE_ERRORS = (OSError, SyntaxError, ValueError) + ((Image.DecompressionBombError,) if Image else ())
+
+INGEST_BYTES_SAVED = metrics.Counter('ingest_bytes_saved', 'Bytes saved by recompressing uploaded images')
+
+
+def ingest_config():
+    from django.conf import settings
+    return {**DEFAULTS, **getattr(settings, 'DOCUMENT_INGEST', {})}
+
+
+def recompresses(content_type):
+    """True if uploads of ``content_type`` are re-encoded before storage"""
+    return bool(ingest_config()['RECOMPRESS_IMAGES']) and Image is not None and content_type in IMAGE_TYPES
+
+
+def image_error(uploaded):
+    """
+    Validation message if an uploaded image cannot be decoded, or None. The
+    decoded image is kept as ``uploaded.decoded_image`` for ingest_document.
+    """
+    if Image is None or uploaded.content_type not in IMAGE_TYPES:
+        return None
+    uploaded.seek(0)
+    try:
+        uploaded.decoded_image = _decode(uploaded, ingest_config())
+    except DECODE_ERRORS:
+        return IMAGE_ERROR
+    finally:
+        uploaded.seek(0)
+    return None
+
+
+def _decode(source, config):
+    image = Image.open(source)
+    # JPEG decoders can scale by 1/2..1/8 while decoding; decode at the size
+    # recompress_image needs, not at full size
+    max_pixels = _max_pixels(config)
+    image.draft('RGB', (max_pixels, max_pixels))
+    image.load()
+    return image
+
+
+def ingest_document(uploaded):
+    """
+    Normalize an uploaded document before it is stored. Returns the file
+    to store (``uploaded`` itself for PDFs), or the storage name of an
+    identical document stored earlier, and its content hash.
+    """
+    from .models import NormalizedDocument
+
+    config = ingest_config()
+    original_hash = content_hash(uploaded)
+    # Decoded by image_error; not held past ingest
+    image, uploaded.decoded_image = getattr(uploaded, 'decoded_image', None), None
+    if not recompresses(uploaded.content_type):
+        return uploaded, original_hash
+
+    record = NormalizedDocument.objects.filter(original_hash=original_hash).first()
+    stored_name = _stored_name(record)
+    if stored_name is not None:
+        return stored_name, record.content_hash
+
+    uploaded.seek(0)
+    original = uploaded.read()
+    try:
+        data, had_exif = recompress_image(original, config, image)
+    except DECODE_ERRORS:
+        # Decoded in validation but could not be re-encoded: store as is
+        data, had_exif = original, False
+    if len(data) >= len(original) and not had_exif:
+        data = original
+    base_name = os.path.splitext(os.path.basename(uploaded.name))[0]
+    if data is original:
+        document = ContentFile(data, name=os.path.basename(uploaded.name))
+        document.content_type = uploaded.content_type
+    else:
+        document = ContentFile(data, name=f'{base_name}.jpg')
+        document.content_type = 'image/jpeg'
+    document.content_hash = content_hash(document)
+
+    cold_name = _keep_original(original, original_hash, uploaded.name, config)
+    NormalizedDocument.objects.update_or_create(
+        original_hash=original_hash,
+        defaults={
+            'content_hash': document.content_hash,
+            'original_size': len(original),
+            'stored_size': len(data),
+            'original_name': cold_name,
+        },
+    )
+    INGEST_BYTES_SAVED.inc(len(original) - len(data))
+    return document, document.content_hash
+
+
+def _max_pixels(config):
+    """Long edge, in pixels, of a page at MAX_DPI"""
+    return int(config['MAX_DPI'] * config['PAGE_INCHES'])
+
+
+def recompress_image(data, config, image=None):
+    """
+    Re-encode image bytes, or ``image`` if they were already decoded by
+    image_error; returns ``(jpeg_bytes, had_exif)``
+    """
+    max_pixels = _max_pixels(config)
+    if image is None:
+        image = _decode(io.BytesIO(data), config)
+    with image:
+        had_exif = bool(image.getexif())
+        icc_profile = image.info.get('icc_profile')
+        image = ImageOps.exif_transpose(image)
+        if image.mode in ('RGBA', 'LA', 'P'):
+            image = image.convert('RGBA')
+            background = Image.new('RGB', image.size, 'white')
+            background.paste(image, mask=image.getchannel('A'))
+            image = background
+        elif image.mode not in ('RGB', 'L'):
+            image = image.convert('RGB')
+        image.thumbnail((max_pixels, max_pixels), Image.LANCZOS)
+
+        output = io.BytesIO()
+        # No exif= argument, so EXIF is dropped; the colour profile is kept
+        image.save(output, 'JPEG', quality=config['QUALITY'], optimize=True, progressive=True,
+                   dpi=(config['MAX_DPI'], config['MAX_DPI']), icc_profile=icc_profile)
+    return output.getvalue(), had_exif
+
+
+def _stored_name(record):
+    """Storage name of the normalized document for ``record``, if still stored"""
+    if record is None:
+        return None
+    from django.utils import timezone
+    from .models import ExamApplication, StoredDocument
+
+    entry = StoredDocument.objects.filter(content_hash=record.content_hash).first()
+    storage = ExamApplication._meta.get_field('supporting_document').storage
+    if entry is None or not storage.materialize(entry.name):
+        return None
+    # Touch so prune_documents' grace period covers this new reference
+    StoredDocument.objects.filter(pk=entry.pk).update(updated_at=timezone.now())
+    return entry.name
+
+
+def _keep_original(data, original_hash, name, config):
+    """Write the untouched original to cold storage if configured"""
+    if not config['KEEP_ORIGINALS'] or not config['ORIGINALS_ROOT']:
+        return ''
+    from django.core.files.storage import FileSystemStorage
+
+    storage = FileSystemStorage(location=config['ORIGINALS_ROOT'])
+    extension = os.path.splitext(name)[1].lower()
+    cold_name = f'{original_hash[:2]}/{original_hash[2:4]}/{original_hash}{extension}'
+    if not storage.exists(cold_name):
+        storage.save(cold_name, ContentFile(data))
+    return cold_name
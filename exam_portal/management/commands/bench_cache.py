@@ -0,0 +1,99 @@
+# ============================================================================
+# exam_portal/management/commands/bench_cache.py
+# Benchmark the shared SQLite cache against LocMemCache and DatabaseCache
+# ============================================================================
+
+import os
+import shutil
+import tempfile
+import time
+
+from django.conf import settings
+from django.core.cache.backends.db import DatabaseCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.management.base import BaseCommand
+from django.core.management.commands.createcachetable import Command as CreateCacheTable
+from django.db import connections
+from django.test.utils import override_settings
+
+from exam_portal.sqlite_cache import SQLiteCache
+
+BENCH_TABLE = 'exam_portal_bench_cache'
+# Throwaway SQLite database holding the DatabaseCache table
+BENCH_DATABASE = 'bench_cache'
+
+
+class BenchCacheRouter:
+    """Sends DatabaseCache queries to the throwaway database"""
+
+    def db_for_read(self, model, **hints):
+        return BENCH_DATABASE if model._meta.app_label == 'django_cache' else None
+
+    db_for_write = db_for_read
+
+
+class Command(BaseCommand):
+    help = 'Benchmarks the SQLite cache backend against LocMemCache and DatabaseCache'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--ops', type=int, default=5000, help='Operations per measurement')
+        parser.add_argument('--value-size', type=int, default=1024, help='Value size in bytes')
+
+    def handle(self, *args, **options):
+        ops = options['ops']
+        value = os.urandom(options['value_size'])
+        params = {'TIMEOUT': 300, 'OPTIONS': {'MAX_ENTRIES': ops * 2}}
+
+        tmpdir = tempfile.mkdtemp()
+        databases = {**settings.DATABASES,
+                     BENCH_DATABASE: {'ENGINE': 'django.db.backends.sqlite3',
+                                      'NAME': os.path.join(tmpdir, 'db_cache.sqlite3')}}
+        connections.settings[BENCH_DATABASE] = connections.configure_settings(databases)[BENCH_DATABASE]
+        create = CreateCacheTable()
+        create.verbosity = 0
+        create.create_table(BENCH_DATABASE, BENCH_TABLE, False)
+        backends = [
+            ('locmem', LocMemCache('bench', params)),
+            ('db', DatabaseCache(BENCH_TABLE, params)),
+            ('sqlite', SQLiteCache(os.path.join(tmpdir, 'bench.sqlite3'), params)),
+        ]
+
+        self.stdout.write(f'{ops} ops per measurement, {len(value)} byte values (us/op)')
+        self.stdout.write(f"{'backend':<10}{'set':>10}{'get hit':>10}{'get miss':>10}{'incr':>10}")
+        try:
+            with override_settings(DATABASE_ROUTERS=[BenchCacheRouter()]):
+                for name, cache in backends:
+                    results = self.run(cache, ops, value)
+                    self.stdout.write(f'{name:<10}' + ''.join(f'{r:>10.1f}' for r in results))
+        finally:
+            connections[BENCH_DATABASE].close()
+            del connections[BENCH_DATABASE]
+            del connections.settings[BENCH_DATABASE]
+            shutil.rmtree(tmpdir, ignore_errors=True)
+
+    def run(self, cache, ops, value):
+        keys = [f'bench:{i}' for i in range(ops)]
+        cache.clear()
+
+        start = time.perf_counter()
+        for key in keys:
+            cache.set(key, value)
+        set_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        for key in keys:
+            cache.get(key)
+        hit_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        for key in keys:
+            cache.get(key + ':missing')
+        miss_time = time.perf_counter() - start
+
+        cache.set('bench:counter', 0)
+        start = time.perf_counter()
+        for _ in range(ops):
+            cache.incr('bench:counter')
+        incr_time = time.perf_counter() - start
+
+        return [t / ops * 1e6 for t in (set_time, hit_time, miss_time, incr_time)]
@@ -0,0 +1,181 @@
+# ============================================================================
+# exam_portal/management/commands/bench_dashboards.py
+# Benchmark dashboard aggregates run one after another vs concurrently
+# ============================================================================
+
+import asyncio
+import threading
+import time
+
+from django.conf import settings
+from django.contrib.auth import BACKEND_SESSION_KEY, HASH_SESSION_KEY, SESSION_KEY
+from django.contrib.auth.models import User
+from django.contrib.sessions.backends.db import SessionStore
+from django.core.handlers.asgi import ASGIHandler
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.db.backends.signals import connection_created
+from django.db.models import Count
+from django.test.utils import override_settings
+from django.urls import reverse
+
+from exam_portal import views
+from exam_portal.decorators import ROLE_SESSION_KEY
+from exam_portal.models import ExamApplication, ExamOfficer, Lecturer, Student
+from exam_portal.querypool import query_pool_config
+
+
+class Command(BaseCommand):
+    help = ('Benchmarks the dashboard aggregates run one after another (as the sync views did) against '
+            'the concurrent query pool, on the rows already in the database')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeat', type=int, default=5, help='Timed runs per measurement (best is shown)')
+        parser.add_argument('--round-trip', type=float, default=0,
+                            help='Milliseconds of network latency added to every query, to model a '
+                                 'database server reached over the network from an in-process SQLite')
+        parser.add_argument('--asgi', action='store_true',
+                            help='Time whole dashboard requests through an in-process ASGI handler, '
+                                 'middleware and rendering included, instead of the aggregates alone')
+        parser.add_argument('--concurrency', type=int, default=8,
+                            help='Simultaneous requests in --asgi mode')
+
+    def handle(self, *args, **options):
+        if options['round_trip']:
+            self.add_round_trip(options['round_trip'] / 1000)
+
+        # Queries run on pool threads and only see committed rows, so this
+        # measures the data already in the database rather than seeding any
+        student = Student.objects.annotate(n=Count('applications')).order_by('-n').first()
+        lecturer = Lecturer.objects.annotate(n=Count('assigned_applications')).order_by('-n').first()
+        dashboards = [
+            ('admin', lambda: views._admin_dashboard_stats()),
+            ('officer', lambda: views._officer_dashboard_stats()),
+        ]
+        if student is not None:
+            dashboards.append(('student', lambda: views._student_dashboard_data(student)))
+        if lecturer is not None:
+            dashboards.append(('lecturer', lambda: views._lecturer_dashboard_data(lecturer)))
+
+        if options['asgi']:
+            users = [
+                ('admin', User.objects.filter(is_superuser=True).first()),
+                ('officer', getattr(ExamOfficer.objects.first(), 'user', None)),
+                ('student', getattr(student, 'user', None)),
+                ('lecturer', getattr(lecturer, 'user', None)),
+            ]
+            self.asgi(options, [(role, user) for role, user in users if user is not None])
+            return
+
+        workers = query_pool_config()['MAX_WORKERS']
+        self.stdout.write(f'{ExamApplication.objects.count()} applications on {connection.vendor} '
+                          f'(+{options["round_trip"]:g} ms per query); pool of {workers} workers '
+                          f'(ms, best of {options["repeat"]})')
+        self.stdout.write(f"{'dashboard':<12}{'sequential':>12}{'concurrent':>12}{'speedup':>10}")
+        for name, compute in dashboards:
+            with override_settings(QUERY_POOL={**getattr(settings, 'QUERY_POOL', {}), 'MAX_WORKERS': 0}):
+                sequential = self.best(options['repeat'], compute)
+            concurrent = self.best(options['repeat'], compute)
+            self.stdout.write(f'{name:<12}{sequential * 1000:>12.1f}{concurrent * 1000:>12.1f}'
+                              f'{sequential / concurrent:>9.1f}x')
+        self.stdout.write(self.style.SUCCESS('✓ Benchmark complete'))
+
+    def asgi(self, options, users):
+        sessions = [self.session(role, user) for role, user in users]
+        workers = query_pool_config()['MAX_WORKERS']
+        self.stdout.write(
+            f'{ExamApplication.objects.count()} applications on {connection.vendor} '
+            f'(+{options["round_trip"]:g} ms per query); {options["concurrency"]} concurrent requests through '
+            f'ASGIHandler, aggregates not cached; pool of {workers} workers (best of {options["repeat"]})'
+        )
+        self.stdout.write(f"{'dashboard':<12}{'sequential':>14}{'concurrent':>14}{'threads':>9}")
+        try:
+            # Every request computes its aggregates instead of reading the
+            # single-flight cache
+            with override_settings(DASHBOARD_CACHE_TIMEOUT=0):
+                for (role, _user), session in zip(users, sessions):
+                    path = reverse(f'{role}_dashboard')
+                    with override_settings(QUERY_POOL={**getattr(settings, 'QUERY_POOL', {}), 'MAX_WORKERS': 0}):
+                        sequential, _ = self.best_asgi(options, path, session)
+                    concurrent, threads = self.best_asgi(options, path, session)
+                    self.stdout.write(f'{role:<12}{sequential:>10.1f} r/s{concurrent:>10.1f} r/s{threads:>9}')
+        finally:
+            for session in sessions:
+                session.delete()
+        self.stdout.write(self.style.SUCCESS('✓ Benchmark complete'))
+
+    @staticmethod
+    def session(role, user):
+        # With the role cached the dashboards never write the session
+        session = SessionStore()
+        session[SESSION_KEY] = str(user.pk)
+        session[BACKEND_SESSION_KEY] = settings.AUTHENTICATION_BACKENDS[0]
+        session[HASH_SESSION_KEY] = user.get_session_auth_hash()
+        session[ROLE_SESSION_KEY] = role
+        session.create()
+        return session
+
+    def best_asgi(self, options, path, session):
+        """Best requests/s over the runs, and the threads alive at the end"""
+        cookie = f'{settings.SESSION_COOKIE_NAME}={session.session_key}'.encode()
+        scope = {
+            'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1', 'method': 'GET',
+            'scheme': 'http', 'path': path, 'raw_path': path.encode(), 'query_string': b'', 'root_path': '',
+            'headers': [(b'host', b'testserver'), (b'cookie', cookie)],
+            'client': ('127.0.0.1', 40000), 'server': ('testserver', 80),
+        }
+
+        async def request(handler):
+            statuses = []
+            body = [{'type': 'http.request', 'body': b'', 'more_body': False}]
+
+            async def receive():
+                if body:
+                    return body.pop()
+                # The client stays connected; Django cancels this wait
+                await asyncio.Event().wait()
+
+            async def send(message):
+                if message['type'] == 'http.response.start':
+                    statuses.append(message['status'])
+
+            await handler(dict(scope), receive, send)
+            if statuses != [200]:
+                raise RuntimeError(f'{path} answered {statuses}')
+
+        async def run():
+            handler = ASGIHandler()
+            # Warm up connections and the query pool
+            await asyncio.gather(*(request(handler) for _ in range(options['concurrency'])))
+            rates = []
+            for _ in range(options['repeat']):
+                started = time.perf_counter()
+                await asyncio.gather(*(request(handler) for _ in range(options['concurrency'])))
+                rates.append(options['concurrency'] / (time.perf_counter() - started))
+            return max(rates), threading.active_count()
+
+        return asyncio.run(run())
+
+    @staticmethod
+    def add_round_trip(delay):
+        def wrapper(execute, sql, params, many, context):
+            time.sleep(delay)
+            return execute(sql, params, many, context)
+
+        def install(sender, connection, **kwargs):
+            # First, so execute_wrapper() blocks still pop their own wrapper
+            connection.execute_wrappers.insert(0, wrapper)
+
+        # Every connection opened from here on, in any thread
+        connection_created.connect(install, weak=False)
+        connection.close()
+
+    @staticmethod
+    def best(repeat, compute):
+        compute()  # warm up connections and caches
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            compute()
+            timings.append(time.perf_counter() - started)
+        return min(timings)
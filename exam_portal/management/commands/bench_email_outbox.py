@@ -0,0 +1,176 @@
+# ============================================================================
+# exam_portal/management/commands/bench_email_outbox.py
+# Benchmark outbox delivery against a local SMTP stand-in
+# ============================================================================
+
+import random
+import socketserver
+import threading
+import time
+
+from django.contrib.auth.models import User
+from django.core.mail import EmailMessage, get_connection
+from django.core.management.base import BaseCommand
+from django.test.utils import override_settings
+
+from exam_portal.models import EmailOutbox, Student
+from exam_portal.notifications import notify_student
+from exam_portal.outbox import claim_batch, outbox_config, send_batch
+
+USERNAME_PREFIX = 'bench_mail_'
+
+
+class SMTPStandIn(socketserver.ThreadingTCPServer):
+    """Minimal SMTP sink: accepts and discards mail, optionally failing some"""
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, latency, fail_rate):
+        super().__init__(('127.0.0.1', 0), SMTPHandler)
+        self.latency = latency
+        self.fail_rate = fail_rate
+        self.lock = threading.Lock()
+        self.connections = self.messages = self.refused = 0
+
+
+class SMTPHandler(socketserver.StreamRequestHandler):
+    def reply(self, line):
+        if self.server.latency:
+            time.sleep(self.server.latency)
+        self.wfile.write(line.encode() + b'\r\n')
+
+    def handle(self):
+        with self.server.lock:
+            self.server.connections += 1
+        self.reply('220 stand-in ESMTP')
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            command = line[:4].upper()
+            if command == b'EHLO':
+                self.reply('250-stand-in\r\n250 8BITMIME')
+            elif command == b'DATA':
+                self.reply('354 End data with <CR><LF>.<CR><LF>')
+                while self.rfile.readline() not in (b'.\r\n', b''):
+                    pass
+                with self.server.lock:
+                    refused = random.random() < self.server.fail_rate
+                    if refused:
+                        self.server.refused += 1
+                    else:
+                        self.server.messages += 1
+                self.reply('451 Try again later' if refused else '250 OK')
+            elif command == b'QUIT':
+                self.reply('221 Bye')
+                return
+            else:
+                # HELO, MAIL, RCPT, RSET, NOOP
+                self.reply('250 OK')
+
+
+class Command(BaseCommand):
+    help = ('Benchmarks the email outbox worker against one connection per notification, '
+            'using an in-process SMTP stand-in and synthetic students (removed afterwards)')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--students', type=int, default=500, help='Synthetic recipients')
+        parser.add_argument('--per-student', type=int, default=2,
+                            help='Notifications queued per student, coalesced into digests')
+        parser.add_argument('--batch-size', type=int, default=100, help='Outbox rows claimed per batch')
+        parser.add_argument('--latency', type=float, default=2.0,
+                            help='Milliseconds the stand-in waits before each reply')
+        parser.add_argument('--fail-rate', type=float, default=0.05,
+                            help='Share of messages the stand-in refuses with a 451')
+
+    def handle(self, *args, **options):
+        server = SMTPStandIn(options['latency'] / 1000, options['fail_rate'])
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        host, port = server.server_address
+        backend = 'django.core.mail.backends.smtp.EmailBackend'
+
+        def connection():
+            return get_connection(backend, host=host, port=port, username='', password='',
+                                  use_tls=False, use_ssl=False, fail_silently=False, timeout=10)
+
+        # Due at once, retried at once
+        config = {**outbox_config(), 'DIGEST_DELAY': 0, 'RETRY_BACKOFF': 0}
+        try:
+            with override_settings(EMAIL_OUTBOX=config):
+                rows = self.seed(options['students'], options['per_student'])
+                self.stdout.write(
+                    f'Queued {rows} emails for {options["students"]} students; stand-in replies after '
+                    f'{options["latency"]:g} ms and refuses {options["fail_rate"]:.0%} of messages'
+                )
+                self.inline(server, connection)
+                self.worker(server, connection, options['batch_size'])
+        finally:
+            server.shutdown()
+            server.server_close()
+            self.cleanup()
+        self.stdout.write(self.style.SUCCESS('✓ Benchmark complete; synthetic students removed'))
+
+    def seed(self, students, per_student):
+        self.cleanup()
+        users = User.objects.bulk_create(
+            [User(username=f'{USERNAME_PREFIX}{i}', password='!') for i in range(students)], batch_size=1000
+        )
+        created = Student.objects.bulk_create([
+            Student(user=user, registration_number=f'MAIL/{i:06d}', first_name='Mail', last_name=str(i),
+                    email=f'mail_{i}@example.com')
+            for i, user in enumerate(users)
+        ], batch_size=1000)
+        for round_number in range(per_student):
+            for student in created:
+                notify_student(student, f'Update {round_number + 1}', 'Your application status has changed.')
+        return EmailOutbox.objects.filter(to_email__startswith='mail_').count()
+
+    def cleanup(self):
+        # Cascades to the students, notifications and outbox rows
+        User.objects.filter(username__startswith=USERNAME_PREFIX).delete()
+
+    def inline(self, server, connection):
+        """What sending from the view would do: a connection per notification"""
+        rows = list(EmailOutbox.objects.filter(to_email__startswith='mail_', status='pending'))
+        before = server.connections
+        started = time.perf_counter()
+        failed = 0
+        for row in rows:
+            try:
+                connection().send_messages([EmailMessage(row.subject, row.body, None, [row.to_email])])
+            except Exception:
+                failed += 1
+        elapsed = time.perf_counter() - started
+        self.stdout.write(
+            f'{"inline":<8}{len(rows) - failed} of {len(rows)} notifications in {elapsed:.2f}s '
+            f'({(len(rows) - failed) / elapsed:.0f} notifications/s) over {server.connections - before} '
+            f'connections; {failed} lost to refusals'
+        )
+
+    def worker(self, server, connection, batch_size):
+        """run_email_workers: batches over one connection, digests and retries"""
+        before_connections, before_messages = server.connections, server.messages
+        conn = connection()
+        started = time.perf_counter()
+        messages = batches = 0
+        try:
+            while True:
+                rows = claim_batch(batch_size)
+                if not rows:
+                    break
+                messages += send_batch(conn, rows, max_attempts=5)
+                batches += 1
+        finally:
+            conn.close()
+        elapsed = time.perf_counter() - started
+
+        outbox = EmailOutbox.objects.filter(to_email__startswith='mail_')
+        delivered = outbox.filter(status='sent').count()
+        retried = outbox.filter(status='sent', attempts__gt=1).count()
+        self.stdout.write(
+            f'{"worker":<8}{delivered} of {outbox.count()} notifications in {elapsed:.2f}s '
+            f'({delivered / elapsed:.0f} notifications/s) as {messages} messages in {batches} batches over '
+            f'{server.connections - before_connections} connections; {retried} delivered on a retry, '
+            f'{outbox.filter(status="failed").count()} failed'
+        )
+        assert server.messages - before_messages == messages
@@ -0,0 +1,112 @@
+# ============================================================================
+# exam_portal/management/commands/bench_notification_coalescing.py
+# Check notification coalescing under concurrent writers and measure it
+# ============================================================================
+
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import override_settings
+
+from exam_portal.models import EmailOutbox, ExamApplication, Notification, Student
+from exam_portal.notifications import notification_config, notify_student
+
+USERNAME_PREFIX = 'bench_notify_'
+
+
+class Command(BaseCommand):
+    help = ('Sends bursts of notifications from concurrent threads with and without coalescing, checks '
+            'one row per application survives, and reports rows written (synthetic students removed)')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--students', type=int, default=100, help='Synthetic students')
+        parser.add_argument('--applications', type=int, default=2, help='Applications per student')
+        parser.add_argument('--per-application', type=int, default=8,
+                            help='Notifications sent for each application')
+        parser.add_argument('--threads', type=int, default=8, help='Concurrent writers')
+
+    def handle(self, *args, **options):
+        if connection.vendor == 'sqlite' and connection.settings_dict['NAME'] == ':memory:':
+            raise CommandError('Concurrent writers need a file or server database')
+        try:
+            applications = self.seed(options['students'], options['applications'])
+            window = notification_config()['COALESCE_WINDOW'] or 600
+            self.stdout.write(
+                f'{len(applications)} applications x {options["per_application"]} notifications from '
+                f'{options["threads"]} threads'
+            )
+            for label, config in (('plain', 0), ('coalesced', window)):
+                with override_settings(NOTIFICATIONS={**notification_config(), 'COALESCE_WINDOW': config}):
+                    self.run(label, applications, options['per_application'], options['threads'])
+        finally:
+            self.cleanup()
+        self.stdout.write(self.style.SUCCESS('✓ Benchmark complete; synthetic students removed'))
+
+    def seed(self, students, per_student):
+        self.cleanup()
+        users = User.objects.bulk_create(
+            [User(username=f'{USERNAME_PREFIX}{i}', password='!') for i in range(students)], batch_size=1000
+        )
+        created = Student.objects.bulk_create([
+            Student(user=user, registration_number=f'NOTIFY/{i:06d}', first_name='Notify', last_name=str(i),
+                    email=f'notify_{i}@example.com')
+            for i, user in enumerate(users)
+        ], batch_size=1000)
+        return ExamApplication.objects.bulk_create([
+            ExamApplication(application_id=f'NTF{i:05d}{j}', student=student, year_of_study='1',
+                            exam_type='resit', unit_name='Notify Unit', unit_code='NTF100', year_taken=2025,
+                            semester_taken='1', declaration_accepted=True)
+            for i, student in enumerate(created) for j in range(per_student)
+        ], batch_size=1000)
+
+    def cleanup(self):
+        # Cascades to the students, applications and notifications
+        User.objects.filter(username__startswith=USERNAME_PREFIX).delete()
+        EmailOutbox.objects.filter(to_email__startswith='notify_').delete()
+
+    def run(self, label, applications, per_application, threads):
+        student_ids = [application.student_id for application in applications]
+        Notification.objects.filter(student_id__in=student_ids).delete()
+        EmailOutbox.objects.filter(to_email__startswith='notify_').delete()
+
+        # Every application's notifications, shuffled so writers race on them
+        work = [(application, n) for application in applications for n in range(per_application)]
+        random.shuffle(work)
+        errors = []
+
+        def send(item):
+            application, n = item
+            try:
+                notify_student(application.student, f'Update {n + 1}',
+                               f'Application {application.application_id} changed.', application=application)
+            except Exception as exc:
+                errors.append(exc)
+            finally:
+                if threading.current_thread() is not main_thread:
+                    connection.close()
+
+        main_thread = threading.current_thread()
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=threads) as pool:
+            list(pool.map(send, work))
+        elapsed = time.perf_counter() - started
+
+        rows = Notification.objects.filter(student_id__in=student_ids)
+        emails = EmailOutbox.objects.filter(to_email__startswith='notify_', status='pending').count()
+        self.stdout.write(
+            f'{label:<10}{len(work)} notifications in {elapsed:.2f}s ({len(work) / elapsed:.0f}/s): '
+            f'{rows.count()} rows, {emails} pending emails, {len(errors)} errors'
+        )
+        if errors:
+            raise CommandError(f'{label}: {errors[0]!r}')
+        if label == 'coalesced':
+            counts = sorted(set(rows.values_list('update_count', flat=True)))
+            if rows.count() != len(applications) or counts != [per_application] or emails != len(applications):
+                raise CommandError(f'Coalescing lost or duplicated notifications: update counts {counts}')
+            self.stdout.write(f'{"":<10}one row and one email per application, each holding '
+                              f'{per_application} notifications')
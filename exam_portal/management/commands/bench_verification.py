@@ -0,0 +1,59 @@
+# ============================================================================
+# exam_portal/management/commands/bench_verification.py
+# Benchmark keyword verification on large OCR texts
+# ============================================================================
+
+import random
+import time
+
+from django.core.management.base import BaseCommand
+
+from exam_portal.verification import Verifier, ahocorasick, verification_config
+
+FILLER_WORDS = [
+    'the', 'student', 'university', 'examination', 'semester', 'office', 'date',
+    'signed', 'name', 'number', 'department', 'school', 'kenya', 'nairobi', 'form',
+    'reference', 'attached', 'please', 'note', 'record', 'period', 'course',
+]
+
+
+class Command(BaseCommand):
+    help = 'Benchmarks the Aho-Corasick keyword verifier on MB-sized texts'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--size-mb', type=float, default=1.0, help='Text size in MB')
+        parser.add_argument('--repeat', type=int, default=3, help='Timed runs per exam type')
+
+    def handle(self, *args, **options):
+        config = verification_config()
+        verifier = Verifier(config)
+        size = int(options['size_mb'] * 1024 * 1024)
+        backend = 'pyahocorasick' if ahocorasick is not None else 'pure Python'
+        self.stdout.write(f'Backend: {backend}, text size: {size / 1024 / 1024:.1f} MB')
+
+        rng = random.Random(42)
+        for exam_type, keywords in config['KEYWORDS'].items():
+            vocabulary = FILLER_WORDS * 20 + list(keywords)
+            words = []
+            length = 0
+            while length < size:
+                word = rng.choice(vocabulary)
+                words.append(word)
+                length += len(word) + 1
+            text = ' '.join(words)
+
+            start = time.perf_counter()
+            verifier.automaton(exam_type)
+            build = time.perf_counter() - start
+
+            timings = []
+            for _ in range(options['repeat']):
+                start = time.perf_counter()
+                result = verifier.score(text, exam_type, registration_number='SCT211-0001/2021')
+                timings.append(time.perf_counter() - start)
+            best = min(timings)
+            self.stdout.write(
+                f'  {exam_type:<8} build {build * 1000:.2f}ms, scan {best * 1000:.1f}ms '
+                f'({len(text) / best / 1024 / 1024:.1f} MB/s), '
+                f'{len(result.keywords)} keywords, score {result.score}'
+            )
@@ -0,0 +1,41 @@
+# ============================================================================
+# exam_portal/management/commands/document_savings.py
+# Report bytes saved by recompressing uploaded images
+# ============================================================================
+
+from django.core.management.base import BaseCommand
+from django.db.models import Count, F, Sum
+
+from exam_portal.models import NormalizedDocument
+
+
+class Command(BaseCommand):
+    help = 'Reports bytes saved per document and in total by image recompression'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--top', type=int, default=20,
+                            help='Documents to list, largest saving first (0 for none)')
+
+    def handle(self, *args, **options):
+        documents = NormalizedDocument.objects.annotate(saved=F('original_size') - F('stored_size'))
+
+        for document in documents.order_by('-saved')[:options['top']]:
+            ratio = document.stored_size / document.original_size if document.original_size else 1.0
+            self.stdout.write(
+                f'  {document.original_hash[:12]}: {self.megabytes(document.original_size)} -> '
+                f'{self.megabytes(document.stored_size)} ({ratio:.0%}), saved {self.megabytes(document.saved)}'
+            )
+
+        totals = NormalizedDocument.objects.aggregate(
+            count=Count('pk'), original=Sum('original_size'), stored=Sum('stored_size')
+        )
+        original = totals['original'] or 0
+        stored = totals['stored'] or 0
+        self.stdout.write(self.style.SUCCESS(
+            f"✓ {totals['count']} images: {self.megabytes(original)} uploaded, "
+            f'{self.megabytes(stored)} stored, {self.megabytes(original - stored)} saved'
+        ))
+
+    @staticmethod
+    def megabytes(size):
+        return f'{size / (1024 * 1024):.2f} MB'
@@ -0,0 +1,153 @@
+# ============================================================================
+# exam_portal/management/commands/pack_documents.py
+# Pack old supporting documents into per-month cold-storage archives
+# ============================================================================
+
+import os
+import struct
+import uuid
+import zipfile
+from collections import defaultdict
+from contextlib import suppress
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from exam_portal.models import ArchivedDocument, ExamApplication, StoredDocument
+
+# Size of a zip local file header before the file name and extra field
+LOCAL_HEADER_SIZE = 30
+
+
+class Command(BaseCommand):
+    help = 'Packs documents of closed applications from past months into indexed zip archives'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--min-age-months', type=int, default=12,
+                            help='Only pack months at least this many months old')
+        parser.add_argument('--status', action='append', dest='statuses',
+                            help='Application status to pack (repeatable; default: uploaded_to_portal, rejected)')
+        parser.add_argument('--dry-run', action='store_true', help='Only report what would be packed')
+
+    def handle(self, *args, **options):
+        self.storage = ExamApplication._meta.get_field('supporting_document').storage
+        self.started = timezone.now()
+        statuses = options['statuses'] or ['uploaded_to_portal', 'rejected']
+        cutoff = self.month_start(options['min_age_months'])
+
+        eligible = ExamApplication.objects.filter(
+            status__in=statuses, submitted_at__lt=cutoff
+        ).exclude(supporting_document='')
+        # A document shared with any application still in use stays live
+        self.in_use = ExamApplication.objects.exclude(pk__in=eligible.values('pk'))
+        pinned = set(self.in_use.values_list('supporting_document', flat=True))
+        packed = set(ArchivedDocument.objects.values_list('name', flat=True))
+
+        months = defaultdict(list)
+        seen = set()
+        rows = eligible.order_by('submitted_at').values_list('supporting_document', 'submitted_at')
+        for name, submitted_at in rows.iterator(chunk_size=2000):
+            if name in seen or name in pinned or name in packed:
+                continue
+            seen.add(name)
+            months[submitted_at.strftime('%Y-%m')].append(name)
+
+        files = size = 0
+        for month, names in sorted(months.items()):
+            if options['dry_run']:
+                self.stdout.write(f'  {month}: would pack {len(names)} documents')
+                continue
+            count, month_size = self.pack_month(month, names)
+            files += count
+            size += month_size
+            self.stdout.write(f'  {month}: packed {count} documents ({month_size / (1024 * 1024):.1f} MB)')
+
+        if not options['dry_run']:
+            self.stdout.write(self.style.SUCCESS(
+                f'✓ Packed {files} documents ({size / (1024 * 1024):.1f} MB) from {len(months)} months '
+                f'off the live volume'
+            ))
+
+    def month_start(self, months_back):
+        now = timezone.now()
+        month_index = now.year * 12 + now.month - 1 - months_back
+        return now.replace(year=month_index // 12, month=month_index % 12 + 1, day=1,
+                           hour=0, minute=0, second=0, microsecond=0)
+
+    def pack_month(self, month, names):
+        """Write one archive for ``names``, index it, then drop the live files"""
+        archive = f'{month[:4]}/{month}-{uuid.uuid4().hex[:8]}.zip'
+        path = self.storage.archive_path(archive)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        temp_path = f'{path}.tmp'
+
+        try:
+            # Documents are already compressed; stored members can be read
+            # at their raw offset
+            with zipfile.ZipFile(temp_path, 'w', compression=zipfile.ZIP_STORED, allowZip64=True) as archive_file:
+                for name in names:
+                    live_path = self.storage.path(name)
+                    if os.path.exists(live_path):
+                        archive_file.write(live_path, arcname=name)
+            entries = self.index(temp_path, archive)
+            with open(temp_path, 'rb') as handle:
+                os.fsync(handle.fileno())
+            os.replace(temp_path, path)
+        except BaseException:
+            with suppress(FileNotFoundError):
+                os.remove(temp_path)
+            raise
+
+        if not entries:
+            os.remove(path)
+            return 0, 0
+        with transaction.atomic():
+            ArchivedDocument.objects.bulk_create(entries)
+        entries = [entry for entry in entries if self.release_live(entry.name)]
+        return len(entries), sum(entry.size for entry in entries)
+
+    def index(self, path, archive):
+        """ArchivedDocument rows with the data offset of every member"""
+        entries = []
+        with open(path, 'rb') as handle, zipfile.ZipFile(handle) as archive_file:
+            for info in archive_file.infolist():
+                handle.seek(info.header_offset)
+                header = handle.read(LOCAL_HEADER_SIZE)
+                name_length, extra_length = struct.unpack('<HH', header[26:30])
+                entries.append(ArchivedDocument(
+                    name=info.filename,
+                    archive=archive,
+                    offset=info.header_offset + LOCAL_HEADER_SIZE + name_length + extra_length,
+                    size=info.file_size,
+                ))
+        return entries
+
+    def release_live(self, name):
+        """
+        Drop the live file of a packed document, or the archive entry if the
+        document gained a reference while packing. Holds the StoredDocument
+        row lock an upload deduplicating to the document takes in
+        ContentAddressedStorage._save, so the two cannot interleave.
+        """
+        with transaction.atomic():
+            stored = StoredDocument.objects.select_for_update().filter(name=name).first()
+            # Deduplicated uploads touch updated_at
+            if (stored is not None and stored.updated_at >= self.started) or \
+                    self.in_use.filter(supporting_document=name).exists():
+                ArchivedDocument.objects.filter(name=name).delete()
+                return False
+            self.remove_live(name)
+        return True
+
+    def remove_live(self, name):
+        """Delete a live file and any shard directories left empty"""
+        with suppress(FileNotFoundError):
+            os.remove(self.storage.path(name))
+        directory = os.path.dirname(name)
+        while directory:
+            try:
+                os.rmdir(self.storage.path(directory))
+            except OSError:
+                break
+            directory = os.path.dirname(directory)
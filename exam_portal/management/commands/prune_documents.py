@@ -0,0 +1,118 @@
+# ============================================================================
+# exam_portal/management/commands/prune_documents.py
+# Garbage-collect unreferenced files from the content-addressed store
+# ============================================================================
+
+import os
+from datetime import timedelta
+
+from django.core.files import File
+from django.core.management.base import BaseCommand
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from exam_portal.models import DocumentPreview, ExamApplication, StoredDocument
+from exam_portal.uploads import content_hash
+
+
+class Command(BaseCommand):
+    help = 'Deletes stored documents that no application references'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--grace-hours', type=int, default=24,
+                            help='Keep unreferenced files written or referenced within this many hours')
+        parser.add_argument('--recount', action='store_true',
+                            help='Recompute reference counts from the applications first')
+        parser.add_argument('--adopt-legacy', action='store_true',
+                            help='Move documents stored under upload_to paths into the store')
+        parser.add_argument('--dry-run', action='store_true', help='Only report what would be deleted')
+
+    def handle(self, *args, **options):
+        self.storage = ExamApplication._meta.get_field('supporting_document').storage
+        self.dry_run = options['dry_run']
+        cutoff = timezone.now() - timedelta(hours=options['grace_hours'])
+
+        if options['adopt_legacy']:
+            self.adopt_legacy()
+        if options['recount']:
+            self.recount()
+
+        stale = StoredDocument.objects.filter(ref_count__lte=0, updated_at__lt=cutoff)
+        deleted = freed = 0
+        for entry in stale.iterator():
+            freed += entry.size
+            deleted += 1
+            if not self.dry_run:
+                # Re-check in case the document was referenced meanwhile
+                if StoredDocument.objects.filter(pk=entry.pk, ref_count__lte=0,
+                                                 updated_at__lt=cutoff).delete()[0]:
+                    self.storage.delete(entry.name)
+                    self.delete_previews(entry.content_hash)
+
+        orphans = self.remove_orphan_files(cutoff.timestamp())
+
+        prefix = 'Would delete' if self.dry_run else 'Deleted'
+        self.stdout.write(self.style.SUCCESS(
+            f'✓ {prefix} {deleted} unreferenced documents ({freed / (1024 * 1024):.1f} MB) '
+            f'and {orphans} orphaned files'
+        ))
+
+    def delete_previews(self, content_hash):
+        for preview in DocumentPreview.objects.filter(content_hash=content_hash):
+            for image in (preview.preview, preview.thumbnail):
+                if image:
+                    image.delete(save=False)
+            preview.delete()
+
+    def recount(self):
+        references = (
+            ExamApplication.objects.filter(supporting_document=OuterRef('name'))
+            .order_by().values('supporting_document')
+            .annotate(total=Count('pk')).values('total')
+        )
+        if not self.dry_run:
+            StoredDocument.objects.update(ref_count=Coalesce(Subquery(references), 0))
+        self.stdout.write('Recomputed document reference counts')
+
+    def adopt_legacy(self):
+        """Re-store documents saved before the content-addressed store"""
+        adopted = 0
+        legacy = ExamApplication.objects.exclude(
+            supporting_document__startswith=f'{self.storage.prefix}/'
+        ).exclude(supporting_document='')
+        for application in legacy.iterator():
+            old_name = application.supporting_document.name
+            if not self.storage.exists(old_name):
+                self.stderr.write(f'{application.application_id}: {old_name} is missing')
+                continue
+            adopted += 1
+            if self.dry_run:
+                continue
+            with self.storage.open(old_name) as handle:
+                document = File(handle)
+                document.content_hash = content_hash(document)
+                application.supporting_document.save(os.path.basename(old_name), document, save=False)
+            application.document_hash = document.content_hash
+            application.save(update_fields=['supporting_document', 'document_hash'])
+            if not ExamApplication.objects.filter(supporting_document=old_name).exists():
+                self.storage.delete(old_name)
+        self.stdout.write(f'Adopted {adopted} legacy documents into the store')
+
+    def remove_orphan_files(self, cutoff):
+        """Delete stale files in the store that the index does not know"""
+        root = self.storage.path(self.storage.prefix)
+        if not os.path.isdir(root):
+            return 0
+        known = set(StoredDocument.objects.values_list('name', flat=True))
+        removed = 0
+        for directory, _subdirs, files in os.walk(root):
+            for filename in files:
+                path = os.path.join(directory, filename)
+                name = os.path.relpath(path, self.storage.location).replace(os.sep, '/')
+                if name in known or os.path.getmtime(path) >= cutoff:
+                    continue
+                removed += 1
+                if not self.dry_run:
+                    os.remove(path)
+        return removed
@@ -0,0 +1,39 @@
+# ============================================================================
+# exam_portal/management/commands/prune_ocr_cache.py
+# Evict OCR cache entries no application references any more
+# ============================================================================
+
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db.models import Exists, OuterRef
+from django.utils import timezone
+
+from exam_portal.models import ExamApplication, OCRCacheEntry
+
+
+class Command(BaseCommand):
+    help = 'Deletes OCR cache entries whose content hash no application references'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--grace-hours', type=int, default=24,
+                            help='Keep unreferenced entries created or hit within this many hours')
+        parser.add_argument('--dry-run', action='store_true', help='Only report what would be deleted')
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(hours=options['grace_hours'])
+        referenced = ExamApplication.objects.filter(document_hash=OuterRef('content_hash'))
+        stale = OCRCacheEntry.objects.filter(
+            ~Exists(referenced),
+            created_at__lt=cutoff,
+        ).exclude(last_hit_at__gte=cutoff)
+
+        if options['dry_run']:
+            self.stdout.write(f'{stale.count()} unreferenced OCR cache entries would be deleted')
+            return
+
+        deleted, _ = stale.delete()
+        total = OCRCacheEntry.objects.count()
+        self.stdout.write(self.style.SUCCESS(
+            f'✓ Deleted {deleted} unreferenced OCR cache entries ({total} remain)'
+        ))
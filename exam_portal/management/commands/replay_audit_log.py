@@ -0,0 +1,16 @@
+# ============================================================================
+# exam_portal/management/commands/replay_audit_log.py
+# Import audit events written to the fallback file while the DB was down
+# ============================================================================
+
+from django.core.management.base import BaseCommand
+
+from exam_portal.audit import fallback_path, replay_fallback
+
+
+class Command(BaseCommand):
+    help = 'Imports audit events from the fallback file into the database and removes the file'
+
+    def handle(self, *args, **options):
+        imported = replay_fallback()
+        self.stdout.write(self.style.SUCCESS(f'✓ Imported {imported} audit events from {fallback_path()}'))
@@ -0,0 +1,174 @@
+# ============================================================================
+# exam_portal/management/commands/reverify_ocr.py
+# Re-score every OCRResult after the keyword dictionary or thresholds change
+# ============================================================================
+
+import hashlib
+import json
+import multiprocessing
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from exam_portal.cache import invalidate_applications
+from exam_portal.models import ExamApplication, OCRResult
+from exam_portal.verification import Verifier, init_pool_verifier, score_rows, verification_config
+
+ROW_FIELDS = (
+    'pk', 'application_id', 'application__application_id', 'extracted_text',
+    'application__exam_type', 'application__student__registration_number',
+    'application__unit_code', 'engine_confidence', 'confidence_score',
+    'keywords_found', 'verified', 'application__auto_verified',
+)
+
+
+class Command(BaseCommand):
+    help = 'Re-scores all OCR results in parallel and writes the changes back in bulk'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                            help='Worker processes (default: CPU count)')
+        parser.add_argument('--chunk-size', type=int, default=2000,
+                            help='Rows fetched, scored and written per chunk')
+        parser.add_argument('--checkpoint', default=str(settings.BASE_DIR / 'var' / 'reverify_ocr.json'),
+                            help='File recording the last fully written row')
+        parser.add_argument('--resume', action='store_true',
+                            help='Continue after the checkpoint if the configuration is unchanged')
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Report what would change without writing')
+        parser.add_argument('--sample', type=int, default=10,
+                            help='Changed rows to print in dry-run mode')
+
+    def handle(self, *args, **options):
+        config = verification_config()
+        signature = hashlib.sha256(json.dumps(config, sort_keys=True).encode()).hexdigest()
+        self.checkpoint_path = options['checkpoint']
+        self.dry_run = options['dry_run']
+        self.samples_left = options['sample'] if self.dry_run else 0
+        self.stats = {'rows': 0, 'changed': 0, 'newly_verified': 0, 'unverified': 0,
+                      'keywords_changed': 0}
+
+        start_pk = 0
+        if options['resume']:
+            start_pk = self.read_checkpoint(signature)
+
+        # Results from before the engine confidence was recorded cannot be
+        # re-scored without inventing one, so they are left as they are
+        rows = (
+            OCRResult.objects.filter(pk__gt=start_pk, engine_confidence__isnull=False)
+            .order_by('pk')
+            .values_list(*ROW_FIELDS)
+            .iterator(chunk_size=options['chunk_size'])
+        )
+
+        workers = max(1, options['workers'])
+        context = multiprocessing.get_context('spawn')
+        started = time.perf_counter()
+        with ProcessPoolExecutor(max_workers=workers, mp_context=context,
+                                 initializer=init_pool_verifier,
+                                 initargs=(Verifier(config),)) as pool:
+            # Keep a bounded number of chunks in flight and write them back
+            # in order, so the checkpoint never skips an unwritten row.
+            in_flight = deque()
+            while True:
+                chunk = list(islice(rows, options['chunk_size']))
+                if not chunk:
+                    break
+                tasks = [(row[0], row[3], row[4], row[7], row[5], row[6]) for row in chunk]
+                in_flight.append((chunk, pool.submit(score_rows, tasks)))
+                if len(in_flight) >= workers * 2:
+                    self.apply_chunk(*in_flight.popleft(), signature)
+            while in_flight:
+                self.apply_chunk(*in_flight.popleft(), signature)
+
+        elapsed = time.perf_counter() - started
+        if not self.dry_run and os.path.exists(self.checkpoint_path):
+            os.remove(self.checkpoint_path)
+        skipped = OCRResult.objects.filter(pk__gt=start_pk, engine_confidence__isnull=True).count()
+        self.report(elapsed, workers, skipped)
+
+    def apply_chunk(self, chunk, future, signature):
+        scored = {key: (score, keywords, verified) for key, score, keywords, verified in future.result()}
+        ocr_updates = []
+        app_updates = []
+        touched = []
+
+        for (pk, app_pk, app_id, _text, _exam_type, _reg, _unit, _confidence,
+             old_score, old_keywords, old_verified, old_auto_verified) in chunk:
+            score, keywords, verified = scored[pk]
+            self.stats['rows'] += 1
+
+            if (score, keywords, verified) != (old_score, old_keywords, old_verified):
+                self.stats['changed'] += 1
+                if keywords != old_keywords:
+                    self.stats['keywords_changed'] += 1
+                ocr_updates.append(OCRResult(pk=pk, confidence_score=score,
+                                             keywords_found=keywords, verified=verified))
+                touched.append(app_id)
+                if self.samples_left > 0:
+                    self.samples_left -= 1
+                    self.stdout.write(
+                        f'  {app_id}: score {old_score:.3f} -> {score:.3f}, '
+                        f'verified {old_verified} -> {verified}, keywords {old_keywords} -> {keywords}'
+                    )
+
+            if verified != old_auto_verified:
+                self.stats['newly_verified' if verified else 'unverified'] += 1
+                app_updates.append(ExamApplication(pk=app_pk, auto_verified=verified))
+                touched.append(app_id)
+
+        if self.dry_run:
+            return
+
+        with transaction.atomic():
+            OCRResult.objects.bulk_update(ocr_updates, ['confidence_score', 'keywords_found', 'verified'],
+                                          batch_size=500)
+            ExamApplication.objects.bulk_update(app_updates, ['auto_verified'], batch_size=500)
+        invalidate_applications(set(touched))
+        self.write_checkpoint(chunk[-1][0], signature)
+
+    def read_checkpoint(self, signature):
+        try:
+            with open(self.checkpoint_path) as handle:
+                checkpoint = json.load(handle)
+        except FileNotFoundError:
+            return 0
+        if checkpoint.get('signature') != signature:
+            self.stdout.write(self.style.WARNING(
+                'Verification settings changed since the checkpoint; starting from the beginning'
+            ))
+            return 0
+        self.stdout.write(f"Resuming after OCR result {checkpoint['last_pk']}")
+        return checkpoint['last_pk']
+
+    def write_checkpoint(self, last_pk, signature):
+        directory = os.path.dirname(self.checkpoint_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        temp_path = f'{self.checkpoint_path}.tmp'
+        with open(temp_path, 'w') as handle:
+            json.dump({'last_pk': last_pk, 'signature': signature}, handle)
+        os.replace(temp_path, self.checkpoint_path)
+
+    def report(self, elapsed, workers, skipped):
+        stats = self.stats
+        rate = stats['rows'] / elapsed if elapsed else 0.0
+        prefix = 'Would change' if self.dry_run else 'Changed'
+        self.stdout.write(
+            f"{prefix} {stats['changed']} of {stats['rows']} OCR results "
+            f"({stats['keywords_changed']} keyword lists); auto-verified "
+            f"+{stats['newly_verified']} / -{stats['unverified']} applications"
+        )
+        if skipped:
+            self.stdout.write(self.style.WARNING(
+                f'Skipped {skipped} OCR results with unknown engine confidence; re-run OCR to score them'
+            ))
+        self.stdout.write(self.style.SUCCESS(
+            f'✓ {rate:.0f} docs/s with {workers} workers ({rate / workers:.0f} docs/s per core)'
+        ))
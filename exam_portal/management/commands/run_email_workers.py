@@ -0,0 +1,56 @@
+# ============================================================================
+# exam_portal/management/commands/run_email_workers.py
+# Deliver queued notification emails in batches over one connection
+# ============================================================================
+
+import time
+
+from django.core.mail import get_connection
+from django.core.management.base import BaseCommand
+
+from exam_portal.outbox import claim_batch, reclaim_stale, send_batch
+
+
+class Command(BaseCommand):
+    help = 'Sends queued notification emails, coalescing digests and retrying failures with backoff'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=100,
+                            help='Outbox rows claimed and written back per batch')
+        parser.add_argument('--max-attempts', type=int, default=5,
+                            help='Attempts before an email is marked failed')
+        parser.add_argument('--poll-interval', type=float, default=5.0,
+                            help='Seconds to sleep when nothing is due')
+        parser.add_argument('--reclaim-after', type=int, default=600,
+                            help='Requeue emails stuck in sending for this many seconds')
+        parser.add_argument('--once', action='store_true',
+                            help='Exit when nothing is due instead of polling')
+
+    def handle(self, *args, **options):
+        reclaimed = reclaim_stale(options['reclaim_after'])
+        if reclaimed:
+            self.stdout.write(f'Requeued {reclaimed} emails left in sending')
+
+        connection = get_connection(fail_silently=False)
+        rows_done = messages_sent = 0
+        started = time.perf_counter()
+        try:
+            while True:
+                rows = claim_batch(options['batch_size'])
+                if not rows:
+                    # Don't hold an idle SMTP session open between polls
+                    connection.close()
+                    if options['once']:
+                        break
+                    time.sleep(options['poll_interval'])
+                    continue
+                messages_sent += send_batch(connection, rows, options['max_attempts'])
+                rows_done += len(rows)
+        finally:
+            connection.close()
+
+        elapsed = time.perf_counter() - started
+        rate = messages_sent / elapsed if elapsed else 0.0
+        self.stdout.write(self.style.SUCCESS(
+            f'✓ Processed {rows_done} queued emails as {messages_sent} messages ({rate:.1f} msgs/s)'
+        ))
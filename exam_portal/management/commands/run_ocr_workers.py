@@ -0,0 +1,193 @@
+# ============================================================================
+# exam_portal/management/commands/run_ocr_workers.py
+# Process queued OCR jobs in a process pool
+# ============================================================================
+
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from exam_portal.cache import invalidate_applications
+from exam_portal.models import OCRCacheEntry, OCRJob, OCRResult
+from exam_portal.ocr import (
+    apply_cached_ocr, available_engines, build_ocr_result, ocr_cache_entry, process_job,
+    save_auto_verified,
+)
+
+
+class Command(BaseCommand):
+    help = 'Runs OCR over queued supporting documents using a process pool'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                            help='Worker processes (default: CPU count)')
+        parser.add_argument('--batch-size', type=int, default=50,
+                            help='Jobs claimed and written back per batch')
+        parser.add_argument('--max-attempts', type=int, default=3,
+                            help='Attempts before a job is marked failed')
+        parser.add_argument('--poll-interval', type=float, default=5.0,
+                            help='Seconds to sleep when the queue is empty')
+        parser.add_argument('--reclaim-after', type=int, default=600,
+                            help='Requeue jobs stuck in processing for this many seconds')
+        parser.add_argument('--once', action='store_true',
+                            help='Exit when the queue is empty instead of polling')
+
+    def handle(self, *args, **options):
+        workers = max(1, options['workers'])
+        engines = available_engines()
+        if engines:
+            self.stdout.write(f'OCR engines: {", ".join(engines)}')
+        else:
+            self.stdout.write(self.style.WARNING(
+                'No OCR engine installed; documents will be queued for manual review'
+            ))
+
+        self.reclaim_stuck_jobs(options['reclaim_after'])
+
+        processed = 0
+        busy_seconds = 0.0
+        # Spawned children only touch files and never inherit DB connections
+        context = multiprocessing.get_context('spawn')
+        with ProcessPoolExecutor(max_workers=workers, mp_context=context) as pool:
+            while True:
+                jobs = self.claim_jobs(options['batch_size'])
+                if not jobs:
+                    if options['once']:
+                        break
+                    time.sleep(options['poll_interval'])
+                    continue
+
+                start = time.perf_counter()
+                self.process_batch(pool, jobs, workers, options['max_attempts'])
+                elapsed = time.perf_counter() - start
+
+                processed += len(jobs)
+                busy_seconds += elapsed
+                self.report(len(jobs), elapsed, workers, 'batch')
+
+        if processed:
+            self.report(processed, busy_seconds, workers, 'total')
+        self.stdout.write(self.style.SUCCESS(f'✓ Processed {processed} OCR jobs'))
+
+    def reclaim_stuck_jobs(self, seconds):
+        cutoff = timezone.now() - timedelta(seconds=seconds)
+        count = OCRJob.objects.filter(status='processing', started_at__lt=cutoff).update(status='pending')
+        if count:
+            self.stdout.write(f'Requeued {count} stuck OCR jobs')
+
+    def claim_jobs(self, batch_size):
+        """Atomically move a batch of pending jobs to processing"""
+        with transaction.atomic():
+            jobs = list(
+                OCRJob.objects.select_for_update(skip_locked=True)
+                .filter(status='pending')
+                .select_related('application__student')
+                .order_by('created_at')[:batch_size]
+            )
+            if jobs:
+                OCRJob.objects.filter(pk__in=[job.pk for job in jobs]).update(
+                    status='processing', started_at=timezone.now(), attempts=F('attempts') + 1
+                )
+        return jobs
+
+    def process_batch(self, pool, jobs, workers, max_attempts):
+        """OCR a batch, reusing cached output and each distinct document once"""
+        now = timezone.now()
+        cached = apply_cached_ocr([job.application for job in jobs])
+        if cached:
+            OCRJob.objects.filter(application_id__in=cached, pk__in=[job.pk for job in jobs]).update(
+                status='done', error='', finished_at=now
+            )
+        jobs = [job for job in jobs if job.application_id not in cached]
+
+        # Jobs sharing a content hash are OCR'd once
+        leaders = {}
+        followers = {}
+        for job in jobs:
+            key = job.application.document_hash or f'job:{job.pk}'
+            if key in leaders:
+                followers.setdefault(leaders[key].pk, []).append(job)
+            else:
+                leaders[key] = job
+
+        tasks = []
+        for job in leaders.values():
+            document = job.application.supporting_document
+            try:
+                # Packed documents are read out of their archive in place
+                tasks.append((job.pk, document.storage.locate(document.name)))
+            except FileNotFoundError:
+                # Fails in the worker and is retried like any other error
+                tasks.append((job.pk, (document.path, 0, None)))
+        if not tasks:
+            return
+        chunksize = max(1, len(tasks) // (workers * 4))
+        results = []
+        for job_id, result, error in pool.map(process_job, tasks, chunksize=chunksize):
+            results.append((job_id, result, error))
+            for follower in followers.get(job_id, ()):
+                results.append((follower.pk, result, error))
+        self.write_results(jobs, results, max_attempts)
+
+    def write_results(self, jobs, results, max_attempts):
+        """Write OCR results, cache entries and job states back in bulk"""
+        jobs_by_id = {job.pk: job for job in jobs}
+        now = timezone.now()
+        ocr_results = []
+        cache_entries = {}
+        verified = {}
+        done_ids, retry_ids, failed = [], [], []
+
+        for job_id, result, error in results:
+            job = jobs_by_id[job_id]
+            if error is None:
+                ocr_result, verified[job.application_id] = build_ocr_result(
+                    job.application, result['text'], result['summary'], result['confidence']
+                )
+                ocr_results.append(ocr_result)
+                # Only real engine output is worth reusing
+                content_hash = job.application.document_hash
+                if content_hash and result['engine'] is not None:
+                    cache_entries[content_hash] = ocr_cache_entry(
+                        content_hash, result, ocr_result.keywords_found
+                    )
+                done_ids.append(job_id)
+            elif job.attempts + 1 >= max_attempts:
+                job.status, job.error, job.finished_at = 'failed', error, now
+                failed.append(job)
+            else:
+                retry_ids.append(job_id)
+
+        with transaction.atomic():
+            OCRResult.objects.bulk_create(
+                ocr_results,
+                update_conflicts=True,
+                unique_fields=['application'],
+                update_fields=['extracted_text', 'ocr_summary', 'engine_confidence',
+                               'confidence_score', 'keywords_found', 'verified'],
+            )
+            OCRCacheEntry.objects.bulk_create(cache_entries.values(), ignore_conflicts=True)
+            save_auto_verified(verified)
+            OCRJob.objects.filter(pk__in=done_ids).update(status='done', error='', finished_at=now)
+            OCRJob.objects.filter(pk__in=retry_ids).update(status='pending')
+            OCRJob.objects.bulk_update(failed, ['status', 'error', 'finished_at'])
+
+        # bulk_create bypasses post_save, so invalidate cached applications here
+        invalidate_applications(job.application.application_id for job in jobs)
+
+        for job in failed:
+            self.stderr.write(f'OCR job {job.pk} failed: {job.error}')
+
+    def report(self, count, seconds, workers, label):
+        rate = count / seconds if seconds else 0.0
+        self.stdout.write(
+            f'  {label}: {count} docs in {seconds:.2f}s - '
+            f'{rate:.1f} docs/s, {rate / workers:.1f} docs/s per core'
+        )
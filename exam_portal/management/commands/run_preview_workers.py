@@ -0,0 +1,137 @@
+# ============================================================================
+# exam_portal/management/commands/run_preview_workers.py
+# Render queued document previews in a process pool
+# ============================================================================
+
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from exam_portal.models import DocumentPreview, ExamApplication
+from exam_portal.previews import available_renderers, preview_config, preview_names, process_preview
+
+
+class Command(BaseCommand):
+    help = 'Renders previews and thumbnails of uploaded documents using a process pool'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                            help='Worker processes (default: CPU count)')
+        parser.add_argument('--batch-size', type=int, default=50,
+                            help='Previews claimed and written back per batch')
+        parser.add_argument('--max-attempts', type=int, default=3,
+                            help='Attempts before a preview is marked failed')
+        parser.add_argument('--poll-interval', type=float, default=5.0,
+                            help='Seconds to sleep when the queue is empty')
+        parser.add_argument('--reclaim-after', type=int, default=600,
+                            help='Requeue previews stuck in processing for this many seconds')
+        parser.add_argument('--backfill', action='store_true',
+                            help='First queue previews for documents uploaded before this pipeline')
+        parser.add_argument('--once', action='store_true',
+                            help='Exit when the queue is empty instead of polling')
+
+    def handle(self, *args, **options):
+        workers = max(1, options['workers'])
+        renderers = available_renderers()
+        if renderers:
+            self.stdout.write(f'Preview renderers: {", ".join(renderers)}')
+        else:
+            self.stdout.write(self.style.WARNING(
+                'No preview renderer installed; documents will be marked unsupported'
+            ))
+
+        if options['backfill']:
+            self.backfill()
+        cutoff = timezone.now() - timedelta(seconds=options['reclaim_after'])
+        DocumentPreview.objects.filter(status='processing', started_at__lt=cutoff).update(status='pending')
+
+        config = preview_config()
+        rendered = 0
+        started = time.perf_counter()
+        context = multiprocessing.get_context('spawn')
+        with ProcessPoolExecutor(max_workers=workers, mp_context=context) as pool:
+            while True:
+                previews = self.claim_previews(options['batch_size'])
+                if not previews:
+                    if options['once']:
+                        break
+                    time.sleep(options['poll_interval'])
+                    continue
+
+                storage = ExamApplication.supporting_document.field.storage
+                tasks = []
+                for preview in previews:
+                    preview_name, thumbnail_name = preview_names(preview.content_hash, config)
+                    preview.preview.name, preview.thumbnail.name = preview_name, thumbnail_name
+                    try:
+                        # Packed documents are read out of their archive in place
+                        source = storage.locate(preview.source_name)
+                    except FileNotFoundError:
+                        # Fails in the worker and is retried like any other error
+                        source = (storage.path(preview.source_name), 0, None)
+                    tasks.append((preview.pk, source, preview.preview.path, preview.thumbnail.path, config))
+                chunksize = max(1, len(tasks) // (workers * 4))
+                results = list(pool.map(process_preview, tasks, chunksize=chunksize))
+                self.write_results(previews, results, options['max_attempts'])
+                rendered += len(previews)
+
+        elapsed = time.perf_counter() - started
+        rate = rendered / elapsed if elapsed else 0.0
+        self.stdout.write(self.style.SUCCESS(
+            f'✓ Processed {rendered} document previews ({rate:.1f} docs/s)'
+        ))
+
+    def backfill(self):
+        known = DocumentPreview.objects.values('content_hash')
+        missing = ExamApplication.objects.exclude(document_hash='').exclude(document_hash__in=known)
+        previews = {}
+        for content_hash, name in missing.values_list('document_hash', 'supporting_document'):
+            previews.setdefault(content_hash, DocumentPreview(content_hash=content_hash, source_name=name))
+        DocumentPreview.objects.bulk_create(previews.values(), ignore_conflicts=True)
+        self.stdout.write(f'Queued {len(previews)} previews for existing documents')
+
+    def claim_previews(self, batch_size):
+        """Atomically move a batch of pending previews to processing"""
+        with transaction.atomic():
+            previews = list(
+                DocumentPreview.objects.select_for_update(skip_locked=True)
+                .filter(status='pending')
+                .order_by('created_at')[:batch_size]
+            )
+            if previews:
+                DocumentPreview.objects.filter(pk__in=[p.pk for p in previews]).update(
+                    status='processing', started_at=timezone.now(), attempts=F('attempts') + 1
+                )
+        return previews
+
+    def write_results(self, previews, results, max_attempts):
+        by_pk = {preview.pk: preview for preview in previews}
+        now = timezone.now()
+        updated = []
+        for pk, size, error in results:
+            preview = by_pk[pk]
+            preview.attempts += 1  # claim_previews incremented the stored count
+            if error is None and size is not None:
+                preview.status, preview.error = 'done', ''
+                preview.width, preview.height = size
+            elif error is None:
+                preview.status, preview.error = 'unsupported', ''
+            elif preview.attempts >= max_attempts:
+                preview.status, preview.error = 'failed', error
+                self.stderr.write(f'Preview {preview.content_hash[:12]} failed: {error}')
+            else:
+                preview.status, preview.error = 'pending', error
+            if preview.status != 'done':
+                preview.preview.name = preview.thumbnail.name = ''
+            preview.finished_at = now
+            updated.append(preview)
+        DocumentPreview.objects.bulk_update(
+            updated, ['status', 'error', 'preview', 'thumbnail', 'width', 'height', 'finished_at']
+        )
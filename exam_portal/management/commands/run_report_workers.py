@@ -0,0 +1,123 @@
+# ============================================================================
+# exam_portal/management/commands/run_report_workers.py
+# Render queued PDF summary reports in a process pool
+# ============================================================================
+
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from exam_portal.models import Report
+from exam_portal.reports import process_report, report_config, report_data, report_name
+
+
+class Command(BaseCommand):
+    help = 'Renders requested PDF summary reports using a process pool'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                            help='Worker processes (default: CPU count)')
+        parser.add_argument('--batch-size', type=int, default=8,
+                            help='Reports claimed and written back per batch')
+        parser.add_argument('--max-attempts', type=int, default=3,
+                            help='Attempts before a report is marked failed')
+        parser.add_argument('--poll-interval', type=float, default=5.0,
+                            help='Seconds to sleep when the queue is empty')
+        parser.add_argument('--reclaim-after', type=int, default=1800,
+                            help='Requeue reports stuck in processing for this many seconds')
+        parser.add_argument('--once', action='store_true',
+                            help='Exit when the queue is empty instead of polling')
+
+    def handle(self, *args, **options):
+        workers = max(1, options['workers'])
+        cutoff = timezone.now() - timedelta(seconds=options['reclaim_after'])
+        Report.objects.filter(status='processing', started_at__lt=cutoff).update(status='pending')
+
+        config = report_config()
+        rendered = 0
+        started = time.perf_counter()
+        context = multiprocessing.get_context('spawn')
+        with ProcessPoolExecutor(max_workers=workers, mp_context=context) as pool:
+            while True:
+                reports = self.claim_reports(options['batch_size'])
+                if not reports:
+                    if options['once']:
+                        break
+                    time.sleep(options['poll_interval'])
+                    continue
+
+                tasks = []
+                for report in reports:
+                    report.artifact.name = report_name(report, config)
+                    data = report_data(report)
+                    report.application_count = len(data['rows'])
+                    tasks.append((report.pk, data, report.artifact.path))
+                results = list(pool.map(process_report, tasks))
+                self.write_results(reports, results, options['max_attempts'])
+                rendered += len(reports)
+
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'✓ Processed {rendered} reports in {elapsed:.1f}s'
+        ))
+
+    def claim_reports(self, batch_size):
+        """Atomically move a batch of pending reports to processing"""
+        with transaction.atomic():
+            reports = list(
+                Report.objects.select_for_update(skip_locked=True)
+                .filter(status='pending')
+                .order_by('created_at')[:batch_size]
+            )
+            if reports:
+                Report.objects.filter(pk__in=[r.pk for r in reports]).update(
+                    status='processing', started_at=timezone.now(), attempts=F('attempts') + 1
+                )
+        return reports
+
+    def write_results(self, reports, results, max_attempts):
+        by_pk = {report.pk: report for report in reports}
+        now = timezone.now()
+        updated = []
+        for pk, size, error in results:
+            report = by_pk[pk]
+            report.attempts += 1  # claim_reports incremented the stored count
+            if error is None:
+                report.status, report.error, report.size = 'done', '', size
+            elif report.attempts >= max_attempts:
+                report.status, report.error = 'failed', error
+                self.stderr.write(f'Report {report.pk} failed: {error}')
+            else:
+                report.status, report.error = 'pending', error
+            if report.status != 'done':
+                report.artifact.name = ''
+            report.finished_at = now
+            updated.append(report)
+        Report.objects.bulk_update(
+            updated, ['status', 'error', 'artifact', 'size', 'application_count', 'finished_at']
+        )
+        for report in updated:
+            if report.status == 'done':
+                self.remove_superseded(report)
+
+    def remove_superseded(self, report):
+        """Delete finished reports for the same parameters built from older data"""
+        superseded = Report.objects.filter(
+            school=report.school,
+            year_taken=report.year_taken,
+            semester_taken=report.semester_taken,
+            exam_type=report.exam_type,
+            status='done',
+            created_at__lt=report.created_at,
+        ).exclude(pk=report.pk)
+        for old in superseded:
+            if old.artifact:
+                old.artifact.delete(save=False)
+            old.delete()
@@ -328,6 +328,7 @@ class Command(BaseCommand):
                 application=application,
                 extracted_text=f"Student Name: {student.first_name} {student.last_name}\nReg No: {student.registration_number}\nUnit: {unit_assignment.unit_code}\nReason: {exam_type.capitalize()} examination required due to medical reasons.",
                 ocr_summary=f"Document verified for {exam_type} exam application",
+                engine_confidence=confidence,
                 confidence_score=confidence,
                 keywords_found=['student', 'exam', exam_type, unit_assignment.unit_code],
                 verified=confidence > 0.85
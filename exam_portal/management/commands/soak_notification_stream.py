@@ -0,0 +1,225 @@
+# ============================================================================
+# exam_portal/management/commands/soak_notification_stream.py
+# Hold thousands of notification streams open and measure fan-out
+# ============================================================================
+
+import asyncio
+import resource
+import threading
+import time
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth import BACKEND_SESSION_KEY, HASH_SESSION_KEY, SESSION_KEY
+from django.contrib.auth.models import User
+from django.contrib.sessions.backends.db import SessionStore
+from django.contrib.sessions.models import Session
+from django.core.handlers.asgi import ASGIHandler
+from django.core.management.base import BaseCommand
+from django.urls import reverse
+
+from exam_portal.decorators import ROLE_SESSION_KEY
+from exam_portal.events import transition_applications
+from exam_portal.models import ExamApplication, Notification, Student, UserProfile
+from exam_portal.streams import NotificationStreamApp, hub, stream_config
+
+USERNAME_PREFIX = 'soak_student_'
+
+
+def rss_mb():
+    """Resident set size of this process"""
+    try:
+        with open('/proc/self/status') as status:
+            for line in status:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+class StreamClient:
+    """One in-process ASGI connection to the notification stream"""
+
+    def __init__(self, cookie, path):
+        self.scope = {
+            'type': 'http',
+            'asgi': {'version': '3.0'},
+            'http_version': '1.1',
+            'method': 'GET',
+            'scheme': 'http',
+            'path': path,
+            'raw_path': path.encode(),
+            'query_string': b'',
+            'root_path': '',
+            'headers': [(b'host', b'testserver'), (b'accept', b'text/event-stream'), (b'cookie', cookie)],
+            'client': ('127.0.0.1', 40000),
+            'server': ('testserver', 80),
+        }
+        self.status = None
+        self.requested = False
+        self.started = asyncio.Event()
+        self.closing = asyncio.Event()
+        self.waiting_for = None
+        self.received = asyncio.Event()
+        self.received_at = None
+        self.buffer = ''
+
+    async def receive(self):
+        if self.requested:
+            await self.closing.wait()
+            return {'type': 'http.disconnect'}
+        self.requested = True
+        return {'type': 'http.request', 'body': b'', 'more_body': False}
+
+    async def send(self, message):
+        if message['type'] == 'http.response.start':
+            self.status = message['status']
+        elif message['type'] == 'http.response.body':
+            self.buffer += message.get('body', b'').decode()
+            self.started.set()
+            if self.waiting_for and self.waiting_for in self.buffer:
+                self.received_at = time.perf_counter()
+                self.received.set()
+            # Only the tail can still contain a partial marker
+            self.buffer = self.buffer[-512:]
+
+    def expect(self, marker):
+        self.waiting_for = marker
+        self.received.clear()
+        self.received_at = None
+
+
+class Command(BaseCommand):
+    help = 'Soak test: holds many notification streams open in-process and measures fan-out latency and memory'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--connections', type=int, default=10000, help='Streams to hold open')
+        parser.add_argument('--students', type=int, default=1000, help='Students the streams are spread over')
+        parser.add_argument('--rounds', type=int, default=3, help='Notification fan-out rounds')
+        parser.add_argument('--hold', type=float, default=0, help='Extra seconds to hold the streams idle')
+        parser.add_argument('--connect-concurrency', type=int, default=500,
+                            help='Connections being set up at once')
+        parser.add_argument('--timeout', type=float, default=60, help='Seconds to wait for each round')
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        students, cookies = self.seed(options['students'])
+        self.stdout.write(f'Seeded {len(students)} students in {time.perf_counter() - started:.1f}s; '
+                          f'poll interval {stream_config()["POLL_INTERVAL"]}s')
+        try:
+            asyncio.run(self.soak(students, cookies, options))
+        finally:
+            self.cleanup()
+        self.stdout.write(self.style.SUCCESS('✓ Soak test complete; synthetic students removed'))
+
+    def seed(self, count):
+        self.cleanup()
+        users = User.objects.bulk_create(
+            [User(username=f'{USERNAME_PREFIX}{i}', password='!') for i in range(count)], batch_size=1000
+        )
+        UserProfile.objects.bulk_create(
+            [UserProfile(user=user, user_type='student') for user in users], batch_size=1000
+        )
+        students = Student.objects.bulk_create([
+            Student(user=user, registration_number=f'SOAK/{i:06d}', first_name='Soak', last_name=str(i),
+                    email=f'soak_{i}@example.com')
+            for i, user in enumerate(users)
+        ], batch_size=1000)
+        ExamApplication.objects.bulk_create([
+            ExamApplication(application_id=f'SOAK{i:06d}', student=student, year_of_study='1',
+                            exam_type='resit', unit_name='Soak Unit', unit_code='SOAK100', year_taken=2025,
+                            semester_taken='1', declaration_accepted=True)
+            for i, student in enumerate(students)
+        ], batch_size=1000)
+
+        cookies = []
+        for user in users:
+            session = SessionStore()
+            session[SESSION_KEY] = str(user.pk)
+            session[BACKEND_SESSION_KEY] = settings.AUTHENTICATION_BACKENDS[0]
+            session[HASH_SESSION_KEY] = user.get_session_auth_hash()
+            # As after a dashboard visit: streams then never write the session
+            session[ROLE_SESSION_KEY] = 'student'
+            session.create()
+            cookies.append(f'{settings.SESSION_COOKIE_NAME}={session.session_key}'.encode())
+        return students, cookies
+
+    def cleanup(self):
+        users = User.objects.filter(username__startswith=USERNAME_PREFIX)
+        user_ids = {str(pk) for pk in users.values_list('pk', flat=True)}
+        if user_ids:
+            stale = [s.pk for s in Session.objects.iterator() if s.get_decoded().get(SESSION_KEY) in user_ids]
+            Session.objects.filter(pk__in=stale).delete()
+        # Cascades to the profiles, students, applications and notifications
+        users.delete()
+
+    async def soak(self, students, cookies, options):
+        # As exam_tracking.asgi serves it
+        handler = NotificationStreamApp(ASGIHandler())
+        path = reverse('student_notification_stream')
+        clients = [StreamClient(cookies[i % len(cookies)], path) for i in range(options['connections'])]
+        by_student = {}
+        for i, client in enumerate(clients):
+            by_student.setdefault(students[i % len(students)].pk, []).append(client)
+
+        rss_before = rss_mb()
+        threads_before = threading.active_count()
+        limit = asyncio.Semaphore(options['connect_concurrency'])
+
+        async def run(client):
+            async with limit:
+                task = asyncio.ensure_future(handler(client.scope, client.receive, client.send))
+                await client.started.wait()
+            await task
+
+        started = time.perf_counter()
+        tasks = [asyncio.create_task(run(client)) for client in clients]
+        await asyncio.wait_for(asyncio.gather(*(client.started.wait() for client in clients)),
+                               options['timeout'] * 10)
+        connect_time = time.perf_counter() - started
+        refused = sum(client.status != 200 for client in clients)
+        self.stdout.write(
+            f'Opened {len(clients)} streams in {connect_time:.1f}s ({refused} refused); hub holds {hub.count}; '
+            f'RSS +{rss_mb() - rss_before:.0f} MB ({(rss_mb() - rss_before) * 1024 / len(clients):.1f} KB/stream); '
+            f'threads +{threading.active_count() - threads_before}'
+        )
+
+        for round_number in range(1, options['rounds'] + 1):
+            kind = 'status' if round_number == options['rounds'] else 'notification'
+            marker = f'Soak round {round_number}' if kind == 'notification' else '"status":"under_review"'
+            for client in clients:
+                client.expect(marker)
+            sent = time.perf_counter()
+            await sync_to_async(self.publish, thread_sensitive=False)(students, kind, marker)
+            await asyncio.wait_for(asyncio.gather(*(client.received.wait() for client in clients)),
+                                   options['timeout'])
+            latencies = sorted(client.received_at - sent for client in clients)
+            self.stdout.write(
+                f'Round {round_number} ({kind}): {len(students)} rows reached {len(clients)} streams; '
+                f'latency p50 {latencies[len(latencies) // 2] * 1000:.0f} ms, '
+                f'p99 {latencies[int(len(latencies) * 0.99) - 1] * 1000:.0f} ms, '
+                f'max {latencies[-1] * 1000:.0f} ms'
+            )
+
+        if options['hold']:
+            await asyncio.sleep(options['hold'])
+            self.stdout.write(f'Held {hub.count} idle streams for {options["hold"]:.0f}s')
+
+        for client in clients:
+            client.closing.set()
+        await asyncio.wait_for(asyncio.gather(*tasks, return_exceptions=True), options['timeout'])
+        # Give the hub a poll to notice it has no subscribers
+        await asyncio.sleep(stream_config()['POLL_INTERVAL'] * 2)
+        self.stdout.write(f'Closed every stream; hub holds {hub.count}, poller running: {hub._task is not None}')
+
+    @staticmethod
+    def publish(students, kind, marker):
+        if kind == 'notification':
+            Notification.objects.bulk_create([
+                Notification(student=student, notification_type='general', title=marker, message=marker)
+                for student in students
+            ])
+        else:
+            transition_applications(ExamApplication.objects.filter(application_id__startswith='SOAK'),
+                                    'under_review')
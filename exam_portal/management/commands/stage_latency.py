@@ -0,0 +1,43 @@
+# ============================================================================
+# exam_portal/management/commands/stage_latency.py
+# Report time spent in each status per school, officer and lecturer
+# ============================================================================
+
+from django.core.management.base import BaseCommand
+
+from exam_portal.events import stage_latency, update_stage_latency
+from exam_portal.models import StageLatencyBucket
+
+
+class Command(BaseCommand):
+    help = 'Folds new status events into the stage latency rollup and prints p50/p90/p99 time-in-status'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--scope', choices=[scope for scope, _ in StageLatencyBucket.SCOPE_CHOICES],
+                            help='Only report this scope')
+
+    def handle(self, *args, **options):
+        folded = update_stage_latency()
+        self.stdout.write(f'Folded {folded} new status events')
+
+        for scope, keys in sorted(stage_latency(options['scope']).items()):
+            self.stdout.write(f'\n{scope.title()}')
+            self.stdout.write(f"  {'key':<16}{'status':<24}{'count':>8}{'p50':>10}{'p90':>10}{'p99':>10}")
+            for key, statuses in sorted(keys.items()):
+                for status, stats in sorted(statuses.items()):
+                    self.stdout.write(
+                        f"  {key:<16}{status:<24}{stats['count']:>8}"
+                        + ''.join(f'{self.duration(stats[p]):>10}' for p in ('p50', 'p90', 'p99'))
+                    )
+
+        self.stdout.write(self.style.SUCCESS('✓ Stage latency report complete'))
+
+    @staticmethod
+    def duration(seconds):
+        if seconds is None:
+            return '-'
+        if seconds < 3600:
+            return f'{seconds / 60:.1f}m'
+        if seconds < 86400:
+            return f'{seconds / 3600:.1f}h'
+        return f'{seconds / 86400:.1f}d'
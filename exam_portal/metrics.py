@@ -0,0 +1,66 @@
+# ============================================================================
+# metrics.py - Process-Shared Counters and Gauges
+# ============================================================================
+#
+# Metrics live in the shared cache so every worker on the node adds to the
+# same counters. Declare them at module level so each process knows every
+# name when building a snapshot:
+#
+#   SHED_REQUESTS = Counter('overload_shed_requests', 'Requests answered with 503')
+#   SHED_REQUESTS.inc()
+
+from django.conf import settings
+from django.core.cache import caches
+
+REGISTRY = {}
+
+
+def _metrics_cache():
+    return caches[getattr(settings, 'METRICS_CACHE_ALIAS', 'default')]
+
+
+def _metric_key(name):
+    return f'exam_portal:metrics:{name}'
+
+
+class Counter:
+    """Monotonic counter shared by all worker processes"""
+    kind = 'counter'
+
+    def __init__(self, name, description=''):
+        self.name = name
+        self.description = description
+        REGISTRY[name] = self
+
+    def inc(self, amount=1):
+        cache = _metrics_cache()
+        key = _metric_key(self.name)
+        try:
+            cache.incr(key, amount)
+        except ValueError:
+            if not cache.add(key, amount, None):
+                cache.incr(key, amount)
+
+    def value(self):
+        return _metrics_cache().get(_metric_key(self.name), 0)
+
+
+class Gauge(Counter):
+    """Last written value, shared by all worker processes"""
+    kind = 'gauge'
+
+    def set(self, value):
+        _metrics_cache().set(_metric_key(self.name), value, None)
+
+
+def snapshot():
+    """Current value of every declared metric"""
+    values = _metrics_cache().get_many([_metric_key(name) for name in REGISTRY])
+    return {
+        name: {
+            'type': metric.kind,
+            'description': metric.description,
+            'value': values.get(_metric_key(name), 0),
+        }
+        for name, metric in sorted(REGISTRY.items())
+    }
@@ -0,0 +1,35 @@
+# Generated by Django 5.2.18 on 2026-10-19 04:24
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('exam_portal', '0002_ocrjob'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OCRCacheEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('content_hash', models.CharField(max_length=64, unique=True)),
+                ('extracted_text', models.TextField()),
+                ('ocr_summary', models.TextField()),
+                ('engine_confidence', models.FloatField(default=0.0)),
+                ('keywords_found', models.JSONField(blank=True, default=list)),
+                ('hits', models.IntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('last_hit_at', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'db_table': 'ocr_cache',
+            },
+        ),
+        migrations.AddField(
+            model_name='examapplication',
+            name='document_hash',
+            field=models.CharField(blank=True, db_index=True, editable=False, max_length=64),
+        ),
+    ]
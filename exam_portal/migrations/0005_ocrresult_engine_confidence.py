@@ -0,0 +1,37 @@
+# Generated by Django 5.2.18 on 2026-10-19 04:26
+
+from django.db import migrations, models
+
+
+def backfill_engine_confidence(apps, schema_editor):
+    # Results whose document went through the OCR cache take the engine
+    # confidence recorded there; the rest stay unknown (NULL) and are
+    # skipped by reverify_ocr
+    ExamApplication = apps.get_model('exam_portal', 'ExamApplication')
+    OCRCacheEntry = apps.get_model('exam_portal', 'OCRCacheEntry')
+    OCRResult = apps.get_model('exam_portal', 'OCRResult')
+    cached = OCRCacheEntry.objects.filter(
+        content_hash=models.Subquery(
+            ExamApplication.objects.filter(pk=models.OuterRef(models.OuterRef('application_id')))
+            .values('document_hash')[:1]
+        )
+    )
+    OCRResult.objects.filter(models.Exists(cached)).update(
+        engine_confidence=models.Subquery(cached.values('engine_confidence')[:1])
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('exam_portal', '0003_ocr_content_cache'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='ocrresult',
+            name='engine_confidence',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.RunPython(backfill_engine_confidence, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 5.2.18 on 2026-10-19 04:31
+
+import exam_portal.storage
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('exam_portal', '0005_ocrresult_engine_confidence'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='examapplication',
+            name='supporting_document',
+            field=models.FileField(storage=exam_portal.storage.document_storage, upload_to='documents/%Y/%m/%d/'),
+        ),
+        migrations.CreateModel(
+            name='StoredDocument',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('content_hash', models.CharField(max_length=64, unique=True)),
+                ('name', models.CharField(max_length=255, unique=True)),
+                ('size', models.BigIntegerField()),
+                ('ref_count', models.IntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'db_table': 'document_store',
+                'indexes': [models.Index(fields=['ref_count', 'updated_at'], name='document_st_ref_cou_1d0df5_idx')],
+            },
+        ),
+    ]
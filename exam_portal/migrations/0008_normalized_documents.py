@@ -0,0 +1,28 @@
+# Generated by Django 5.2.18 on 2026-10-19 04:35
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('exam_portal', '0007_document_previews'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='NormalizedDocument',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('original_hash', models.CharField(max_length=64, unique=True)),
+                ('content_hash', models.CharField(db_index=True, max_length=64)),
+                ('original_size', models.BigIntegerField()),
+                ('stored_size', models.BigIntegerField()),
+                ('original_name', models.CharField(blank=True, default='', max_length=255)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'db_table': 'normalized_documents',
+            },
+        ),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 5.2.18 on 2026-10-19 04:45
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('exam_portal', '0009_archived_documents'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Report',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('school', models.CharField(choices=[('SOB', 'School of Business'), ('SOE', 'School of Engineering'), ('SOS', 'School of Science'), ('SOH', 'School of Humanities'), ('SOCS', 'School of Computer Science'), ('SOL', 'School of Law'), ('SOM', 'School of Medicine')], max_length=10)),
+                ('year_taken', models.IntegerField()),
+                ('semester_taken', models.CharField(choices=[('1', 'Semester 1'), ('2', 'Semester 2')], max_length=1)),
+                ('exam_type', models.CharField(blank=True, choices=[('resit', 'Resit'), ('retake', 'Retake'), ('special', 'Special')], max_length=10)),
+                ('data_version', models.CharField(max_length=64)),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('processing', 'Processing'), ('done', 'Done'), ('failed', 'Failed')], default='pending', max_length=20)),
+                ('artifact', models.FileField(blank=True, editable=False, max_length=255, upload_to='reports/')),
+                ('size', models.IntegerField(default=0)),
+                ('application_count', models.IntegerField(default=0)),
+                ('attempts', models.IntegerField(default=0)),
+                ('error', models.TextField(blank=True, default='')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('started_at', models.DateTimeField(blank=True, null=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+                ('requested_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='reports', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'db_table': 'reports',
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['status', 'created_at'], name='reports_status_19e159_idx')],
+                'unique_together': {('school', 'year_taken', 'semester_taken', 'exam_type', 'data_version')},
+            },
+        ),
+    ]
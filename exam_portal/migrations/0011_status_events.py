@@ -0,0 +1,75 @@
+# Generated by Django 5.2.18 on 2026-10-19 05:00
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+def backfill_status_changed_at(apps, schema_editor):
+    # The last save is the best available estimate of when the current
+    # status was entered
+    ExamApplication = apps.get_model('exam_portal', 'ExamApplication')
+    ExamApplication.objects.filter(status_changed_at__isnull=True).update(
+        status_changed_at=models.F('updated_at')
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('exam_portal', '0010_report'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RollupCursor',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=50, unique=True)),
+                ('position', models.BigIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'db_table': 'rollup_cursors',
+            },
+        ),
+        migrations.AddField(
+            model_name='examapplication',
+            name='status_changed_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.CreateModel(
+            name='StageLatencyBucket',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('scope', models.CharField(choices=[('school', 'School'), ('officer', 'Officer'), ('lecturer', 'Lecturer')], max_length=10)),
+                ('scope_key', models.CharField(max_length=50)),
+                ('status', models.CharField(max_length=30)),
+                ('bucket', models.IntegerField()),
+                ('count', models.IntegerField(default=0)),
+            ],
+            options={
+                'db_table': 'stage_latency_buckets',
+                'unique_together': {('scope', 'scope_key', 'status', 'bucket')},
+            },
+        ),
+        migrations.CreateModel(
+            name='ApplicationStatusEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('from_status', models.CharField(blank=True, max_length=30)),
+                ('to_status', models.CharField(max_length=30)),
+                ('seconds_in_status', models.FloatField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('actor', models.ForeignKey(blank=True, db_constraint=False, db_index=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to=settings.AUTH_USER_MODEL)),
+                ('application', models.ForeignKey(db_constraint=False, db_index=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='status_events', to='exam_portal.examapplication')),
+            ],
+            options={
+                'db_table': 'application_status_events',
+                'indexes': [models.Index(fields=['application', 'created_at'], name='application_applica_f1c03c_idx')],
+            },
+        ),
+        migrations.RunPython(backfill_status_changed_at, migrations.RunPython.noop),
+    ]
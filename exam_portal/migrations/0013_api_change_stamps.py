@@ -0,0 +1,47 @@
+# Generated by Django 5.2.18 on 2026-10-19 05:06
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('exam_portal', '0012_audit_events'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='notification',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddField(
+            model_name='unitassignment',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddIndex(
+            model_name='examapplication',
+            index=models.Index(fields=['student', 'updated_at'], name='exam_applic_student_725f21_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='examapplication',
+            index=models.Index(fields=['assigned_lecturer', 'updated_at'], name='exam_applic_assigne_e55e11_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='examapplication',
+            index=models.Index(fields=['updated_at'], name='exam_applic_updated_f6494c_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='exammarking',
+            index=models.Index(fields=['lecturer', 'updated_at'], name='exam_markin_lecture_4959d4_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='notification',
+            index=models.Index(fields=['student', 'updated_at'], name='notificatio_student_0706b9_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='unitassignment',
+            index=models.Index(fields=['lecturer', 'updated_at'], name='unit_assign_lecture_c9e0c9_idx'),
+        ),
+    ]
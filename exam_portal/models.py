@@ -4,8 +4,13 @@
 
 from django.db import models
 from django.contrib.auth.models import User
-from django.db.models.signals import post_save
+from django.db.models import F
+from django.db.models.signals import post_delete, post_init, post_save, pre_save
 from django.dispatch import receiver
+from django.utils import timezone
+
+from .events import current_actor_id
+from .storage import document_storage
 
 class UserProfile(models.Model):
     """Base profile for all users"""
@@ -145,6 +150,7 @@ class UnitAssignment(models.Model):
     semester = models.CharField(max_length=1)
     active = models.BooleanField(default=True)
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
     
     def __str__(self):
         return f"{self.lecturer.lecturer_id} - {self.unit_code}"
@@ -152,6 +158,9 @@ class UnitAssignment(models.Model):
     class Meta:
         db_table = 'unit_assignments'
         unique_together = ['lecturer', 'unit_code', 'year', 'semester']
+        indexes = [
+            models.Index(fields=['lecturer', 'updated_at']),
+        ]
 
 
 class ExamApplication(models.Model):
@@ -198,11 +207,13 @@ class ExamApplication(models.Model):
     semester_taken = models.CharField(max_length=1, choices=SEMESTER_CHOICES)
     
     # Document and verification
-    supporting_document = models.FileField(upload_to='documents/%Y/%m/%d/')
+    supporting_document = models.FileField(upload_to='documents/%Y/%m/%d/', storage=document_storage)
+    document_hash = models.CharField(max_length=64, blank=True, db_index=True, editable=False)
     declaration_accepted = models.BooleanField(default=False)
     
     # Status tracking
     status = models.CharField(max_length=30, choices=STATUS_CHOICES, default='submitted')
+    status_changed_at = models.DateTimeField(null=True, blank=True, editable=False)
     auto_verified = models.BooleanField(default=False)
     
     # Assignment
@@ -230,6 +241,12 @@ class ExamApplication(models.Model):
     class Meta:
         db_table = 'exam_applications'
         ordering = ['-submitted_at']
+        # Change stamps of each role's view of the applications (API ETags)
+        indexes = [
+            models.Index(fields=['student', 'updated_at']),
+            models.Index(fields=['assigned_lecturer', 'updated_at']),
+            models.Index(fields=['updated_at']),
+        ]
 
 
 class OCRResult(models.Model):
@@ -238,6 +255,8 @@ class OCRResult(models.Model):
                                       related_name='ocr_result')
     extracted_text = models.TextField()
     ocr_summary = models.TextField()
+    # NULL for results recorded before the engine's confidence was kept
+    engine_confidence = models.FloatField(null=True, blank=True)
     confidence_score = models.FloatField(default=0.0)
     keywords_found = models.JSONField(default=list, blank=True)
     verified = models.BooleanField(default=False)
@@ -250,6 +269,141 @@ class OCRResult(models.Model):
         db_table = 'ocr_results'
 
 
+class OCRCacheEntry(models.Model):
+    """OCR output shared by every upload with the same content hash"""
+    content_hash = models.CharField(max_length=64, unique=True)
+    extracted_text = models.TextField()
+    ocr_summary = models.TextField()
+    engine_confidence = models.FloatField(default=0.0)
+    keywords_found = models.JSONField(default=list, blank=True)
+    hits = models.IntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    last_hit_at = models.DateTimeField(null=True, blank=True)
+    
+    def __str__(self):
+        return f"OCR Cache - {self.content_hash[:12]}"
+    
+    class Meta:
+        db_table = 'ocr_cache'
+
+
+class StoredDocument(models.Model):
+    """A file in the content-addressed document store"""
+    content_hash = models.CharField(max_length=64, unique=True)
+    name = models.CharField(max_length=255, unique=True)
+    size = models.BigIntegerField()
+    ref_count = models.IntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    def __str__(self):
+        return f"{self.name} ({self.ref_count} refs)"
+    
+    class Meta:
+        db_table = 'document_store'
+        indexes = [
+            models.Index(fields=['ref_count', 'updated_at']),
+        ]
+
+
+class ArchivedDocument(models.Model):
+    """Where a packed document's bytes sit inside a cold-storage archive"""
+    name = models.CharField(max_length=255, unique=True)
+    archive = models.CharField(max_length=255, db_index=True)
+    offset = models.BigIntegerField()
+    size = models.BigIntegerField()
+    archived_at = models.DateTimeField(auto_now_add=True)
+    
+    def __str__(self):
+        return f"{self.name} in {self.archive}"
+    
+    class Meta:
+        db_table = 'archived_documents'
+
+
+class NormalizedDocument(models.Model):
+    """An uploaded image and the recompressed version stored in its place"""
+    original_hash = models.CharField(max_length=64, unique=True)
+    content_hash = models.CharField(max_length=64, db_index=True)
+    original_size = models.BigIntegerField()
+    stored_size = models.BigIntegerField()
+    # Cold storage copy of the original, if kept
+    original_name = models.CharField(max_length=255, blank=True, default='')
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    @property
+    def bytes_saved(self):
+        return self.original_size - self.stored_size
+    
+    def __str__(self):
+        return f"{self.original_hash[:12]} -> {self.content_hash[:12]}"
+    
+    class Meta:
+        db_table = 'normalized_documents'
+
+
+class DocumentPreview(models.Model):
+    """Rendered first-page preview and thumbnail, shared by content hash"""
+    STATUS_CHOICES = (
+        ('pending', 'Pending'),
+        ('processing', 'Processing'),
+        ('done', 'Done'),
+        ('unsupported', 'Unsupported'),
+        ('failed', 'Failed'),
+    )
+    
+    content_hash = models.CharField(max_length=64, unique=True)
+    source_name = models.CharField(max_length=255)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+    preview = models.FileField(max_length=255, blank=True, editable=False)
+    thumbnail = models.FileField(max_length=255, blank=True, editable=False)
+    width = models.IntegerField(null=True, blank=True)
+    height = models.IntegerField(null=True, blank=True)
+    attempts = models.IntegerField(default=0)
+    error = models.TextField(blank=True, default='')
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    
+    def __str__(self):
+        return f"Preview {self.content_hash[:12]} - {self.status}"
+    
+    class Meta:
+        db_table = 'document_previews'
+        indexes = [
+            models.Index(fields=['status', 'created_at']),
+        ]
+
+
+class OCRJob(models.Model):
+    """Queued OCR work for an uploaded supporting document"""
+    STATUS_CHOICES = (
+        ('pending', 'Pending'),
+        ('processing', 'Processing'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+    )
+    
+    application = models.ForeignKey(ExamApplication, on_delete=models.CASCADE, 
+                                   related_name='ocr_jobs')
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+    attempts = models.IntegerField(default=0)
+    error = models.TextField(blank=True, default='')
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    
+    def __str__(self):
+        return f"OCR Job {self.pk} - {self.application.application_id} - {self.status}"
+    
+    class Meta:
+        db_table = 'ocr_jobs'
+        ordering = ['created_at']
+        indexes = [
+            models.Index(fields=['status', 'created_at']),
+        ]
+
+
 class ApplicationReview(models.Model):
     """Track officer reviews of applications"""
     DECISION_CHOICES = (
@@ -289,6 +443,9 @@ class ExamMarking(models.Model):
     
     class Meta:
         db_table = 'exam_markings'
+        indexes = [
+            models.Index(fields=['lecturer', 'updated_at']),
+        ]
 
 
 class Notification(models.Model):
@@ -307,7 +464,13 @@ class Notification(models.Model):
     title = models.CharField(max_length=200)
     message = models.TextField()
     is_read = models.BooleanField(default=False)
+    # Set while later notifications for the same student and application
+    # replace this one (notifications.py); update_count says how many it holds
+    coalesce_key = models.CharField(max_length=64, unique=True, null=True, blank=True, editable=False)
+    coalesce_until = models.DateTimeField(null=True, blank=True, editable=False)
+    update_count = models.PositiveIntegerField(default=1, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
     
     def __str__(self):
         return f"{self.student.registration_number} - {self.title}"
@@ -315,6 +478,168 @@ class Notification(models.Model):
     class Meta:
         db_table = 'notifications'
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['student', 'updated_at']),
+        ]
+
+
+class EmailOutbox(models.Model):
+    """Email for a Notification, queued with it and delivered by run_email_workers"""
+    STATUS_CHOICES = (
+        ('pending', 'Pending'),
+        ('sending', 'Sending'),
+        ('sent', 'Sent'),
+        ('failed', 'Failed'),
+    )
+
+    # Kept when a coalesced notification is replaced, for the sent history
+    notification = models.ForeignKey(Notification, on_delete=models.SET_NULL, null=True, blank=True,
+                                     related_name='emails')
+    to_email = models.EmailField()
+    subject = models.CharField(max_length=200)
+    body = models.TextField()
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+    attempts = models.IntegerField(default=0)
+    error = models.TextField(blank=True, default='')
+    # Not sent before this time: the digest window, then retry backoff
+    send_after = models.DateTimeField(default=timezone.now)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"Email to {self.to_email} - {self.subject} - {self.status}"
+
+    class Meta:
+        db_table = 'email_outbox'
+        indexes = [
+            models.Index(fields=['status', 'send_after']),
+            models.Index(fields=['to_email', 'status']),
+        ]
+
+
+class ApplicationStatusEvent(models.Model):
+    """Append-only log of application status transitions"""
+    # No FK constraints: events outlive the application and the acting user
+    application = models.ForeignKey(ExamApplication, on_delete=models.DO_NOTHING, db_constraint=False,
+                                    db_index=False, related_name='status_events')
+    from_status = models.CharField(max_length=30, blank=True)
+    to_status = models.CharField(max_length=30)
+    actor = models.ForeignKey(User, on_delete=models.DO_NOTHING, db_constraint=False, db_index=False,
+                              null=True, blank=True, related_name='+')
+    # Time spent in from_status, when known
+    seconds_in_status = models.FloatField(null=True, blank=True)
+    created_at = models.DateTimeField(default=timezone.now)
+    
+    def __str__(self):
+        return f"{self.application_id}: {self.from_status or '-'} -> {self.to_status}"
+    
+    class Meta:
+        db_table = 'application_status_events'
+        indexes = [
+            models.Index(fields=['application', 'created_at']),
+        ]
+
+
+class StageLatencyBucket(models.Model):
+    """Histogram bucket of time spent in a status, per school, officer or lecturer"""
+    SCOPE_CHOICES = (
+        ('school', 'School'),
+        ('officer', 'Officer'),
+        ('lecturer', 'Lecturer'),
+    )
+    
+    scope = models.CharField(max_length=10, choices=SCOPE_CHOICES)
+    scope_key = models.CharField(max_length=50)
+    status = models.CharField(max_length=30)
+    bucket = models.IntegerField()
+    count = models.IntegerField(default=0)
+    
+    def __str__(self):
+        return f"{self.scope} {self.scope_key} {self.status} #{self.bucket}: {self.count}"
+    
+    class Meta:
+        db_table = 'stage_latency_buckets'
+        unique_together = ['scope', 'scope_key', 'status', 'bucket']
+
+
+class RollupCursor(models.Model):
+    """Last source row folded into an incremental rollup"""
+    name = models.CharField(max_length=50, unique=True)
+    position = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    def __str__(self):
+        return f"{self.name} @ {self.position}"
+    
+    class Meta:
+        db_table = 'rollup_cursors'
+
+
+class Report(models.Model):
+    """PDF summary report for one school, semester and exam type"""
+    STATUS_CHOICES = (
+        ('pending', 'Pending'),
+        ('processing', 'Processing'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+    )
+    
+    school = models.CharField(max_length=10, choices=Student.SCHOOL_CHOICES)
+    year_taken = models.IntegerField()
+    semester_taken = models.CharField(max_length=1, choices=ExamApplication.SEMESTER_CHOICES)
+    # Blank covers every exam type
+    exam_type = models.CharField(max_length=10, choices=ExamApplication.EXAM_TYPE_CHOICES, blank=True)
+    # Stamp of the applications the report was built from
+    data_version = models.CharField(max_length=64)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+    artifact = models.FileField(upload_to='reports/', max_length=255, blank=True, editable=False)
+    size = models.IntegerField(default=0)
+    application_count = models.IntegerField(default=0)
+    requested_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True,
+                                     related_name='reports')
+    attempts = models.IntegerField(default=0)
+    error = models.TextField(blank=True, default='')
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    
+    def __str__(self):
+        exam_type = self.exam_type or 'all'
+        return f"Report {self.school} {self.year_taken}/{self.semester_taken} {exam_type} - {self.status}"
+    
+    class Meta:
+        db_table = 'reports'
+        ordering = ['-created_at']
+        unique_together = ['school', 'year_taken', 'semester_taken', 'exam_type', 'data_version']
+        indexes = [
+            models.Index(fields=['status', 'created_at']),
+        ]
+
+
+class AuditEvent(models.Model):
+    """Append-only record of a mutating action, written in batches by audit.py"""
+    # No FK constraint: the trail outlives the acting user
+    actor = models.ForeignKey(User, on_delete=models.DO_NOTHING, db_constraint=False, db_index=False,
+                              null=True, blank=True, related_name='+')
+    action = models.CharField(max_length=50)
+    # Model label (e.g. 'exam_portal.student') and primary key of the object
+    object_type = models.CharField(max_length=100)
+    object_id = models.CharField(max_length=64, blank=True)
+    object_repr = models.CharField(max_length=200, blank=True)
+    changes = models.JSONField(default=dict, blank=True)
+    created_at = models.DateTimeField(default=timezone.now)
+
+    def __str__(self):
+        return f"{self.action} {self.object_type}:{self.object_id} by {self.actor_id or '-'}"
+
+    class Meta:
+        db_table = 'audit_events'
+        indexes = [
+            models.Index(fields=['actor', 'created_at']),
+            models.Index(fields=['object_type', 'object_id', 'created_at']),
+            models.Index(fields=['created_at']),
+        ]
 
 
 # ============================================================================
@@ -330,4 +655,93 @@ def create_student_notifications(sender, instance, created, **kwargs):
             notification_type='general',
             title='Welcome to Exam Tracking System',
             message=f'Welcome {instance.first_name}! Your account has been created successfully.'
-        )
\ No newline at end of file
+        )
+
+
+# ============================================================================
+# SIGNALS - Document store reference counts
+# ============================================================================
+
+def _document_name(instance):
+    """Stored document name, or None if the field was deferred"""
+    # Read the raw attribute to avoid building a FieldFile for every row
+    if 'supporting_document' not in instance.__dict__:
+        return None
+    value = instance.__dict__['supporting_document']
+    return getattr(value, 'name', value) or ''
+
+
+def _adjust_document_refs(name, delta):
+    if name:
+        StoredDocument.objects.filter(name=name).update(
+            ref_count=F('ref_count') + delta, updated_at=timezone.now()
+        )
+
+
+@receiver(post_init, sender=ExamApplication)
+def remember_stored_document(sender, instance, **kwargs):
+    instance._stored_document_name = _document_name(instance)
+
+
+@receiver(post_save, sender=ExamApplication)
+def count_document_reference(sender, instance, **kwargs):
+    """Move a reference when an application's document changes"""
+    name = _document_name(instance)
+    if instance._stored_document_name is None:
+        # Deferred when loaded, so the previous name is unknown
+        instance._stored_document_name = name
+    elif name != instance._stored_document_name:
+        _adjust_document_refs(name, 1)
+        _adjust_document_refs(instance._stored_document_name, -1)
+        instance._stored_document_name = name
+
+
+@receiver(post_delete, sender=ExamApplication)
+def release_document_reference(sender, instance, **kwargs):
+    _adjust_document_refs(instance._stored_document_name, -1)
+
+
+# ============================================================================
+# SIGNALS - Status event log
+# ============================================================================
+# The status loaded from the database is remembered on the instance (and
+# pickled with it into the application cache); a save that changes it
+# stamps status_changed_at in the same UPDATE and appends one event. The
+# event is a separate INSERT, so callers save inside transaction.atomic()
+# (see workflow.py) to keep the two together.
+
+@receiver(post_init, sender=ExamApplication)
+def remember_status(sender, instance, **kwargs):
+    # None if the field was deferred, so the previous status is unknown
+    instance._loaded_status = instance.__dict__.get('status')
+
+
+@receiver(pre_save, sender=ExamApplication)
+def stamp_status_change(sender, instance, **kwargs):
+    instance._status_event = None
+    previous = '' if instance._state.adding else getattr(instance, '_loaded_status', None)
+    if previous is None or previous == instance.status:
+        return
+    now = timezone.now()
+    seconds = None
+    if previous and instance.status_changed_at is not None:
+        seconds = (now - instance.status_changed_at).total_seconds()
+    instance._status_event = (previous, now, seconds)
+    instance.status_changed_at = now
+
+
+@receiver(post_save, sender=ExamApplication)
+def log_status_change(sender, instance, **kwargs):
+    event = getattr(instance, '_status_event', None)
+    if event is not None:
+        previous, created_at, seconds = event
+        ApplicationStatusEvent.objects.create(
+            application_id=instance.pk,
+            from_status=previous,
+            to_status=instance.status,
+            actor_id=current_actor_id(),
+            seconds_in_status=seconds,
+            created_at=created_at,
+        )
+        instance._status_event = None
+    instance._loaded_status = instance.status
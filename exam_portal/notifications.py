@@ -0,0 +1,106 @@
+# ============================================================================
+# notifications.py - Student Notifications with Coalescing
+# ============================================================================
+#
+# notify_student() is how the workflow tells a student something. One
+# application produces several notifications in quick succession
+# (submitted, approved, ...), and bulk reviews produce dozens at once, so
+# within COALESCE_WINDOW seconds of an application's first notification
+# each later one for the same student and application replaces it: the
+# student keeps one unread row holding the latest title and message, and
+# update_count says how many notifications it stands for.
+#
+# Replacing means deleting the previous row and inserting a new one rather
+# than updating in place. Consumers that read notifications by ascending
+# pk (the SSE stream, streams.py) and the API's deletion stamps then see
+# the change without knowing about coalescing. Unsent email for the
+# replaced row is dropped and the new row queues its own (outbox.py), so
+# coalesced notifications are also emailed once.
+#
+# Concurrent writers are serialised by the unique coalesce_key held by
+# the live row of each student and application: a writer that loses the
+# race to insert it retries, and merges into the winner's row.
+#
+# Configure with settings.NOTIFICATIONS (merged over DEFAULTS).
+
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+from . import metrics
+from .models import Notification
+from .outbox import discard_pending_emails, queue_email
+
+DEFAULTS = {
+    # Seconds from an application's first notification during which later
+    # ones replace it; 0 stores every notification
+    'COALESCE_WINDOW': 600,
+}
+
+# Attempts at taking the coalesce key before giving up
+COALESCE_ATTEMPTS = 5
+
+NOTIFICATIONS_CREATED = metrics.Counter('notifications_created', 'Notifications stored as a new row')
+NOTIFICATIONS_COALESCED = metrics.Counter('notifications_coalesced', 'Notifications merged into a recent row')
+
+
+def notification_config():
+    return {**DEFAULTS, **getattr(settings, 'NOTIFICATIONS', {})}
+
+
+def coalesce_key(student, application):
+    return f'{student.pk}:{application.pk}'
+
+
+def notify_student(student, title, message, notification_type='status_update', application=None):
+    """Notify ``student``, coalescing with recent notifications for ``application``"""
+    fields = {
+        'student': student,
+        'application': application,
+        'notification_type': notification_type,
+        'title': title,
+        'message': message,
+    }
+    window = notification_config()['COALESCE_WINDOW']
+    if not window or application is None:
+        with transaction.atomic():
+            notification = Notification.objects.create(**fields)
+            queue_email(notification)
+        NOTIFICATIONS_CREATED.inc()
+        return notification
+
+    key = coalesce_key(student, application)
+    for attempt in range(COALESCE_ATTEMPTS):
+        try:
+            with transaction.atomic():
+                notification = _replace(key, window, fields)
+            break
+        except IntegrityError:
+            # Another writer inserted the key's row first: merge into it
+            if attempt == COALESCE_ATTEMPTS - 1:
+                raise
+    (NOTIFICATIONS_COALESCED if notification.update_count > 1 else NOTIFICATIONS_CREATED).inc()
+    return notification
+
+
+def _replace(key, window, fields):
+    now = timezone.now()
+    update_count, coalesce_until = 1, now + timedelta(seconds=window)
+
+    previous = Notification.objects.select_for_update().filter(coalesce_key=key).first()
+    if previous is not None:
+        if previous.coalesce_until and previous.coalesce_until > now:
+            update_count, coalesce_until = previous.update_count + 1, previous.coalesce_until
+            discard_pending_emails(previous)
+            previous.delete()
+        else:
+            # Window over: the row stays and stops collecting
+            Notification.objects.filter(pk=previous.pk).update(coalesce_key=None)
+
+    notification = Notification.objects.create(
+        coalesce_key=key, coalesce_until=coalesce_until, update_count=update_count, **fields
+    )
+    queue_email(notification)
+    return notification
@@ -0,0 +1,258 @@
+# ============================================================================
+# ocr.py - OCR Pipeline for Supporting Documents
+# ============================================================================
+#
+# student_apply_exam enqueues an OCRJob; the run_ocr_workers command claims
+# pending jobs and hands document locations (see storage.locate()) to a
+# process pool running extract_document(). Engines are optional:
+#   - images: pytesseract + Pillow (needs the tesseract binary)
+#   - PDFs:   pypdf, reading the embedded text layer
+# Without an engine the job still completes with an empty OCRResult so the
+# application falls back to manual review.
+#
+# OCR output is also kept in OCRCacheEntry keyed by the document's SHA-256
+# (computed while the upload streams in, see uploads.py), so re-uploads of
+# the same file skip OCR entirely.
+
+import io
+import mmap
+from contextlib import contextmanager
+
+from . import metrics
+
+try:
+    import pytesseract
+    from PIL import Image
+except ImportError:  # pragma: no cover - optional dependency
+    pytesseract = None
+    Image = None
+
+try:
+    import pypdf
+except ImportError:  # pragma: no cover - optional dependency
+    pypdf = None
+
+PDF_MAGIC = b'%PDF-'
+JPEG_MAGIC = b'\xff\xd8\xff'
+PNG_MAGIC = b'\x89PNG\r\n\x1a\n'
+
+SUMMARY_LENGTH = 200
+
+OCR_CACHE_HITS = metrics.Counter('ocr_cache_hits', 'Documents whose OCR output was reused by content hash')
+OCR_CACHE_MISSES = metrics.Counter('ocr_cache_misses', 'Documents that needed a full OCR pass')
+
+
+def enqueue_ocr(application):
+    """
+    Queue OCR for an application's supporting document. If a document with
+    the same content hash was already processed its output is reused at once
+    and no job is queued.
+    """
+    from .models import OCRJob
+
+    if apply_cached_ocr([application]):
+        return None
+    OCR_CACHE_MISSES.inc()
+    return OCRJob.objects.create(application=application)
+
+
+def apply_cached_ocr(applications):
+    """
+    Create OCRResults from the content-hash cache for any of
+    ``applications`` whose document was seen before. Returns the set of
+    application pks that were served from the cache.
+    """
+    from django.db.models import F
+    from django.utils import timezone
+    from .cache import invalidate_applications
+    from .models import OCRCacheEntry, OCRResult
+
+    by_hash = {}
+    for application in applications:
+        if application.document_hash:
+            by_hash.setdefault(application.document_hash, []).append(application)
+    if not by_hash:
+        return set()
+
+    entries = OCRCacheEntry.objects.filter(content_hash__in=by_hash)
+    served = []
+    results = []
+    verified = {}
+    for entry in entries:
+        for application in by_hash[entry.content_hash]:
+            served.append(application)
+            # Keyword scores depend on the application, so score again
+            result, verified[application.pk] = build_ocr_result(
+                application, entry.extracted_text, entry.ocr_summary, entry.engine_confidence
+            )
+            results.append(result)
+    if not served:
+        return set()
+
+    OCRResult.objects.bulk_create(
+        results,
+        update_conflicts=True,
+        unique_fields=['application'],
+        update_fields=['extracted_text', 'ocr_summary', 'engine_confidence',
+                       'confidence_score', 'keywords_found', 'verified'],
+    )
+    OCRCacheEntry.objects.filter(content_hash__in=[e.content_hash for e in entries]).update(
+        hits=F('hits') + 1, last_hit_at=timezone.now()
+    )
+    save_auto_verified(verified)
+    invalidate_applications(application.application_id for application in served)
+    OCR_CACHE_HITS.inc(len(served))
+    return {application.pk for application in served}
+
+
+def ocr_cache_entry(content_hash, result, keywords=()):
+    """Unsaved cache entry for freshly extracted OCR output"""
+    from .models import OCRCacheEntry
+    return OCRCacheEntry(
+        content_hash=content_hash,
+        extracted_text=result['text'],
+        ocr_summary=result['summary'],
+        engine_confidence=result['confidence'],
+        keywords_found=list(keywords),
+    )
+
+
+def build_ocr_result(application, text, summary, engine_confidence):
+    """
+    Unsaved OCRResult for ``application`` scored by the keyword verifier,
+    plus whether the application is auto-verified.
+    """
+    from .models import OCRResult
+    from .verification import get_verifier
+
+    verification = get_verifier().score_application(application, text, engine_confidence)
+    result = OCRResult(
+        application_id=application.pk,
+        extracted_text=text,
+        ocr_summary=summary,
+        engine_confidence=engine_confidence,
+        confidence_score=verification.score,
+        keywords_found=verification.keywords,
+        verified=verification.verified,
+    )
+    return result, verification.verified
+
+
+def save_auto_verified(verified):
+    """Write ``{application pk: bool}`` to ExamApplication.auto_verified"""
+    from django.utils import timezone
+    from .models import ExamApplication
+
+    now = timezone.now()
+    for value in (True, False):
+        pks = [pk for pk, flag in verified.items() if flag is value]
+        if pks:
+            # updated_at moves too so API clients revalidating by ETag see it
+            ExamApplication.objects.filter(pk__in=pks).update(auto_verified=value, updated_at=now)
+
+
+def available_engines():
+    """Names of the OCR engines importable in this environment"""
+    engines = []
+    if pytesseract is not None:
+        try:
+            pytesseract.get_tesseract_version()
+            engines.append('tesseract')
+        except pytesseract.TesseractNotFoundError:
+            pass
+    if pypdf is not None:
+        engines.append('pypdf')
+    return engines
+
+
+def document_kind(header):
+    """Classify a document by its leading magic bytes"""
+    if header.startswith(PDF_MAGIC):
+        return 'pdf'
+    if header.startswith(JPEG_MAGIC) or header.startswith(PNG_MAGIC):
+        return 'image'
+    return None
+
+
+def _ocr_image(buffer):
+    image = Image.open(buffer)
+    data = pytesseract.image_to_data(image, output_type=pytesseract.Output.DICT)
+    words = [word for word in data['text'] if word.strip()]
+    confidences = [float(c) for c, word in zip(data['conf'], data['text'])
+                   if word.strip() and float(c) >= 0]
+    confidence = sum(confidences) / len(confidences) / 100 if confidences else 0.0
+    return ' '.join(words), confidence
+
+
+def _ocr_pdf(buffer):
+    reader = pypdf.PdfReader(buffer)
+    text = '\n'.join(page.extract_text() or '' for page in reader.pages)
+    return text, 1.0 if text.strip() else 0.0
+
+
+@contextmanager
+def open_document(location, mapped=True):
+    """
+    Seekable file-like over the bytes at ``location``, a ``(path, offset,
+    size)`` from ContentAddressedStorage.locate(). Live files are
+    memory-mapped rather than read into a private buffer unless ``mapped``
+    is false; packed documents are read straight out of their archive.
+    """
+    from .storage import ArchiveMember
+
+    path, offset, size = location
+    if offset:
+        with io.BufferedReader(ArchiveMember(path, offset, size)) as buffer:
+            yield buffer
+    elif not mapped:
+        with open(path, 'rb') as buffer:
+            yield buffer
+    else:
+        with open(path, 'rb') as handle, mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+            yield buffer
+
+
+def extract_document(location):
+    """
+    Extract text from the document at ``location`` (see open_document()).
+    Runs inside worker processes, so it only touches the file system.
+
+    Returns a dict with ``text``, ``confidence``, ``engine`` and ``summary``.
+    """
+    if location[2] == 0:
+        return {'text': '', 'confidence': 0.0, 'engine': None, 'summary': 'Empty document'}
+    with open_document(location) as buffer:
+        kind = document_kind(buffer.read(8))
+        buffer.seek(0)
+        if kind == 'image' and pytesseract is not None:
+            engine = 'tesseract'
+            try:
+                text, confidence = _ocr_image(buffer)
+            except pytesseract.TesseractNotFoundError:
+                engine = None
+        elif kind == 'pdf' and pypdf is not None:
+            engine = 'pypdf'
+            text, confidence = _ocr_pdf(buffer)
+        else:
+            engine = None
+
+    if engine is None:
+        return {
+            'text': '',
+            'confidence': 0.0,
+            'engine': None,
+            'summary': f'No OCR engine available for {kind or "unknown"} documents; manual review required',
+        }
+
+    text = text.strip()
+    summary = text[:SUMMARY_LENGTH] if text else f'No text found by {engine}'
+    return {'text': text, 'confidence': confidence, 'engine': engine, 'summary': summary}
+
+
+def process_job(job):
+    """Process-pool entry point: ``(job_id, location)`` -> ``(job_id, result, error)``"""
+    job_id, location = job
+    try:
+        return job_id, extract_document(location), None
+    except Exception as exc:
+        return job_id, None, f'{type(exc).__name__}: {exc}'
@@ -0,0 +1,183 @@
+# ============================================================================
+# outbox.py - Email Outbox for Student Notifications
+# ============================================================================
+#
+# notify_student() (notifications.py) writes a Notification and, through
+# queue_email() for the types listed in EMAIL_TYPES, an EmailOutbox row in
+# the same transaction: the email is queued if and only if the
+# notification exists, and no request waits on SMTP.
+#
+# run_email_workers drains the outbox in batches over one reused
+# connection to the configured EMAIL_BACKEND. Rows wait DIGEST_DELAY
+# seconds first, and a student's due rows are coalesced into a single
+# digest message. Failed sends are retried with exponential backoff up to
+# --max-attempts. Delivery is at-least-once: a worker that dies mid-batch
+# leaves rows in 'sending' that are requeued after --reclaim-after.
+#
+# Configure with settings.EMAIL_OUTBOX (merged over DEFAULTS). Point
+# EMAIL_BACKEND at the file backend or a local SMTP stand-in to try it.
+
+import smtplib
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMessage
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from . import metrics
+from .models import EmailOutbox
+
+DEFAULTS = {
+    # Notification types that are also emailed
+    'EMAIL_TYPES': ['status_update', 'officer_message', 'lecturer_message'],
+    # Seconds a row waits so a burst of notifications becomes one digest
+    'DIGEST_DELAY': 60,
+    # Retry n waits RETRY_BACKOFF * 2 ** (n - 1) seconds, at most RETRY_BACKOFF_MAX
+    'RETRY_BACKOFF': 30,
+    'RETRY_BACKOFF_MAX': 3600,
+    'SUBJECT_PREFIX': '[Exam Tracking] ',
+}
+
+EMAILS_SENT = metrics.Counter('email_messages_sent', 'Email messages handed to the mail server')
+EMAIL_NOTIFICATIONS_SENT = metrics.Counter('email_notifications_sent', 'Notifications delivered by email')
+EMAIL_DIGESTS = metrics.Counter('email_digests_sent', 'Messages coalescing several notifications')
+EMAIL_RETRIES = metrics.Counter('email_retries', 'Notification emails requeued after a failed send')
+EMAIL_FAILED = metrics.Counter('email_failed', 'Notification emails given up after the last attempt')
+
+
+def outbox_config():
+    return {**DEFAULTS, **getattr(settings, 'EMAIL_OUTBOX', {})}
+
+
+# ============================================================================
+# Enqueue
+# ============================================================================
+
+def queue_email(notification):
+    """Queue the email for a just-created ``notification``; call inside its transaction"""
+    config = outbox_config()
+    student = notification.student
+    if notification.notification_type in config['EMAIL_TYPES'] and student.email:
+        EmailOutbox.objects.create(
+            notification=notification,
+            to_email=student.email,
+            subject=notification.title[:200],
+            body=notification.message,
+            send_after=timezone.now() + timedelta(seconds=config['DIGEST_DELAY']),
+        )
+
+
+def discard_pending_emails(notification):
+    """Drop unsent email for a notification that is being replaced"""
+    # Rows already claimed by a worker are sent regardless
+    EmailOutbox.objects.filter(notification=notification, status='pending').delete()
+
+
+# ============================================================================
+# Delivery (run_email_workers)
+# ============================================================================
+
+def reclaim_stale(reclaim_after):
+    """Requeue rows left in 'sending' by a worker that died"""
+    cutoff = timezone.now() - timedelta(seconds=reclaim_after)
+    return EmailOutbox.objects.filter(status='sending', started_at__lt=cutoff).update(status='pending')
+
+
+def claim_batch(batch_size):
+    """
+    Atomically move a batch of due rows to sending, along with every other
+    due row of the same recipients so each gets a single digest
+    """
+    with transaction.atomic():
+        due = EmailOutbox.objects.select_for_update(skip_locked=True).filter(
+            status='pending', send_after__lte=timezone.now()
+        )
+        rows = list(due.order_by('send_after')[:batch_size])
+        if rows:
+            rows += due.filter(to_email__in={row.to_email for row in rows}).exclude(
+                pk__in=[row.pk for row in rows]
+            )
+            EmailOutbox.objects.filter(pk__in=[row.pk for row in rows]).update(
+                status='sending', started_at=timezone.now(), attempts=F('attempts') + 1
+            )
+            for row in rows:
+                row.attempts += 1
+    return rows
+
+
+def build_messages(rows):
+    """``[(EmailMessage, rows)]``: one message per recipient, a digest when several are due"""
+    config = outbox_config()
+    by_recipient = {}
+    for row in rows:
+        by_recipient.setdefault(row.to_email, []).append(row)
+
+    messages = []
+    for to_email, group in by_recipient.items():
+        group.sort(key=lambda row: row.created_at)
+        if len(group) == 1:
+            subject, body = group[0].subject, group[0].body
+        else:
+            subject = f'{len(group)} updates on your exam applications'
+            body = '\n\n'.join(f'{row.subject}\n{row.body}' for row in group)
+        body += '\n\nSign in to the Exam Tracking System for details.'
+        messages.append((EmailMessage(config['SUBJECT_PREFIX'] + subject, body, None, [to_email]), group))
+    return messages
+
+
+def retry_delay(attempts):
+    config = outbox_config()
+    return min(config['RETRY_BACKOFF'] * 2 ** (attempts - 1), config['RETRY_BACKOFF_MAX'])
+
+
+def send_batch(connection, rows, max_attempts):
+    """
+    Send claimed rows over ``connection`` and record each outcome.
+    Returns the number of messages sent. The connection stays open across
+    messages and batches; one broken by an error is reopened for the next
+    message.
+    """
+    sent_rows, failed = [], []
+    messages_sent = digests = 0
+    for message, group in build_messages(rows):
+        try:
+            connection.open()
+            connection.send_messages([message])
+        except Exception as exc:
+            # A refusal leaves the SMTP session usable; anything else may not
+            if not isinstance(exc, (smtplib.SMTPResponseException, smtplib.SMTPRecipientsRefused)):
+                connection.close()
+            failed.append((group, f'{type(exc).__name__}: {exc}'))
+        else:
+            sent_rows += group
+            messages_sent += 1
+            digests += len(group) > 1
+
+    now = timezone.now()
+    for row in sent_rows:
+        row.status, row.error, row.sent_at = 'sent', '', now
+    retried = given_up = 0
+    for group, error in failed:
+        for row in group:
+            row.error = error
+            if row.attempts >= max_attempts:
+                row.status = 'failed'
+                given_up += 1
+            else:
+                row.status = 'pending'
+                row.send_after = now + timedelta(seconds=retry_delay(row.attempts))
+                retried += 1
+    EmailOutbox.objects.bulk_update(rows, ['status', 'error', 'sent_at', 'send_after'])
+
+    if messages_sent:
+        EMAILS_SENT.inc(messages_sent)
+        EMAIL_NOTIFICATIONS_SENT.inc(len(sent_rows))
+    if digests:
+        EMAIL_DIGESTS.inc(digests)
+    if retried:
+        EMAIL_RETRIES.inc(retried)
+    if given_up:
+        EMAIL_FAILED.inc(given_up)
+    return messages_sent
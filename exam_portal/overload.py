@@ -0,0 +1,228 @@
+# ============================================================================
+# overload.py - Overload Detection and Load Shedding
+# ============================================================================
+#
+# OverloadMiddleware tracks in-flight requests and an EWMA of database query
+# latency per worker. Past the configured thresholds the worker is
+# "overloaded" until both fall back below RECOVERY_RATIO of the threshold:
+#   - views listed in SHED_VIEWS answer 503 with Retry-After immediately;
+#   - dashboards are served from their last-known-good snapshot;
+#   - free-text search on list pages is switched off.
+# PRIORITY_VIEWS are never shed.
+#
+# Query latency is measured by an execute wrapper installed on every
+# database connection. It times only queries run inside timing_queries(),
+# which sets a context variable: under ASGI that follows the request into
+# the sync_to_async threads that run its queries.
+
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.cache import caches
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+from django.http import HttpResponse
+
+from . import metrics
+
+DEFAULTS = {
+    'MAX_IN_FLIGHT': 32,
+    'DB_LATENCY_MS': 250,
+    'RECOVERY_RATIO': 0.5,
+    'RETRY_AFTER': 30,
+    'SNAPSHOT_REFRESH': 30,
+    'SHED_VIEWS': [],
+    'PRIORITY_VIEWS': [],
+}
+
+# Weight of the newest query in the latency average
+LATENCY_EWMA_ALPHA = 0.2
+
+OVERLOAD_ACTIVE = metrics.Gauge('overload_active', 'Last worker state change: 1 overloaded, 0 normal')
+OVERLOAD_TRANSITIONS = metrics.Counter('overload_transitions', 'Times a worker entered overload mode')
+SHED_REQUESTS = metrics.Counter('overload_shed_requests', 'Requests answered with 503 under overload')
+DEGRADED_DASHBOARDS = metrics.Counter('overload_degraded_dashboards', 'Dashboards served from a snapshot')
+SEARCH_DISABLED = metrics.Counter('overload_search_disabled', 'Searches ignored under overload')
+
+_timing_queries = ContextVar('overload_timing_queries', default=False)
+
+
+def overload_config():
+    return {**DEFAULTS, **getattr(settings, 'OVERLOAD', {})}
+
+
+class OverloadController:
+    """Per-worker view of request concurrency and database latency"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.in_flight = 0
+        self.db_latency_ms = 0.0
+        self.overloaded = False
+
+    def request_started(self):
+        with self._lock:
+            self.in_flight += 1
+
+    def request_finished(self):
+        with self._lock:
+            self.in_flight -= 1
+
+    def time_query(self, execute, sql, params, many, context):
+        """Execute wrapper feeding the latency average"""
+        if not _timing_queries.get():
+            return execute(sql, params, many, context)
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = (time.perf_counter() - start) * 1000
+            self.db_latency_ms += LATENCY_EWMA_ALPHA * (elapsed - self.db_latency_ms)
+
+    def is_overloaded(self):
+        config = overload_config()
+        max_in_flight = config['MAX_IN_FLIGHT']
+        max_latency = config['DB_LATENCY_MS']
+
+        if self.overloaded:
+            ratio = config['RECOVERY_RATIO']
+            overloaded = (self.in_flight > max_in_flight * ratio
+                          or self.db_latency_ms > max_latency * ratio)
+        else:
+            overloaded = self.in_flight > max_in_flight or self.db_latency_ms > max_latency
+
+        if overloaded != self.overloaded:
+            self.overloaded = overloaded
+            OVERLOAD_ACTIVE.set(int(overloaded))
+            if overloaded:
+                OVERLOAD_TRANSITIONS.inc()
+        return overloaded
+
+    def state(self):
+        return {
+            'overloaded': self.is_overloaded(),
+            'in_flight': self.in_flight,
+            'db_latency_ms': round(self.db_latency_ms, 2),
+        }
+
+
+controller = OverloadController()
+
+
+@contextmanager
+def timing_queries():
+    """Feed queries run in this context into the latency average"""
+    token = _timing_queries.set(True)
+    try:
+        yield
+    finally:
+        _timing_queries.reset(token)
+
+
+@receiver(connection_created)
+def install_query_timer(sender, connection, **kwargs):
+    # First, so execute_wrapper() blocks still pop their own wrapper;
+    # connection_created fires again on every reconnect
+    if controller.time_query not in connection.execute_wrappers:
+        connection.execute_wrappers.insert(0, controller.time_query)
+
+
+class OverloadMiddleware:
+    """Track load and shed non-critical views while overloaded"""
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+            # Django runs a sync process_view in a thread under ASGI
+            self.process_view = self.aprocess_view
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        controller.request_started()
+        try:
+            with timing_queries():
+                return self.get_response(request)
+        finally:
+            controller.request_finished()
+
+    async def __acall__(self, request):
+        controller.request_started()
+        try:
+            with timing_queries():
+                return await self.get_response(request)
+        finally:
+            controller.request_finished()
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        return self.shed(request)
+
+    async def aprocess_view(self, request, view_func, view_args, view_kwargs):
+        return self.shed(request)
+
+    def shed(self, request):
+        """503 response if the view may be shed right now, else None"""
+        config = overload_config()
+        url_name = request.resolver_match.url_name
+        if url_name in config['PRIORITY_VIEWS'] or url_name not in config['SHED_VIEWS']:
+            return None
+        if not controller.is_overloaded():
+            return None
+
+        SHED_REQUESTS.inc()
+        response = HttpResponse('The service is under heavy load. Please try again shortly.',
+                                status=503, content_type='text/plain')
+        response['Retry-After'] = str(config['RETRY_AFTER'])
+        return response
+
+
+# ============================================================================
+# Degradation helpers used by views
+# ============================================================================
+
+_snapshot_refreshed = {}
+
+
+def _snapshot_cache():
+    return caches[getattr(settings, 'SINGLE_FLIGHT_CACHE_ALIAS', 'default')]
+
+
+def with_snapshot(key, compute):
+    """
+    Return ``compute()``, keeping a last-known-good copy in the shared
+    cache. While overloaded the copy is returned without computing.
+    """
+    cache = _snapshot_cache()
+    snapshot_key = f'exam_portal:snapshot:{key}'
+
+    if controller.is_overloaded():
+        value = cache.get(snapshot_key)
+        if value is not None:
+            DEGRADED_DASHBOARDS.inc()
+            return value
+
+    value = compute()
+    # Refresh the snapshot at most every SNAPSHOT_REFRESH seconds per worker
+    now = time.monotonic()
+    if now - _snapshot_refreshed.get(key, float('-inf')) >= overload_config()['SNAPSHOT_REFRESH']:
+        cache.set(snapshot_key, value, None)
+        _snapshot_refreshed[key] = now
+    return value
+
+
+def get_search_query(request):
+    """The ?search= term, or '' while search is switched off under overload"""
+    query = request.GET.get('search', '')
+    if query and controller.is_overloaded():
+        SEARCH_DISABLED.inc()
+        request.search_disabled = True
+        return ''
+    return query
@@ -0,0 +1,169 @@
+# ============================================================================
+# previews.py - Document Previews and Thumbnails
+# ============================================================================
+#
+# student_apply_exam queues a DocumentPreview per distinct content hash; the
+# run_preview_workers command renders the first page of each queued
+# document in a process pool into two derived assets:
+#
+#     MEDIA_ROOT/previews/ab/cd/<hash>.preview.webp    (PREVIEW_SIZE px)
+#     MEDIA_ROOT/previews/ab/cd/<hash>.thumb.webp      (THUMBNAIL_SIZE px)
+#
+# Engines are optional:
+#   - images: Pillow (large JPEGs are decoded at reduced scale via draft())
+#   - PDFs:   pypdfium2, else the poppler ``pdftoppm`` binary
+# Documents no engine can render are marked unsupported.
+#
+# Configure with settings.DOCUMENT_PREVIEWS (merged over DEFAULTS).
+
+import os
+import shutil
+import subprocess
+import tempfile
+import uuid
+
+from .ocr import document_kind, open_document
+
+try:
+    from PIL import Image, ImageOps, features
+except ImportError:  # pragma: no cover - optional dependency
+    Image = ImageOps = features = None
+
+try:
+    import pypdfium2
+except ImportError:  # pragma: no cover - optional dependency
+    pypdfium2 = None
+
+DEFAULTS = {
+    'PREVIEW_SIZE': 1024,
+    'THUMBNAIL_SIZE': 200,
+    'QUALITY': 75,
+    # Resolution the first PDF page is rasterised at before downscaling
+    'PDF_DPI': 110,
+    'PREFIX': 'previews',
+}
+
+
+def preview_config():
+    from django.conf import settings
+    return {**DEFAULTS, **getattr(settings, 'DOCUMENT_PREVIEWS', {})}
+
+
+def enqueue_preview(application):
+    """Queue a preview for an application's document unless one exists"""
+    from .models import DocumentPreview
+
+    if not application.document_hash:
+        return None
+    preview, _ = DocumentPreview.objects.get_or_create(
+        content_hash=application.document_hash,
+        defaults={'source_name': application.supporting_document.name},
+    )
+    return preview
+
+
+def preview_names(content_hash, config):
+    """Storage names of the ``(preview, thumbnail)`` for a content hash"""
+    base = f"{config['PREFIX']}/{content_hash[:2]}/{content_hash[2:4]}/{content_hash}"
+    extension = 'webp' if features is not None and features.check('webp') else 'jpg'
+    return f'{base}.preview.{extension}', f'{base}.thumb.{extension}'
+
+
+def available_renderers():
+    """Names of the preview renderers usable in this environment"""
+    renderers = []
+    if Image is not None:
+        renderers.append('pillow')
+        if pypdfium2 is not None:
+            renderers.append('pdfium')
+        elif shutil.which('pdftoppm'):
+            renderers.append('pdftoppm')
+    return renderers
+
+
+# ============================================================================
+# Rendering (runs in worker processes)
+# ============================================================================
+
+def _open_image(buffer, size):
+    image = Image.open(buffer)
+    # JPEG decoders can scale by 1/2..1/8 while decoding
+    image.draft('RGB', (size, size))
+    image.load()
+    return ImageOps.exif_transpose(image)
+
+
+def _render_pdf(buffer, dpi):
+    if pypdfium2 is not None:
+        document = pypdfium2.PdfDocument(buffer)
+        try:
+            return document[0].render(scale=dpi / 72).to_pil()
+        finally:
+            document.close()
+
+    if not shutil.which('pdftoppm'):
+        return None
+    with tempfile.TemporaryDirectory() as directory:
+        prefix = os.path.join(directory, 'page')
+        # '-' reads the PDF from stdin
+        subprocess.run(
+            ['pdftoppm', '-f', '1', '-l', '1', '-r', str(dpi), '-png', '-singlefile', '-', prefix],
+            input=buffer.read(), check=True, capture_output=True, timeout=60,
+        )
+        with Image.open(f'{prefix}.png') as page:
+            page.load()
+            return page.copy()
+
+
+def _save_atomic(image, path, quality):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    temp_path = f'{path}.{uuid.uuid4().hex}.tmp'
+    image_format = 'WEBP' if path.endswith('.webp') else 'JPEG'
+    try:
+        image.save(temp_path, image_format, quality=quality, optimize=True)
+        os.replace(temp_path, path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+
+def render_previews(source, preview_path, thumbnail_path, config):
+    """
+    Render the first page of the document at ``source`` (a location, see
+    ocr.open_document()) into a preview and a thumbnail. Returns
+    ``(width, height)`` of the preview, or None if no renderer handles the
+    document.
+    """
+    if Image is None or source[2] == 0:
+        return None
+    # pypdfium2 needs a stream with readinto(), which mmap lacks
+    with open_document(source, mapped=False) as buffer:
+        kind = document_kind(buffer.read(8))
+        buffer.seek(0)
+        if kind == 'image':
+            image = _open_image(buffer, config['PREVIEW_SIZE'])
+        elif kind == 'pdf':
+            image = _render_pdf(buffer, config['PDF_DPI'])
+        else:
+            image = None
+    if image is None:
+        return None
+
+    if image.mode not in ('RGB', 'L'):
+        image = image.convert('RGB')
+    image.thumbnail((config['PREVIEW_SIZE'], config['PREVIEW_SIZE']))
+    _save_atomic(image, preview_path, config['QUALITY'])
+    size = image.size
+    image.thumbnail((config['THUMBNAIL_SIZE'], config['THUMBNAIL_SIZE']))
+    _save_atomic(image, thumbnail_path, config['QUALITY'])
+    return size
+
+
+def process_preview(job):
+    """Process-pool entry point: ``(pk, source, preview, thumbnail, config)`` -> ``(pk, size, error)``"""
+    pk, source, preview_path, thumbnail_path, config = job
+    try:
+        return pk, render_previews(source, preview_path, thumbnail_path, config), None
+    except Exception as exc:
+        return pk, None, f'{type(exc).__name__}: {exc}'
@@ -0,0 +1,90 @@
+# ============================================================================
+# querypool.py - Concurrent Read Queries for Dashboards
+# ============================================================================
+#
+# Dashboards issue several independent aggregates. Django's async ORM
+# (acount() etc.) still runs every query on the request's one thread, so
+# awaiting them one after another is no faster than the sync views.
+# Instead the queries are handed to a bounded per-process thread pool;
+# each worker thread holds its own database connection, so up to
+# MAX_WORKERS queries of one page are in flight at once.
+#
+#   stats = run_queries({'total': Student.objects.count, ...})         # sync
+#   stats = await gather_queries({'total': Student.objects.count, ...})  # async
+#
+# Workers do not see the caller's open transaction: use this for
+# read-only queries whose results are not tied to uncommitted writes.
+# Each worker's connection stays open for the life of the process (see
+# _run), so the pool holds at most MAX_WORKERS extra connections.
+#
+# Configure with settings.QUERY_POOL (merged over DEFAULTS).
+# MAX_WORKERS = 0 runs the queries one after another in the caller.
+
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import connection
+
+from .overload import timing_queries
+
+DEFAULTS = {
+    # Threads, and so database connections, per process
+    'MAX_WORKERS': 4,
+}
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def query_pool_config():
+    return {**DEFAULTS, **getattr(settings, 'QUERY_POOL', {})}
+
+
+def _get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=query_pool_config()['MAX_WORKERS'],
+                                           thread_name_prefix='exam-portal-query')
+        return _executor
+
+
+def _run(query):
+    try:
+        # Keep feeding the overload detector's latency average
+        with timing_queries():
+            return query()
+    finally:
+        # A worker keeps its connection between queries whatever
+        # CONN_MAX_AGE says: reconnecting per query would cost more than
+        # running them concurrently saves. One broken by an error is closed
+        # and reopened on next use.
+        if connection.connection is not None and connection.errors_occurred:
+            if not connection.is_usable():
+                connection.close()
+            connection.errors_occurred = False
+        connection.health_check_done = False
+
+
+def run_queries(queries):
+    """Run ``{name: callable}`` concurrently and return ``{name: result}``"""
+    if query_pool_config()['MAX_WORKERS'] <= 0:
+        return {name: query() for name, query in queries.items()}
+
+    executor = _get_executor()
+    futures = {name: executor.submit(_run, query) for name, query in queries.items()}
+    return {name: future.result() for name, future in futures.items()}
+
+
+async def gather_queries(queries):
+    """Async run_queries: awaits the results without holding a thread"""
+    if query_pool_config()['MAX_WORKERS'] <= 0:
+        return await sync_to_async(run_queries)(queries)
+
+    loop = asyncio.get_running_loop()
+    executor = _get_executor()
+    results = await asyncio.gather(*(loop.run_in_executor(executor, _run, query) for query in queries.values()))
+    return dict(zip(queries, results))
@@ -0,0 +1,359 @@
+# ============================================================================
+# reports.py - Background PDF Summary Reports
+# ============================================================================
+#
+# A report covers one school x year/semester taken x exam type (or all
+# types). Requesting one creates a Report row keyed by those parameters
+# plus a data version: a hash of an aggregate over the covered
+# applications that changes whenever one of them is added, deleted, saved,
+# re-verified or marked, or its student is edited. The run_report_workers
+# command renders pending reports in a process pool into
+#
+#     MEDIA_ROOT/reports/<school>/<year>-<semester>-<exam type>-<version>.pdf
+#
+# Until the data changes, later requests get the finished Report and its
+# file without rendering again.
+#
+# PDFs are written by a small built-in writer using the standard Type 1
+# fonts, so rendering needs no third-party library.
+#
+# Configure with settings.REPORTS (merged over DEFAULTS).
+
+import hashlib
+import os
+import uuid
+import zlib
+from collections import Counter, defaultdict
+
+DEFAULTS = {
+    'PREFIX': 'reports',
+}
+
+PAGE_WIDTH, PAGE_HEIGHT = 595, 842  # A4 in points
+MARGIN = 50
+
+FONTS = {
+    'F1': 'Helvetica',
+    'F2': 'Helvetica-Bold',
+    'F3': 'Courier',
+}
+# Courier glyphs are 0.6 em wide, so tables can be laid out in characters
+COURIER_WIDTH = 0.6
+
+
+def report_config():
+    from django.conf import settings
+    return {**DEFAULTS, **getattr(settings, 'REPORTS', {})}
+
+
+def report_applications(params):
+    """Applications covered by a report for ``params``"""
+    from .models import ExamApplication
+
+    applications = ExamApplication.objects.filter(
+        student__school=params['school'],
+        year_taken=params['year_taken'],
+        semester_taken=params['semester_taken'],
+    )
+    if params['exam_type']:
+        applications = applications.filter(exam_type=params['exam_type'])
+    return applications
+
+
+def data_version(applications):
+    """Stamp that changes whenever anything shown in the report changes"""
+    from django.db.models import Count, Max, Q
+
+    # Bulk updates skip auto_now, hence the separate auto_verified count
+    stamp = applications.aggregate(
+        count=Count('pk'),
+        ids=Max('pk'),
+        updated=Max('updated_at'),
+        verified=Count('pk', filter=Q(auto_verified=True)),
+        students=Max('student__updated_at'),
+        marked=Count('marking'),
+        marking=Max('marking__updated_at'),
+    )
+    return hashlib.sha256(repr(sorted(stamp.items())).encode()).hexdigest()
+
+
+def request_report(params, user=None):
+    """The report for ``params`` at the current data version, queued if new"""
+    from .models import Report
+
+    report, created = Report.objects.get_or_create(
+        **params,
+        data_version=data_version(report_applications(params)),
+        defaults={'requested_by': user},
+    )
+    missing = report.status == 'done' and not report.artifact.storage.exists(report.artifact.name)
+    if not created and (report.status == 'failed' or missing):
+        report.status, report.attempts, report.error = 'pending', 0, ''
+        report.save(update_fields=['status', 'attempts', 'error'])
+    return report
+
+
+def report_name(report, config):
+    exam_type = report.exam_type or 'all'
+    return (f"{config['PREFIX']}/{report.school}/{report.year_taken}-{report.semester_taken}-"
+            f"{exam_type}-{report.data_version[:16]}.pdf")
+
+
+def report_data(report):
+    """Plain data a worker process needs to render ``report``"""
+    from django.utils import timezone
+    from .models import ExamApplication, Student
+
+    statuses = dict(ExamApplication.STATUS_CHOICES)
+    exam_types = dict(ExamApplication.EXAM_TYPE_CHOICES)
+    applications = report_applications({
+        'school': report.school,
+        'year_taken': report.year_taken,
+        'semester_taken': report.semester_taken,
+        'exam_type': report.exam_type,
+    }).order_by('unit_code', 'application_id')
+
+    rows = []
+    for (app_id, registration, first_name, last_name, unit_code, unit_name, exam_type, status,
+         verified, marks) in applications.values_list(
+            'application_id', 'student__registration_number', 'student__first_name',
+            'student__last_name', 'unit_code', 'unit_name', 'exam_type', 'status',
+            'auto_verified', 'marking__marks').iterator(chunk_size=2000):
+        rows.append((app_id, registration, f'{first_name} {last_name}', unit_code, unit_name,
+                     exam_types.get(exam_type, exam_type), statuses.get(status, status), verified,
+                     None if marks is None else float(marks)))
+
+    return {
+        'school': dict(Student.SCHOOL_CHOICES).get(report.school, report.school),
+        'period': f'Year {report.year_taken}, Semester {report.semester_taken}',
+        'exam_type': exam_types.get(report.exam_type, 'All exam types'),
+        'generated_at': timezone.localtime().strftime('%Y-%m-%d %H:%M'),
+        'data_version': report.data_version,
+        'statuses': list(statuses.values()),
+        'rows': rows,
+    }
+
+
+# ============================================================================
+# PDF writer
+# ============================================================================
+
+def _pdf_text(text):
+    text = str(text).encode('cp1252', 'replace').decode('latin-1')
+    return text.replace('\\', '\\\\').replace('(', '\\(').replace(')', '\\)')
+
+
+class PdfWriter:
+    """Minimal PDF writer for text-only pages; each page is written as it is added"""
+
+    def __init__(self, handle):
+        self.handle = handle
+        self.position = 0
+        self.offsets = {}
+        self.page_ids = []
+        self.next_id = 3 + len(FONTS)
+        self._write(b'%PDF-1.4\n%\xe2\xe3\xcf\xd3\n')
+        for number, (key, name) in enumerate(FONTS.items(), start=3):
+            self._object(number, (f'<< /Type /Font /Subtype /Type1 /BaseFont /{name} '
+                                  f'/Encoding /WinAnsiEncoding >>').encode())
+
+    def _write(self, data):
+        self.handle.write(data)
+        self.position += len(data)
+
+    def _object(self, number, body):
+        self.offsets[number] = self.position
+        self._write(b'%d 0 obj\n' % number + body + b'\nendobj\n')
+
+    def add_page(self, operations):
+        content = zlib.compress('\n'.join(operations).encode('latin-1'))
+        content_id, page_id = self.next_id, self.next_id + 1
+        self.next_id += 2
+        self._object(content_id, b'<< /Length %d /Filter /FlateDecode >>\nstream\n' % len(content)
+                     + content + b'\nendstream')
+        fonts = ' '.join(f'/{key} {number} 0 R' for number, key in enumerate(FONTS, start=3))
+        self._object(page_id, (
+            f'<< /Type /Page /Parent 2 0 R /MediaBox [0 0 {PAGE_WIDTH} {PAGE_HEIGHT}] '
+            f'/Resources << /Font << {fonts} >> >> /Contents {content_id} 0 R >>'
+        ).encode())
+        self.page_ids.append(page_id)
+
+    def close(self):
+        kids = ' '.join(f'{page_id} 0 R' for page_id in self.page_ids)
+        self._object(2, f'<< /Type /Pages /Kids [{kids}] /Count {len(self.page_ids)} >>'.encode())
+        self._object(1, b'<< /Type /Catalog /Pages 2 0 R >>')
+        xref = self.position
+        self._write(b'xref\n0 %d\n0000000000 65535 f \n' % self.next_id)
+        for number in range(1, self.next_id):
+            self._write(b'%010d 00000 n \n' % self.offsets[number])
+        self._write(b'trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n' % (self.next_id, xref))
+
+
+class ReportLayout:
+    """Flows lines and tables down A4 pages of a PdfWriter"""
+
+    def __init__(self, writer, footer):
+        self.writer = writer
+        self.footer = footer
+        self.operations = []
+        self.page_number = 0
+        self.y = 0
+
+    def _new_page(self):
+        if self.page_number:
+            self._finish_page()
+        self.page_number += 1
+        self.y = PAGE_HEIGHT - MARGIN
+
+    def _finish_page(self):
+        self._place(MARGIN, MARGIN / 2, 'F1', 8, self.footer)
+        self._place(PAGE_WIDTH - MARGIN - 40, MARGIN / 2, 'F1', 8, f'Page {self.page_number}')
+        self.writer.add_page(self.operations)
+        self.operations = []
+
+    def _place(self, x, y, font, size, text):
+        self.operations.append(f'BT /{font} {size} Tf {x:.1f} {y:.1f} Td ({_pdf_text(text)}) Tj ET')
+
+    def fits(self, height):
+        return self.page_number and self.y - height >= MARGIN
+
+    def line(self, text, font='F1', size=10, leading=None):
+        leading = leading or size * 1.4
+        if not self.fits(leading):
+            self._new_page()
+        self.y -= leading
+        self._place(MARGIN, self.y, font, size, text)
+
+    def gap(self, height):
+        self.y -= height
+
+    def table(self, columns, rows, size=8):
+        """
+        Courier table; ``columns`` are ``(label, width in characters, align)``.
+        The header is repeated at the top of every page.
+        """
+        leading = size * 1.35
+
+        def format_row(values):
+            cells = []
+            for value, (_, width, align) in zip(values, columns):
+                text = '' if value is None else str(value)
+                if len(text) > width:
+                    text = text[:width - 1] + '~'
+                cells.append(text.rjust(width) if align == '>' else text.ljust(width))
+            return ' '.join(cells)
+
+        header = format_row([label for label, _, _ in columns])
+        rule = '-' * len(header)
+        if not self.fits(leading * 3):
+            self._new_page()
+        self.line(header, 'F3', size, leading)
+        self.line(rule, 'F3', size, leading)
+        for row in rows:
+            if not self.fits(leading):
+                self._new_page()
+                self.line(header, 'F3', size, leading)
+                self.line(rule, 'F3', size, leading)
+            self.line(format_row(row), 'F3', size, leading)
+
+    def close(self):
+        if not self.page_number:
+            self._new_page()
+        self._finish_page()
+        self.writer.close()
+
+
+# ============================================================================
+# Rendering (runs in worker processes)
+# ============================================================================
+
+def _percent(part, whole):
+    return f'{part / whole:.0%}' if whole else '-'
+
+
+def _average(values):
+    return f'{sum(values) / len(values):.1f}' if values else '-'
+
+
+def write_report(data, handle):
+    """Write the PDF for ``data`` (see report_data) to a binary file handle"""
+    rows = data['rows']
+    layout = ReportLayout(PdfWriter(handle), f"{data['school']} - {data['period']} - {data['exam_type']}")
+
+    layout.line('Exam Applications Report', 'F2', 18)
+    layout.line(data['school'], 'F1', 12)
+    layout.line(f"{data['period']} - {data['exam_type']}", 'F1', 12)
+    layout.line(f"Generated {data['generated_at']}, data version {data['data_version'][:12]}", 'F1', 8)
+    layout.gap(12)
+
+    marks = [row[8] for row in rows if row[8] is not None]
+    verified = sum(1 for row in rows if row[7])
+    layout.line('Summary', 'F2', 12)
+    for label, value in (
+        ('Applications', len(rows)),
+        ('Auto-verified', f'{verified} ({_percent(verified, len(rows))})'),
+        ('Marked', f'{len(marks)} ({_percent(len(marks), len(rows))})'),
+        ('Average mark', _average(marks)),
+    ):
+        layout.line(f'{label:<28}{value:>14}', 'F3', 9)
+    layout.gap(12)
+
+    statuses = Counter(row[6] for row in rows)
+    layout.line('Applications by status', 'F2', 12)
+    layout.table([('Status', 40, '<'), ('Applications', 12, '>'), ('Share', 8, '>')], [
+        (status, statuses[status], _percent(statuses[status], len(rows)))
+        for status in data['statuses'] if statuses[status]
+    ])
+    layout.gap(12)
+
+    units = defaultdict(list)
+    for row in rows:
+        units[(row[3], row[4])].append(row)
+    layout.line('Applications by unit', 'F2', 12)
+    layout.table(
+        [('Unit', 10, '<'), ('Unit Name', 40, '<'), ('Apps', 6, '>'), ('Verified', 8, '>'),
+         ('Marked', 6, '>'), ('Avg Mark', 8, '>')],
+        [
+            (code, name, len(unit_rows), sum(1 for row in unit_rows if row[7]),
+             sum(1 for row in unit_rows if row[8] is not None),
+             _average([row[8] for row in unit_rows if row[8] is not None]))
+            for (code, name), unit_rows in sorted(units.items())
+        ],
+    )
+    layout.gap(12)
+
+    layout.line('Applications', 'F2', 12)
+    layout.table(
+        [('Application', 12, '<'), ('Reg. Number', 16, '<'), ('Student', 20, '<'), ('Unit', 9, '<'),
+         ('Type', 7, '<'), ('Status', 22, '<'), ('Mark', 6, '>')],
+        [
+            (row[0], row[1], row[2], row[3], row[5], row[6],
+             '' if row[8] is None else f'{row[8]:.1f}')
+            for row in rows
+        ],
+    )
+    layout.close()
+
+
+def render_report(data, path):
+    """Render ``data`` to a PDF at ``path``; returns the file size"""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    temp_path = f'{path}.{uuid.uuid4().hex}.tmp'
+    try:
+        with open(temp_path, 'wb') as handle:
+            write_report(data, handle)
+        os.replace(temp_path, path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+    return os.path.getsize(path)
+
+
+def process_report(job):
+    """Process-pool entry point: ``(pk, data, path)`` -> ``(pk, size, error)``"""
+    pk, data, path = job
+    try:
+        return pk, render_report(data, path), None
+    except Exception as exc:
+        return pk, None, f'{type(exc).__name__}: {exc}'
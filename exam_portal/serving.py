@@ -0,0 +1,179 @@
+# ============================================================================
+# serving.py - Supporting Document Delivery
+# ============================================================================
+#
+# Documents are served after the view has checked access, without copying
+# them through Python when possible:
+#   - 'x-sendfile':       Apache mod_xsendfile / lighttpd send the file
+#   - 'x-accel-redirect': nginx serves it from an ``internal`` location
+#                         mapped to MEDIA_ROOT at INTERNAL_URL
+#   - 'django':           FileResponse; WSGI servers with wsgi.file_wrapper
+#                         (gunicorn, uWSGI) use sendfile(2) for the body.
+#                         Under ASGI the body is an async iterator reading
+#                         one block at a time off the event loop, since
+#                         Django would otherwise read a sync file into
+#                         memory before sending it
+# Every backend answers If-None-Match / If-Modified-Since with 304 and sets
+# a private Cache-Control. The 'django' backend also honours single-range
+# Range requests; proxies handle ranges themselves. Documents packed into a
+# cold-storage archive (see storage.py) are always sent by the 'django'
+# backend, straight from their offset in the archive.
+#
+# Configure with settings.DOCUMENT_SERVING (merged over DEFAULTS).
+
+import mimetypes
+import os
+import re
+from urllib.parse import quote
+
+from asgiref.sync import sync_to_async
+from django.core.handlers.asgi import ASGIRequest
+from django.http import FileResponse, Http404, HttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import content_disposition_header, http_date, quote_etag
+
+DEFAULTS = {
+    'BACKEND': 'django',
+    'INTERNAL_URL': '/protected-media/',
+    'MAX_AGE': 7 * 24 * 60 * 60,
+    'BLOCK_SIZE': 64 * 1024,
+}
+
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+def serving_config():
+    from django.conf import settings
+    return {**DEFAULTS, **getattr(settings, 'DOCUMENT_SERVING', {})}
+
+
+class FileRange:
+    """Read-only window onto an open file, for ranged responses"""
+
+    def __init__(self, handle, start, length):
+        handle.seek(start)
+        self.handle = handle
+        self.remaining = length
+
+    def read(self, size=-1):
+        if size < 0 or size > self.remaining:
+            size = self.remaining
+        data = self.handle.read(size)
+        self.remaining -= len(data)
+        return data
+
+    def fileno(self):
+        # wsgi.file_wrapper sendfile()s from the current offset, capped by
+        # Content-Length
+        return self.handle.fileno()
+
+    def close(self):
+        self.handle.close()
+
+    async def blocks(self, block_size):
+        """Async iterator over the window, for ASGI responses"""
+        read = sync_to_async(self.read, thread_sensitive=False)
+        try:
+            while data := await read(block_size):
+                yield data
+        finally:
+            await sync_to_async(self.close, thread_sensitive=False)()
+
+
+def parse_range(header, size):
+    """
+    ``(start, end)`` (inclusive) for a single ``bytes=`` range, or None to
+    send the whole file. Raises ValueError if the range is unsatisfiable.
+    """
+    match = RANGE_RE.match(header.replace(' ', ''))
+    if match is None:
+        # Malformed or multiple ranges: a full response is always allowed
+        return None
+    first, last = match.groups()
+    if not first:
+        if not last:
+            return None
+        length = int(last)
+        if length == 0:
+            raise ValueError('Empty suffix range')
+        return max(0, size - length), size - 1
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size or start > end:
+        raise ValueError('Range not satisfiable')
+    return start, end
+
+
+def serve_document(request, field_file, etag=None, filename=None, immutable=False):
+    """
+    Response delivering ``field_file``. ``etag`` defaults to one derived
+    from the file's size and mtime; pass ``immutable`` for content that can
+    never change under the same name.
+    """
+    config = serving_config()
+    try:
+        locate = getattr(field_file.storage, 'locate', None)
+        if locate is not None:
+            path, offset, size = locate(field_file.name)
+        else:
+            path, offset, size = field_file.path, 0, None
+        stat = os.stat(path)
+    except (FileNotFoundError, ValueError):
+        raise Http404('Document not found')
+    if size is None:
+        size = stat.st_size
+
+    etag = quote_etag(etag or f'{size:x}-{int(stat.st_mtime):x}')
+    last_modified = int(stat.st_mtime)
+    filename = filename or os.path.basename(field_file.name)
+    content_type = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if response is None:
+        backend = config['BACKEND'] if offset == 0 else 'django'
+        if backend == 'x-sendfile':
+            response = HttpResponse(content_type=content_type)
+            response['X-Sendfile'] = path
+        elif backend == 'x-accel-redirect':
+            response = HttpResponse(content_type=content_type)
+            response['X-Accel-Redirect'] = config['INTERNAL_URL'] + quote(field_file.name)
+        else:
+            response = _file_response(request, path, offset, size, content_type, etag,
+                                      last_modified, config['BLOCK_SIZE'])
+        response['Content-Disposition'] = content_disposition_header(False, filename)
+
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(last_modified)
+    cache_control = f"private, max-age={config['MAX_AGE']}"
+    response['Cache-Control'] = f'{cache_control}, immutable' if immutable else cache_control
+    return response
+
+
+def _file_response(request, path, offset, size, content_type, etag, last_modified, block_size):
+    byte_range = None
+    range_header = request.headers.get('Range')
+    if_range = request.headers.get('If-Range')
+    # A stale If-Range means the client's partial copy is outdated
+    if range_header and (if_range is None or if_range in (etag, http_date(last_modified))):
+        try:
+            byte_range = parse_range(range_header, size)
+        except ValueError:
+            response = HttpResponse(status=416)
+            response['Content-Range'] = f'bytes */{size}'
+            return response
+
+    if byte_range is None:
+        start, length, status = offset, size, 200
+    else:
+        start, end = byte_range
+        start, length, status = offset + start, end - start + 1, 206
+    body = FileRange(open(path, 'rb'), start, length)
+    if isinstance(request, ASGIRequest):
+        body = body.blocks(block_size)
+    response = FileResponse(body, content_type=content_type, status=status)
+    response['Content-Length'] = length
+    if byte_range is not None:
+        response['Content-Range'] = f'bytes {byte_range[0]}-{byte_range[1]}/{size}'
+    response.block_size = block_size
+    response['Accept-Ranges'] = 'bytes'
+    return response
@@ -0,0 +1,83 @@
+# ============================================================================
+# singleflight.py - Request Coalescing for Expensive Computations
+# ============================================================================
+#
+# single_flight(key, compute) returns the cached value for ``key`` or, on a
+# miss, makes sure only one caller computes it:
+#   - within a worker, threads queue on a per-key lock;
+#   - across workers, the leader holds a lock entry in the shared cache and
+#     followers poll for the published value.
+
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.core.cache import caches
+
+_MISSING = object()
+
+# key -> [lock, number of threads holding or waiting for it]; entries are
+# dropped when the last thread releases so the map only holds keys in flight
+_local_locks = {}
+_local_locks_guard = threading.Lock()
+
+
+@contextmanager
+def _local_lock(key):
+    with _local_locks_guard:
+        entry = _local_locks.get(key)
+        if entry is None:
+            entry = _local_locks[key] = [threading.Lock(), 0]
+        entry[1] += 1
+    try:
+        with entry[0]:
+            yield
+    finally:
+        with _local_locks_guard:
+            entry[1] -= 1
+            if not entry[1]:
+                del _local_locks[key]
+
+
+def single_flight(key, compute, timeout=60, lock_timeout=30, poll_interval=0.05):
+    """
+    Return the cached value for ``key``, computing it with ``compute()`` at
+    most once per key across threads and worker processes.
+
+    ``timeout`` is how long the computed value stays cached. ``lock_timeout``
+    bounds how long a leader may hold the lock; followers that wait longer
+    than that assume the leader died and compute the value themselves.
+    """
+    cache = caches[getattr(settings, 'SINGLE_FLIGHT_CACHE_ALIAS', 'default')]
+    value_key = f'exam_portal:sf:value:{key}'
+    lock_key = f'exam_portal:sf:lock:{key}'
+
+    value = cache.get(value_key, _MISSING)
+    if value is not _MISSING:
+        return value
+
+    with _local_lock(key):
+        # Another thread in this worker may have finished while we waited
+        value = cache.get(value_key, _MISSING)
+        if value is not _MISSING:
+            return value
+
+        token = uuid.uuid4().hex
+        deadline = time.monotonic() + lock_timeout
+        while not cache.add(lock_key, token, lock_timeout):
+            time.sleep(poll_interval)
+            value = cache.get(value_key, _MISSING)
+            if value is not _MISSING:
+                return value
+            if time.monotonic() > deadline:
+                return compute()
+
+        try:
+            value = compute()
+            cache.set(value_key, value, timeout)
+            return value
+        finally:
+            if cache.get(lock_key) == token:
+                cache.delete(lock_key)
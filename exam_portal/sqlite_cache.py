@@ -0,0 +1,294 @@
+# ============================================================================
+# sqlite_cache.py - Shared Cross-Process Cache Backend on a WAL SQLite File
+# ============================================================================
+#
+# Every worker process on a node opens the same SQLite file in WAL mode, so
+# readers never block the single writer and all workers see one cache.
+#
+#   CACHES = {
+#       'shared': {
+#           'BACKEND': 'exam_portal.sqlite_cache.SQLiteCache',
+#           'LOCATION': BASE_DIR / 'var' / 'cache.sqlite3',
+#           'OPTIONS': {
+#               'MAX_ENTRIES': 20000,        # LRU entry cap
+#               'MAX_SIZE': 64 * 1024 * 1024, # LRU byte cap (optional)
+#               'CULL_INTERVAL': 32,         # writes between cap checks
+#           },
+#       },
+#   }
+
+import os
+import pickle
+import sqlite3
+import threading
+import time
+
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+
+# Reads refresh an entry's LRU timestamp at most this often (seconds), so hot
+# keys don't turn every read into a write.
+ACCESS_RESOLUTION = 1.0
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS cache_entries (
+    key TEXT PRIMARY KEY,
+    value BLOB NOT NULL,
+    expires REAL,
+    accessed REAL NOT NULL,
+    size INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS cache_entries_accessed ON cache_entries (accessed);
+CREATE INDEX IF NOT EXISTS cache_entries_expires ON cache_entries (expires);
+"""
+
+
+class SQLiteCache(BaseCache):
+    """Django cache backend storing entries in a shared WAL-mode SQLite file"""
+
+    def __init__(self, location, params):
+        super().__init__(params)
+        options = params.get('OPTIONS', {})
+        self._path = str(location)
+        self._max_size = options.get('MAX_SIZE')
+        self._cull_interval = int(options.get('CULL_INTERVAL', 32))
+        self._busy_timeout = float(options.get('BUSY_TIMEOUT', 5.0))
+        self._local = threading.local()
+        self._writes = 0
+
+    # ------------------------------------------------------------------------
+    # Connection handling
+    # ------------------------------------------------------------------------
+
+    def _connection(self):
+        # One connection per thread; reopen after fork so children never
+        # share a file handle with their parent.
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None and self._local.pid == os.getpid():
+            return conn
+
+        directory = os.path.dirname(self._path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        conn = sqlite3.connect(self._path, timeout=self._busy_timeout,
+                               isolation_level=None, check_same_thread=False)
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+        conn.executescript(SCHEMA)
+        self._local.conn = conn
+        self._local.pid = os.getpid()
+        return conn
+
+    def _immediate(self, conn):
+        """Transaction holding the write lock from the start"""
+        return _ImmediateTransaction(conn)
+
+    # ------------------------------------------------------------------------
+    # Serialization - plain ints are stored raw so incr() can run in SQL
+    # ------------------------------------------------------------------------
+
+    @staticmethod
+    def _encode(value):
+        if type(value) is int:
+            return value
+        return pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+
+    @staticmethod
+    def _decode(value):
+        if isinstance(value, int):
+            return value
+        return pickle.loads(value)
+
+    @staticmethod
+    def _size(encoded):
+        return 8 if isinstance(encoded, int) else len(encoded)
+
+    # ------------------------------------------------------------------------
+    # Cache API
+    # ------------------------------------------------------------------------
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        encoded = self._encode(value)
+        now = time.time()
+        conn = self._connection()
+        with self._immediate(conn):
+            cursor = conn.execute(
+                'INSERT INTO cache_entries (key, value, expires, accessed, size) '
+                'VALUES (?, ?, ?, ?, ?) '
+                'ON CONFLICT (key) DO UPDATE SET value = excluded.value, '
+                'expires = excluded.expires, accessed = excluded.accessed, size = excluded.size '
+                'WHERE cache_entries.expires IS NOT NULL AND cache_entries.expires <= ?',
+                (key, encoded, self.get_backend_timeout(timeout), now, self._size(encoded), now),
+            )
+            added = cursor.rowcount == 1
+        self._after_write(conn)
+        return added
+
+    def get(self, key, default=None, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        conn = self._connection()
+        now = time.time()
+        row = conn.execute(
+            'SELECT value, expires, accessed FROM cache_entries WHERE key = ?', (key,)
+        ).fetchone()
+        if row is None:
+            return default
+
+        value, expires, accessed = row
+        if expires is not None and expires <= now:
+            conn.execute('DELETE FROM cache_entries WHERE key = ? AND expires <= ?', (key, now))
+            return default
+        if accessed < now - ACCESS_RESOLUTION:
+            conn.execute('UPDATE cache_entries SET accessed = ? WHERE key = ?', (now, key))
+        return self._decode(value)
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        encoded = self._encode(value)
+        conn = self._connection()
+        conn.execute(
+            'INSERT OR REPLACE INTO cache_entries (key, value, expires, accessed, size) '
+            'VALUES (?, ?, ?, ?, ?)',
+            (key, encoded, self.get_backend_timeout(timeout), time.time(), self._size(encoded)),
+        )
+        self._after_write(conn)
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        now = time.time()
+        cursor = self._connection().execute(
+            'UPDATE cache_entries SET expires = ?, accessed = ? '
+            'WHERE key = ? AND (expires IS NULL OR expires > ?)',
+            (self.get_backend_timeout(timeout), now, key, now),
+        )
+        return cursor.rowcount == 1
+
+    def delete(self, key, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        cursor = self._connection().execute('DELETE FROM cache_entries WHERE key = ?', (key,))
+        return cursor.rowcount == 1
+
+    def has_key(self, key, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        row = self._connection().execute(
+            'SELECT 1 FROM cache_entries WHERE key = ? AND (expires IS NULL OR expires > ?)',
+            (key, time.time()),
+        ).fetchone()
+        return row is not None
+
+    def incr(self, key, delta=1, version=None):
+        """Atomically add ``delta`` to an integer entry, across processes"""
+        key = self.make_and_validate_key(key, version=version)
+        conn = self._connection()
+        now = time.time()
+        with self._immediate(conn):
+            row = conn.execute(
+                'SELECT value FROM cache_entries WHERE key = ? AND (expires IS NULL OR expires > ?)',
+                (key, now),
+            ).fetchone()
+            if row is None:
+                raise ValueError("Key '%s' not found" % key)
+            value = self._decode(row[0]) + delta
+            encoded = self._encode(value)
+            conn.execute(
+                'UPDATE cache_entries SET value = ?, accessed = ?, size = ? WHERE key = ?',
+                (encoded, now, self._size(encoded), key),
+            )
+        return value
+
+    def get_many(self, keys, version=None):
+        key_map = {self.make_and_validate_key(key, version=version): key for key in keys}
+        if not key_map:
+            return {}
+        now = time.time()
+        placeholders = ', '.join('?' * len(key_map))
+        rows = self._connection().execute(
+            'SELECT key, value FROM cache_entries WHERE key IN (%s) '
+            'AND (expires IS NULL OR expires > ?)' % placeholders,
+            (*key_map, now),
+        ).fetchall()
+        return {key_map[key]: self._decode(value) for key, value in rows}
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        expires = self.get_backend_timeout(timeout)
+        now = time.time()
+        rows = []
+        for key, value in data.items():
+            encoded = self._encode(value)
+            rows.append((self.make_and_validate_key(key, version=version), encoded,
+                         expires, now, self._size(encoded)))
+        conn = self._connection()
+        with self._immediate(conn):
+            conn.executemany(
+                'INSERT OR REPLACE INTO cache_entries (key, value, expires, accessed, size) '
+                'VALUES (?, ?, ?, ?, ?)', rows,
+            )
+        self._after_write(conn, len(rows))
+        return []
+
+    def delete_many(self, keys, version=None):
+        keys = [self.make_and_validate_key(key, version=version) for key in keys]
+        if not keys:
+            return
+        conn = self._connection()
+        with self._immediate(conn):
+            conn.executemany('DELETE FROM cache_entries WHERE key = ?', [(key,) for key in keys])
+
+    def clear(self):
+        self._connection().execute('DELETE FROM cache_entries')
+
+    # ------------------------------------------------------------------------
+    # Eviction
+    # ------------------------------------------------------------------------
+
+    def _after_write(self, conn, count=1):
+        self._writes += count
+        if self._writes >= self._cull_interval:
+            self._writes = 0
+            self._cull(conn)
+
+    def _cull(self, conn):
+        """Drop expired entries, then least-recently-used ones past the caps"""
+        with self._immediate(conn):
+            conn.execute('DELETE FROM cache_entries WHERE expires IS NOT NULL AND expires <= ?',
+                         (time.time(),))
+            entries, total_size = conn.execute(
+                'SELECT COUNT(*), COALESCE(SUM(size), 0) FROM cache_entries'
+            ).fetchone()
+
+            excess = 0
+            if entries > self._max_entries:
+                # Like the built-in backends, cull a 1/CULL_FREQUENCY slice
+                # so the cap isn't hit again on the very next write.
+                target = self._max_entries
+                if self._cull_frequency:
+                    target -= self._max_entries // self._cull_frequency
+                excess = entries - target
+
+            if self._max_size and total_size > self._max_size:
+                freed = 0
+                by_size = 0
+                for (size,) in conn.execute('SELECT size FROM cache_entries ORDER BY accessed'):
+                    freed += size
+                    by_size += 1
+                    if total_size - freed <= self._max_size:
+                        break
+                excess = max(excess, by_size)
+
+            if excess > 0:
+                conn.execute(
+                    'DELETE FROM cache_entries WHERE key IN '
+                    '(SELECT key FROM cache_entries ORDER BY accessed LIMIT ?)', (excess,)
+                )
+
+
+class _ImmediateTransaction:
+    def __init__(self, conn):
+        self.conn = conn
+
+    def __enter__(self):
+        self.conn.execute('BEGIN IMMEDIATE')
+
+    def __exit__(self, exc_type, exc, tb):
+        self.conn.execute('COMMIT' if exc_type is None else 'ROLLBACK')
+        return False
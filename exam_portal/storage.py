@@ -0,0 +1,240 @@
+# ============================================================================
+# storage.py - Content-Addressed Document Storage
+# ============================================================================
+#
+# Supporting documents are stored once per distinct content, under their
+# SHA-256 in sharded directories:
+#
+#     MEDIA_ROOT/cas/ab/cd/abcd1234...ef.pdf
+#
+# Writes go to a temporary file in the target directory and are renamed into
+# place, so a document path never holds a partial file. Stored files never
+# change, which keeps backups incremental.
+#
+# StoredDocument indexes every file with a reference count kept up to date
+# by the ExamApplication signals in models.py. prune_documents deletes files
+# that are no longer referenced.
+#
+# pack_documents moves old documents into per-month zip archives under
+# ARCHIVE_ROOT. Members are stored uncompressed and ArchivedDocument records
+# the byte offset of each, so open()/exists()/size() fall back to reading a
+# packed document straight out of its archive, and locate() gives the
+# ``(path, offset, size)`` of either kind for serving and the OCR/preview
+# workers. path() only knows live files, so a packed document that gains a
+# new reference is unpacked back to a live file first (materialize()).
+#
+# Configure with settings.DOCUMENT_STORAGE (merged over DEFAULTS).
+
+import io
+import mimetypes
+import os
+import uuid
+from contextlib import suppress
+
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage
+from django.db import transaction
+
+from .uploads import content_hash
+
+DEFAULTS = {
+    'PREFIX': 'cas',
+    # Shard levels and hex characters per level: ab/cd/ for 2 x 2
+    'SHARD_DEPTH': 2,
+    'SHARD_WIDTH': 2,
+    # Where pack_documents writes archives; defaults to MEDIA_ROOT/archive
+    'ARCHIVE_ROOT': None,
+}
+
+
+def storage_config():
+    from django.conf import settings
+    return {**DEFAULTS, **getattr(settings, 'DOCUMENT_STORAGE', {})}
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    """File system storage that names files by their content hash"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        config = storage_config()
+        self.prefix = config['PREFIX']
+        self.shard_depth = config['SHARD_DEPTH']
+        self.shard_width = config['SHARD_WIDTH']
+        self.archive_root = str(config['ARCHIVE_ROOT'] or os.path.join(self.location, 'archive'))
+
+    def content_name(self, digest, extension=''):
+        shards = [digest[i * self.shard_width:(i + 1) * self.shard_width]
+                  for i in range(self.shard_depth)]
+        return '/'.join([self.prefix, *shards, f'{digest}{extension}'])
+
+    def is_content_addressed(self, name):
+        return bool(name) and name.startswith(f'{self.prefix}/')
+
+    # ------------------------------------------------------------------
+    # Packed documents
+    # ------------------------------------------------------------------
+
+    def archived(self, name):
+        """ArchivedDocument for a packed document, or None"""
+        from .models import ArchivedDocument
+        return ArchivedDocument.objects.filter(name=name).first()
+
+    def archive_path(self, archive):
+        return os.path.join(self.archive_root, archive)
+
+    def locate(self, name):
+        """``(path, offset, size)`` of a document's bytes, live or packed"""
+        path = self.path(name)
+        try:
+            return path, 0, os.path.getsize(path)
+        except FileNotFoundError:
+            entry = self.archived(name)
+            if entry is None:
+                raise
+        return self.archive_path(entry.archive), entry.offset, entry.size
+
+    def materialize(self, name):
+        """Ensure ``name`` is a live file, unpacking it if packed; False if missing"""
+        if super().exists(name):
+            return True
+        entry = self.archived(name)
+        if entry is None:
+            return False
+        with PackedFile(self.archive_path(entry.archive), entry.offset, entry.size, name) as packed:
+            self._write_atomic(name, packed)
+        # The bytes stay in the archive until it is repacked
+        entry.delete()
+        return True
+
+    def _open(self, name, mode='rb'):
+        try:
+            return super()._open(name, mode)
+        except FileNotFoundError:
+            entry = self.archived(name) if 'r' in mode and '+' not in mode else None
+            if entry is None:
+                raise
+        return PackedFile(self.archive_path(entry.archive), entry.offset, entry.size, name)
+
+    def exists(self, name):
+        return super().exists(name) or self.archived(name) is not None
+
+    def size(self, name):
+        return self.locate(name)[2]
+
+    def delete(self, name):
+        from .models import ArchivedDocument
+        super().delete(name)
+        # The bytes stay in the archive until it is repacked
+        ArchivedDocument.objects.filter(name=name).delete()
+
+    def get_available_name(self, name, max_length=None):
+        # _save picks the final name from the content, which is unique
+        return name
+
+    def _save(self, name, content):
+        from django.utils import timezone
+        from .models import StoredDocument
+
+        digest = content_hash(content)
+        # pack_documents takes the same row lock before dropping a live file
+        with transaction.atomic():
+            entry = StoredDocument.objects.select_for_update().filter(content_hash=digest).first()
+            if entry is not None and self.materialize(entry.name):
+                # Touch so prune_documents' grace period and pack_documents
+                # see this new reference
+                StoredDocument.objects.filter(pk=entry.pk).update(updated_at=timezone.now())
+                return entry.name
+
+        # Prefer the type sniffed on upload over the client's file name
+        content_type = getattr(content, 'content_type', None)
+        extension = (content_type and mimetypes.guess_extension(content_type)) or os.path.splitext(name)[1].lower()
+        stored_name = entry.name if entry is not None else self.content_name(digest, extension)
+        self._write_atomic(stored_name, content)
+        StoredDocument.objects.get_or_create(
+            content_hash=digest, defaults={'name': stored_name, 'size': content.size}
+        )
+        return stored_name
+
+    def _write_atomic(self, name, content):
+        path = self.path(name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        temp_path = f'{path}.{uuid.uuid4().hex}.tmp'
+        fd = os.open(temp_path, os.O_WRONLY | os.O_CREAT | os.O_EXCL | getattr(os, 'O_BINARY', 0), 0o666)
+        try:
+            with os.fdopen(fd, 'wb') as handle:
+                for chunk in content.chunks():
+                    handle.write(chunk)
+                handle.flush()
+                os.fsync(handle.fileno())
+            if self.file_permissions_mode is not None:
+                os.chmod(temp_path, self.file_permissions_mode)
+            # Concurrent writers of the same content race harmlessly here
+            os.replace(temp_path, path)
+        except BaseException:
+            with suppress(FileNotFoundError):
+                os.remove(temp_path)
+            raise
+
+
+class ArchiveMember(io.RawIOBase):
+    """Seekable read-only view of one uncompressed member of an archive"""
+
+    def __init__(self, path, offset, size):
+        super().__init__()
+        self._handle = open(path, 'rb')
+        self._offset = offset
+        self._size = size
+        self._position = 0
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def tell(self):
+        return self._position
+
+    def seek(self, position, whence=io.SEEK_SET):
+        if whence == io.SEEK_CUR:
+            position += self._position
+        elif whence == io.SEEK_END:
+            position += self._size
+        self._position = max(0, position)
+        return self._position
+
+    def readinto(self, buffer):
+        remaining = self._size - self._position
+        if remaining <= 0:
+            return 0
+        view = memoryview(buffer)[:remaining]
+        self._handle.seek(self._offset + self._position)
+        count = self._handle.readinto(view)
+        self._position += count
+        return count
+
+    def close(self):
+        self._handle.close()
+        super().close()
+
+
+class PackedFile(File):
+    """File for a packed document; can be closed and reopened like a live one"""
+
+    def __init__(self, path, offset, size, name):
+        self._location = (path, offset, size)
+        super().__init__(io.BufferedReader(ArchiveMember(*self._location)), name=name)
+        self.size = size
+
+    def open(self, mode=None):
+        if self.closed:
+            self.file = io.BufferedReader(ArchiveMember(*self._location))
+        else:
+            self.seek(0)
+        return self
+
+
+def document_storage():
+    """Storage for ExamApplication.supporting_document"""
+    return ContentAddressedStorage()
@@ -0,0 +1,443 @@
+# ============================================================================
+# streams.py - Server-Sent Events for Student Notifications
+# ============================================================================
+#
+# The notification stream sends a student's new Notification rows
+# ("notification" events) and application status changes ("status" events,
+# from ApplicationStatusEvent) as text/event-stream, so students no longer
+# need to refresh the dashboard to see a decision.
+#
+# Connections do not query the database themselves. One NotificationHub
+# per process polls both tables past its cursors every POLL_INTERVAL
+# seconds, a single query each however many students are connected, and
+# fans the rows out to the connections of their student through bounded
+# in-memory queues. An idle connection is one suspended coroutine plus its
+# queue, and a comment line every HEARTBEAT seconds keeps proxies from
+# closing it.
+#
+# Every event id is the connection's "<notification pk>-<status event pk>"
+# cursor. EventSource sends it back as Last-Event-ID when reconnecting, and
+# the missed rows up to the hub's position are replayed from the database.
+# A client too slow to keep up with its queue is disconnected and catches
+# up the same way.
+#
+# NotificationStreamApp serves the stream's URL as a small raw ASGI app in
+# front of Django's ASGIHandler (exam_tracking/asgi.py), e.g.
+#   uvicorn exam_tracking.asgi:application
+# ASGIHandler would give each request a thread for thread-sensitive calls,
+# held until the response ends, so every open stream would keep a thread.
+# Here a connection authenticates once from its session cookie in a pool
+# thread, then is only coroutines writing from its hub queue; the Django
+# middleware stack does not run for it. Under WSGI there is no way to hold
+# thousands of connections, so the Django view behind the same URL answers
+# 501 (soak_notification_stream reports the cost per stream under ASGI).
+#
+# Configure with settings.NOTIFICATION_STREAM (merged over DEFAULTS).
+
+import asyncio
+import contextvars
+import io
+import json
+from collections import defaultdict
+from importlib import import_module
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth import get_user
+from django.core.handlers.asgi import ASGIRequest
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import DatabaseError, close_old_connections
+from django.http import JsonResponse
+from django.urls import reverse
+from django.views.decorators.http import require_GET
+
+from . import metrics
+from .decorators import authorize_role
+
+DEFAULTS = {
+    'POLL_INTERVAL': 1.0,
+    'HEARTBEAT': 20,
+    # Events buffered per connection before a slow client is dropped
+    'QUEUE_SIZE': 100,
+    # Milliseconds EventSource waits before reconnecting
+    'RETRY': 3000,
+    # Rows fetched per table per poll, and replayed on reconnect
+    'BATCH_SIZE': 1000,
+}
+
+STREAM_CONNECTIONS = metrics.Gauge('notification_stream_connections', 'Open notification streams in the last worker to change')
+STREAM_EVENTS = metrics.Counter('notification_stream_events', 'Events queued to notification streams')
+STREAM_DROPPED = metrics.Counter('notification_stream_dropped', 'Streams closed because the client fell behind')
+
+
+def stream_config():
+    return {**DEFAULTS, **getattr(settings, 'NOTIFICATION_STREAM', {})}
+
+
+# ============================================================================
+# Database reads (run in a worker thread)
+# ============================================================================
+
+def _notification_event(row):
+    pk, student_id, app_id, notification_type, title, message, update_count, created_at = row
+    # update_count > 1: the notification replaces the application's previous
+    # one (notifications.py)
+    return student_id, ('notification', pk, {
+        'id': pk,
+        'application': app_id,
+        'notification_type': notification_type,
+        'title': title,
+        'message': message,
+        'update_count': update_count,
+        'created_at': created_at,
+    })
+
+
+def _status_event(row):
+    pk, student_id, app_id, from_status, to_status, created_at = row
+    return student_id, ('status', pk, {
+        'application': app_id,
+        'from_status': from_status,
+        'status': to_status,
+        'created_at': created_at,
+    })
+
+
+def _new_rows(notification_after, status_after, batch_size, student_id=None, until=None):
+    """``[(student_id, event)]`` logged after the two cursors, oldest first"""
+    from .models import ApplicationStatusEvent, Notification
+
+    notifications = Notification.objects.filter(pk__gt=notification_after)
+    statuses = ApplicationStatusEvent.objects.filter(pk__gt=status_after)
+    if until is not None:
+        notifications = notifications.filter(pk__lte=until[0])
+        statuses = statuses.filter(pk__lte=until[1])
+    if student_id is not None:
+        notifications = notifications.filter(student_id=student_id)
+        statuses = statuses.filter(application__student_id=student_id)
+    events = [_notification_event(row) for row in notifications.order_by('pk').values_list(
+        'pk', 'student_id', 'application__application_id', 'notification_type', 'title', 'message',
+        'update_count', 'created_at'
+    )[:batch_size]]
+    events += [_status_event(row) for row in statuses.order_by('pk').values_list(
+        'pk', 'application__student_id', 'application__application_id', 'from_status', 'to_status', 'created_at'
+    )[:batch_size]]
+    return events
+
+
+def _replay_rows(position, until, batch_size, student_id):
+    """A student's events after ``position`` up to ``until``, in pages"""
+    notification_after, status_after = position
+    events = []
+    while True:
+        rows = _new_rows(notification_after, status_after, batch_size, student_id, until)
+        if not rows:
+            return events
+        for _, event in rows:
+            kind, pk, _ = event
+            if kind == 'notification':
+                notification_after = max(notification_after, pk)
+            else:
+                status_after = max(status_after, pk)
+            events.append(event)
+
+
+def _latest_positions():
+    from django.db.models import Max
+    from .models import ApplicationStatusEvent, Notification
+
+    return (
+        Notification.objects.aggregate(last=Max('pk'))['last'] or 0,
+        ApplicationStatusEvent.objects.aggregate(last=Max('pk'))['last'] or 0,
+    )
+
+
+def _poll(notification_after, status_after, batch_size, connections, queued):
+    # Runs in the loop's thread pool outside any request: manage the
+    # connection the way a request would. Metrics are written here too,
+    # once per poll, keeping cache writes off the event loop.
+    close_old_connections()
+    try:
+        STREAM_CONNECTIONS.set(connections)
+        if queued:
+            STREAM_EVENTS.inc(queued)
+        return _new_rows(notification_after, status_after, batch_size)
+    except DatabaseError:
+        # Retried on the next poll; connections only see a delay
+        return []
+    finally:
+        close_old_connections()
+
+
+# ============================================================================
+# Hub
+# ============================================================================
+
+class Subscription:
+    """One open stream: the student it belongs to and its pending events"""
+
+    def __init__(self, student_id, queue_size):
+        self.student_id = student_id
+        self.queue = asyncio.Queue(maxsize=queue_size)
+        self.overflowed = False
+
+    def push(self, event):
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            self.overflowed = True
+
+
+class NotificationHub:
+    """Per-process poller fanning new rows out to subscribed streams"""
+
+    def __init__(self):
+        self.subscribers = defaultdict(set)
+        self.count = 0
+        self.position = None
+        self._task = None
+        self._loop = None
+        self._ready = None
+
+    async def subscribe(self, student_id):
+        loop = asyncio.get_running_loop()
+        if self._task is None or self._task.done() or self._loop is not loop:
+            self._loop = loop
+            self._ready = loop.create_future()
+            # A fresh context: the poller must not inherit the first
+            # request's thread-sensitive executor or contextvars
+            self._task = loop.create_task(self._run(), context=contextvars.Context())
+        subscription = Subscription(student_id, stream_config()['QUEUE_SIZE'])
+        self.subscribers[student_id].add(subscription)
+        self.count += 1
+        # Streams start at the hub's position, known once it has started
+        try:
+            await asyncio.shield(self._ready)
+        except BaseException:
+            self.unsubscribe(subscription)
+            raise
+        return subscription
+
+    def unsubscribe(self, subscription):
+        subscriptions = self.subscribers.get(subscription.student_id)
+        if subscriptions is not None and subscription in subscriptions:
+            subscriptions.discard(subscription)
+            if not subscriptions:
+                del self.subscribers[subscription.student_id]
+            self.count -= 1
+
+    async def _run(self):
+        config = stream_config()
+        try:
+            self.position = await sync_to_async(_latest_positions, thread_sensitive=False)()
+        except Exception as exc:
+            self._ready.set_exception(exc)
+            raise
+        self._ready.set_result(None)
+
+        queued = 0
+        while self.subscribers:
+            await asyncio.sleep(config['POLL_INTERVAL'])
+            notification_after, status_after = self.position
+            events = await sync_to_async(_poll, thread_sensitive=False)(
+                notification_after, status_after, config['BATCH_SIZE'], self.count, queued
+            )
+            queued = 0
+            for student_id, event in events:
+                kind, pk, _ = event
+                if kind == 'notification':
+                    notification_after = max(notification_after, pk)
+                else:
+                    status_after = max(status_after, pk)
+                subscriptions = self.subscribers.get(student_id)
+                if subscriptions:
+                    queued += len(subscriptions)
+                    for subscription in subscriptions:
+                        subscription.push(event)
+            self.position = (notification_after, status_after)
+        # No one is listening: stop polling until the next subscriber
+        self._task = None
+        await sync_to_async(STREAM_CONNECTIONS.set, thread_sensitive=False)(0)
+
+
+hub = NotificationHub()
+
+
+# ============================================================================
+# ASGI application
+# ============================================================================
+
+def _format(event_id, kind, data):
+    payload = json.dumps(data, cls=DjangoJSONEncoder, separators=(',', ':'))
+    return f'id: {event_id}\nevent: {kind}\ndata: {payload}\n\n'
+
+
+def _parse_event_id(value):
+    try:
+        notification_after, status_after = (int(part) for part in value.split('-'))
+    except (AttributeError, ValueError):
+        return None
+    return notification_after, status_after
+
+
+async def _event_stream(subscription, position, replay):
+    config = stream_config()
+    notification_seen, status_seen = position
+    try:
+        yield f'retry: {config["RETRY"]}\n\n'
+        while True:
+            if replay:
+                events, replay = replay, []
+            else:
+                try:
+                    events = [await asyncio.wait_for(subscription.queue.get(), config['HEARTBEAT'])]
+                except asyncio.TimeoutError:
+                    yield ': keepalive\n\n'
+                    continue
+
+            chunks = []
+            for kind, pk, data in events:
+                # Rows replayed on reconnect may also arrive through the hub
+                if kind == 'notification':
+                    if pk <= notification_seen:
+                        continue
+                    notification_seen = pk
+                else:
+                    if pk <= status_seen:
+                        continue
+                    status_seen = pk
+                chunks.append(_format(f'{notification_seen}-{status_seen}', kind, data))
+            if chunks:
+                yield ''.join(chunks)
+
+            if subscription.overflowed:
+                await sync_to_async(STREAM_DROPPED.inc, thread_sensitive=False)()
+                # The client reconnects with Last-Event-ID and replays the rest
+                return
+    finally:
+        hub.unsubscribe(subscription)
+
+
+def _authenticate(scope):
+    """
+    The student id for the session cookie of the request in ``scope``, or
+    ``(status, error)``. Runs in a pool thread outside any request, like
+    _poll, and does what SessionMiddleware and AuthenticationMiddleware
+    would; a role cached by get_user_role is not written back.
+    """
+    close_old_connections()
+    try:
+        request = ASGIRequest(scope, io.BytesIO())
+        engine = import_module(settings.SESSION_ENGINE)
+        request.session = engine.SessionStore(request.COOKIES.get(settings.SESSION_COOKIE_NAME))
+        request.user = get_user(request)
+        if authorize_role(request, ('student',)):
+            return request.role_profile.pk
+        if request.user.is_authenticated:
+            return 403, 'permission denied'
+        return 401, 'authentication required'
+    finally:
+        close_old_connections()
+
+
+def _replay(position, until, batch_size, student_id):
+    close_old_connections()
+    try:
+        return _replay_rows(position, until, batch_size, student_id)
+    finally:
+        close_old_connections()
+
+
+async def _wait_for_disconnect(receive):
+    while (await receive())['type'] != 'http.disconnect':
+        pass
+
+
+async def serve_stream(scope, receive, send):
+    """Stream the logged in student's new notifications and status changes"""
+    authenticated = await sync_to_async(_authenticate, thread_sensitive=False)(scope)
+    if isinstance(authenticated, tuple):
+        status, error = authenticated
+        body = json.dumps({'error': error}).encode()
+        await send({'type': 'http.response.start', 'status': status,
+                    'headers': [(b'content-type', b'application/json'),
+                                (b'content-length', str(len(body)).encode())]})
+        await send({'type': 'http.response.body', 'body': body})
+        return
+    student_id = authenticated
+
+    subscription = await hub.subscribe(student_id)
+    try:
+        position = hub.position
+        replay = []
+        headers = dict(scope['headers'])
+        last_event_id = _parse_event_id(headers.get(b'last-event-id', b'').decode('latin-1') or None)
+        if last_event_id is not None:
+            # Subscribed first: rows up to the hub's position are replayed
+            # and later ones arrive through the hub
+            rows = await sync_to_async(_replay, thread_sensitive=False)(
+                last_event_id, position, stream_config()['BATCH_SIZE'], student_id
+            )
+            replay = sorted(rows, key=lambda event: event[2]['created_at'])
+            position = last_event_id
+    except BaseException:
+        hub.unsubscribe(subscription)
+        raise
+
+    await send({'type': 'http.response.start', 'status': 200, 'headers': [
+        (b'content-type', b'text/event-stream'),
+        (b'cache-control', b'no-cache'),
+        # Keep nginx from buffering the stream
+        (b'x-accel-buffering', b'no'),
+    ]})
+    stream = _event_stream(subscription, position, replay)
+
+    async def write():
+        async for chunk in stream:
+            await send({'type': 'http.response.body', 'body': chunk.encode(), 'more_body': True})
+        await send({'type': 'http.response.body', 'body': b''})
+
+    # Servers may drop writes to a closed connection silently, so watch for
+    # the disconnect instead of waiting for a failed send
+    writer = asyncio.ensure_future(write())
+    disconnected = asyncio.ensure_future(_wait_for_disconnect(receive))
+    try:
+        await asyncio.wait([writer, disconnected], return_when=asyncio.FIRST_COMPLETED)
+    finally:
+        for task in (writer, disconnected):
+            task.cancel()
+        await asyncio.gather(writer, disconnected, return_exceptions=True)
+        await stream.aclose()
+
+
+class NotificationStreamApp:
+    """
+    ASGI application serving GET requests for the notification stream's URL
+    itself and passing everything else to ``application`` (Django's).
+    """
+
+    def __init__(self, application):
+        self.application = application
+        self.path = None
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'http' and scope['method'] == 'GET':
+            if self.path is None:
+                self.path = reverse('student_notification_stream')
+            path, root_path = scope['path'], scope.get('root_path', '')
+            if root_path and path.startswith(root_path):
+                path = path[len(root_path):]
+            if path == self.path:
+                return await serve_stream(scope, receive, send)
+        return await self.application(scope, receive, send)
+
+
+# ============================================================================
+# View
+# ============================================================================
+
+@require_GET
+def student_notification_stream(request):
+    """Reached only without NotificationStreamApp in front, e.g. under WSGI"""
+    return JsonResponse({'error': 'notification streams are served by the ASGI application '
+                                  '(exam_tracking.asgi:application)'}, status=501)
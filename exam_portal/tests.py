@@ -1,3 +1,708 @@
-from django.test import TestCase
+import asyncio
+import hashlib
+import importlib
+import io
+import os
+import tempfile
+import threading
+from types import SimpleNamespace
+from datetime import timedelta
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import sync_to_async
+from django.apps import apps
+from django.contrib.auth.models import User
+from django.core.files.base import ContentFile
+from django.core.handlers.asgi import ASGIHandler
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import IntegrityError
+from django.http import QueryDict
+from django.test import (AsyncRequestFactory, Client, RequestFactory, SimpleTestCase, TestCase, TransactionTestCase,
+                         override_settings)
+from django.urls import reverse
+from django.utils import timezone
+from PIL import Image
+from pypdf import PdfWriter
+
+from . import analytics
+from .cache import get_cached_application
+from .events import transition_applications
+from .exports import ROWS_PER_CHUNK, export_response
+from .forms import ApplicationReviewForm
+from .ingest import IMAGE_ERROR
+from .management.commands.pack_documents import Command as PackDocuments
+from .notifications import COALESCE_ATTEMPTS, coalesce_key, notify_student
+from .ocr import extract_document
+from .models import (ApplicationStatusEvent, ArchivedDocument, EmailOutbox, ExamApplication, ExamMarking, ExamOfficer, Lecturer, NormalizedDocument,
+                     Notification, OCRCacheEntry, OCRResult, StoredDocument, Student, UserProfile)
+from .overload import controller
+from .previews import preview_config, render_previews
+from .serving import serve_document
+from .singleflight import _local_locks, single_flight
+from .storage import ContentAddressedStorage, storage_config
+from .streams import NotificationStreamApp, _replay_rows, hub
+from .uploads import TYPE_ERROR, document_uploads, size_error
+from .verification import Verifier, verification_config
+from .workflow import review_application
+
+# Per-process caches, so nothing leaks between runs through var/cache.sqlite3
+LOCAL_CACHES = {
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'tests-default'},
+    'shared': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'tests-shared'},
+}
+
+CSV = b'registration_number,unit_code\nSCT211-0001/2021,SMA101\n'
+
+
+def png_bytes(size=(64, 64)):
+    output = io.BytesIO()
+    Image.new('RGB', size, 'white').save(output, 'PNG')
+    return output.getvalue()
+
+
+def make_student(number=1):
+    user = User.objects.create_user(f'student{number}', password='pw')
+    UserProfile.objects.create(user=user, user_type='student')
+    return Student.objects.create(user=user, registration_number=f'SCT211-{number:04d}/2021',
+                                  first_name='Test', last_name=str(number),
+                                  email=f'student{number}@example.com')
+
+
+def application_data(document):
+    return {'year_of_study': '2', 'exam_type': 'resit', 'unit_name': 'Calculus', 'unit_code': 'SMA101',
+            'year_taken': 2024, 'semester_taken': '1', 'declaration_accepted': 'on',
+            'supporting_document': document}
+
+
+def make_officer(number=1):
+    user = User.objects.create_user(f'officer{number}', password='pw')
+    UserProfile.objects.create(user=user, user_type='officer')
+    return ExamOfficer.objects.create(user=user, officer_id=f'OFF{number:03d}', first_name='Test',
+                                      last_name=str(number), email=f'officer{number}@example.com',
+                                      department='GENERAL')
+
+
+def make_lecturer(number=1):
+    user = User.objects.create_user(f'lecturer{number}', password='pw')
+    UserProfile.objects.create(user=user, user_type='lecturer')
+    return Lecturer.objects.create(user=user, lecturer_id=f'LEC{number:03d}', first_name='Test',
+                                   last_name=str(number), email=f'lecturer{number}@example.com',
+                                   department='SOS')
+
+
+def make_application(number=1, **fields):
+    student = make_student(number)
+    fields = {'year_of_study': '2', 'exam_type': 'resit', 'unit_name': 'Calculus', 'unit_code': 'SMA101',
+              'year_taken': 2024, 'semester_taken': '1', 'declaration_accepted': True, **fields}
+    return ExamApplication.objects.create(application_id=f'APP{number:05d}', student=student, **fields)
+
+
+class VerifierTests(SimpleTestCase):
+    def setUp(self):
+        self.verifier = Verifier(verification_config())
+
+    def test_unit_code_matches_whole_word(self):
+        result = self.verifier.score('Resit approval for SMA10 results', 'resit', unit_code='SMA10')
+        self.assertIn('SMA10', result.keywords)
+
+    def test_unit_code_not_matched_inside_longer_code(self):
+        result = self.verifier.score('Resit approval for SMA101 results', 'resit', unit_code='SMA10')
+        self.assertNotIn('SMA10', result.keywords)
+
+    def test_registration_number_not_matched_as_prefix(self):
+        text = 'Receipt for student SCT211-0001/20211'
+        result = self.verifier.score(text, 'retake', registration_number='SCT211-0001/2021')
+        self.assertNotIn('SCT211-0001/2021', result.keywords)
+        result = self.verifier.score(text + ' and SCT211-0001/2021.', 'retake',
+                                     registration_number='SCT211-0001/2021')
+        self.assertIn('SCT211-0001/2021', result.keywords)
+
+
+class EngineConfidenceTests(TestCase):
+    TEXT = 'Resit approval: supplementary results transcript for SMA101'
+
+    def test_backfill_takes_confidence_from_ocr_cache(self):
+        cached = make_application(1, document_hash='a' * 64)
+        uncached = make_application(2, document_hash='b' * 64)
+        OCRCacheEntry.objects.create(content_hash='a' * 64, extracted_text='', ocr_summary='',
+                                     engine_confidence=0.4)
+        for application in (cached, uncached):
+            OCRResult.objects.create(application=application, extracted_text='', ocr_summary='')
+
+        migration = importlib.import_module('exam_portal.migrations.0005_ocrresult_engine_confidence')
+        migration.backfill_engine_confidence(apps, None)
+        self.assertEqual(OCRResult.objects.get(application=cached).engine_confidence, 0.4)
+        self.assertIsNone(OCRResult.objects.get(application=uncached).engine_confidence)
+
+    def test_reverify_skips_unknown_confidence(self):
+        known, unknown = make_application(1), make_application(2)
+        for application, confidence in ((known, 0.9), (unknown, None)):
+            OCRResult.objects.create(application=application, extracted_text=self.TEXT, ocr_summary='',
+                                     engine_confidence=confidence)
+
+        with tempfile.TemporaryDirectory() as directory:
+            call_command('reverify_ocr', workers=1, checkpoint=f'{directory}/checkpoint.json',
+                         stdout=io.StringIO())
+        self.assertTrue(OCRResult.objects.get(application=known).verified)
+        self.assertFalse(OCRResult.objects.get(application=unknown).verified)
+        unknown.refresh_from_db()
+        self.assertFalse(unknown.auto_verified)
+
+
+class DocumentUploadTests(TestCase):
+    def setUp(self):
+        self.student = make_student()
+        self.client.force_login(self.student.user)
+
+    def test_other_uploads_keep_their_content(self):
+        request = RequestFactory().post('/', {'f': SimpleUploadedFile('marks.csv', CSV)})
+        self.assertEqual(request.FILES['f'].read(), CSV)
+
+    def test_document_views_check_while_streaming(self):
+        @document_uploads
+        def view(request):
+            return request.FILES['f']
+
+        request = RequestFactory().post('/', {'f': SimpleUploadedFile('marks.csv', CSV)})
+        request._dont_enforce_csrf_checks = True
+        self.assertEqual(view(request).upload_error, TYPE_ERROR)
+
+    def test_application_form_rejects_other_types(self):
+        response = self.client.post(reverse('student_apply_exam'),
+                                    application_data(SimpleUploadedFile('marks.csv', CSV)))
+        self.assertEqual(response.status_code, 200)
+        self.assertFormError(response.context['form'], 'supporting_document', TYPE_ERROR)
+        self.assertFalse(ExamApplication.objects.exists())
+
+    def test_application_form_still_checks_csrf(self):
+        client = Client(enforce_csrf_checks=True)
+        client.force_login(self.student.user)
+        response = client.post(reverse('student_apply_exam'),
+                               application_data(SimpleUploadedFile('marks.csv', CSV)))
+        self.assertEqual(response.status_code, 403)
+
+    def test_corrupt_images_are_form_errors(self):
+        png = png_bytes()
+        for name, data in (('truncated.png', png[:len(png) // 2]),
+                           ('garbage.png', png[:16] + b'\x00garbage' * 100)):
+            with self.subTest(name):
+                response = self.client.post(reverse('student_apply_exam'),
+                                            application_data(SimpleUploadedFile(name, data)))
+                self.assertEqual(response.status_code, 200)
+                self.assertFormError(response.context['form'], 'supporting_document', IMAGE_ERROR)
+        self.assertFalse(ExamApplication.objects.exists())
+
+    def test_images_are_decoded_once(self):
+        with mock.patch.object(Image, 'open', wraps=Image.open) as image_open:
+            self.client.post(reverse('student_apply_exam'),
+                             application_data(SimpleUploadedFile('page.png', png_bytes((400, 300)))))
+        # Validated, then recompressed from the same decode
+        self.assertEqual(image_open.call_count, 1)
+        self.assertTrue(NormalizedDocument.objects.exists())
+
+    @override_settings(DOCUMENT_UPLOADS={'MAX_SIZE': 1024 * 1024, 'MAX_IMAGE_SIZE': 4 * 1024 * 1024})
+    def test_recompressed_images_may_exceed_the_document_cap(self):
+        noise = Image.frombytes('RGB', (700, 700), os.urandom(700 * 700 * 3))
+        output = io.BytesIO()
+        noise.save(output, 'PNG')
+        self.assertGreater(len(output.getvalue()), 1024 * 1024)
+        for name, data, error in (('photo.png', output.getvalue(), None),
+                                  ('scan.pdf', b'%PDF-1.4 ' + bytes(1024 * 1024), size_error(1024 * 1024))):
+            with self.subTest(name):
+                response = self.client.post(reverse('student_apply_exam'),
+                                            application_data(SimpleUploadedFile(name, data)))
+                if error:
+                    self.assertFormError(response.context['form'], 'supporting_document', error)
+                else:
+                    self.assertEqual(response.status_code, 302)
+        self.assertEqual(ExamApplication.objects.count(), 1)
+
+    def test_decompression_bombs_are_form_errors(self):
+        with mock.patch.object(Image, 'MAX_IMAGE_PIXELS', 1000):
+            response = self.client.post(reverse('student_apply_exam'),
+                                        application_data(SimpleUploadedFile('bomb.png', png_bytes())))
+        self.assertFormError(response.context['form'], 'supporting_document', IMAGE_ERROR)
+
+
+class PackedDocumentTests(TestCase):
+    DATA = b'%PDF-1.4 packed supporting document'
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        with override_settings(DOCUMENT_STORAGE={**storage_config(), 'ARCHIVE_ROOT': None}):
+            self.storage = ContentAddressedStorage(location=directory.name)
+        os.makedirs(self.storage.archive_root)
+        self.name = self.pack(self.DATA, '.pdf', '2024-01.zip')
+
+    def pack(self, data, extension, archive):
+        digest = hashlib.sha256(data).hexdigest()
+        name = self.storage.content_name(digest, extension)
+        with open(self.storage.archive_path(archive), 'wb') as handle:
+            handle.write(b'header' + data)
+        StoredDocument.objects.create(content_hash=digest, name=name, size=len(data))
+        ArchivedDocument.objects.create(name=name, archive=archive, offset=6, size=len(data))
+        return name
+
+    def test_packed_document_is_readable(self):
+        with self.storage.open(self.name) as document:
+            self.assertEqual(document.read(), self.DATA)
+
+    def test_duplicate_of_packed_document_gets_a_live_file(self):
+        name = self.storage.save('upload.pdf', ContentFile(self.DATA))
+        self.assertEqual(name, self.name)
+        with open(self.storage.path(name), 'rb') as document:
+            self.assertEqual(document.read(), self.DATA)
+        self.assertFalse(ArchivedDocument.objects.filter(name=name).exists())
+
+    def test_workers_read_packed_documents_in_place(self):
+        output = io.BytesIO()
+        writer = PdfWriter()
+        writer.add_blank_page(100, 100)
+        writer.write(output)
+        name = self.pack(output.getvalue(), '.pdf', '2024-02.zip')
+        result = extract_document(self.storage.locate(name))
+        self.assertEqual((result['engine'], result['summary']), ('pypdf', 'No text found by pypdf'))
+        self.assertFalse(os.path.exists(self.storage.path(name)))
+
+        name = self.pack(png_bytes((300, 200)), '.png', '2024-03.zip')
+        with tempfile.TemporaryDirectory() as directory:
+            preview, thumbnail = f'{directory}/preview.jpg', f'{directory}/thumb.jpg'
+            size = render_previews(self.storage.locate(name), preview, thumbnail,
+                                   {**preview_config(), 'PREVIEW_SIZE': 150})
+            self.assertEqual(size, (150, 100))
+            self.assertTrue(os.path.exists(thumbnail))
+
+            live = self.storage.save('upload.pdf', ContentFile(output.getvalue()))
+            self.assertTrue(render_previews(self.storage.locate(live), preview, thumbnail, preview_config()))
+
+    @override_settings(DOCUMENT_SERVING={'BLOCK_SIZE': 8})
+    async def test_asgi_responses_stream_blocks(self):
+        document = SimpleNamespace(storage=self.storage, name=self.name)
+        request = AsyncRequestFactory().get('/', headers={'range': 'bytes=4-'})
+        response = await sync_to_async(serve_document)(request, document)
+        self.assertTrue(response.is_async)
+        chunks = [chunk async for chunk in response]
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(b''.join(chunks), self.DATA[4:])
+        self.assertEqual(max(map(len, chunks)), 8)
+
+
+class PackDocumentsTests(TestCase):
+    DATA = b'%PDF-1.4 document of a closed application'
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        with override_settings(DOCUMENT_STORAGE={**storage_config(), 'ARCHIVE_ROOT': None}):
+            self.storage = ContentAddressedStorage(location=directory.name)
+        field = ExamApplication._meta.get_field('supporting_document')
+        patcher = mock.patch.object(field, 'storage', self.storage)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        self.name = self.storage.save('upload.pdf', ContentFile(self.DATA))
+        application = make_application(status='rejected', supporting_document=self.name)
+        ExamApplication.objects.filter(pk=application.pk).update(
+            submitted_at=application.submitted_at.replace(year=application.submitted_at.year - 2)
+        )
+
+    def pack(self, during=None):
+        index = PackDocuments.index
+
+        def index_then(command, *args):
+            entries = index(command, *args)
+            if during:
+                during()
+            return entries
+
+        with mock.patch.object(PackDocuments, 'index', index_then):
+            call_command('pack_documents', stdout=io.StringIO())
+
+    def test_packed_document_leaves_the_live_volume(self):
+        self.pack()
+        self.assertFalse(os.path.exists(self.storage.path(self.name)))
+        with self.storage.open(self.name) as document:
+            self.assertEqual(document.read(), self.DATA)
+
+    def test_upload_deduplicated_while_packing_stays_live(self):
+        self.pack(during=lambda: self.storage.save('again.pdf', ContentFile(self.DATA)))
+        self.assertTrue(os.path.exists(self.storage.path(self.name)))
+        self.assertFalse(ArchivedDocument.objects.filter(name=self.name).exists())
+
+
+class AsyncMiddlewareTests(TestCase):
+    @override_settings(DEBUG=True)
+    def test_asgi_stack_needs_no_adapters(self):
+        # Adapting a sync middleware is logged in DEBUG
+        with self.assertNoLogs('django.request', 'DEBUG'):
+            ASGIHandler()
+
+    async def test_queries_of_async_requests_are_timed(self):
+        student = await sync_to_async(make_student)()
+        await self.async_client.aforce_login(student.user)
+        controller.db_latency_ms = 0.0
+        await Student.objects.acount()
+        self.assertEqual(controller.db_latency_ms, 0.0)
+
+        response = await self.async_client.get(reverse('student_applications'))
+        self.assertEqual(response.status_code, 200)
+        self.assertGreater(controller.db_latency_ms, 0.0)
+
+
+class ExportTests(SimpleTestCase):
+    async def test_asgi_export_streams_before_reading_every_row(self):
+        read = []
+
+        def rows():
+            for n in range(ROWS_PER_CHUNK * 20):
+                read.append(n)
+                yield (f'SCT211-{n:04d}/2021', n)
+
+        for export_format in ('csv', 'xlsx'):
+            with self.subTest(export_format):
+                read.clear()
+                response = export_response(AsyncRequestFactory().get('/'), export_format, 'students',
+                                           ['Registration Number', 'Marks'], rows())
+                self.assertTrue(response.is_async)
+                chunks = aiter(response)
+                self.assertTrue(await anext(chunks))
+                self.assertLessEqual(len(read), ROWS_PER_CHUNK)
+                rest = [chunk async for chunk in chunks]
+                self.assertEqual(len(read), ROWS_PER_CHUNK * 20)
+                self.assertGreater(len(rest), 10)
+
+
+class AnalyticsTests(TestCase):
+    def setUp(self):
+        lecturer = make_lecturer()
+        rows = [('SOB', 'resit', 40), ('SOB', 'retake', 60), ('SOB', 'resit', 50), ('SOE', 'resit', 80),
+                (None, 'resit', None)]
+        for number, (school, exam_type, marks) in enumerate(rows, 1):
+            application = make_application(number, exam_type=exam_type, auto_verified=marks is None)
+            Student.objects.filter(pk=application.student_id).update(school=school)
+            if marks is not None:
+                ExamMarking.objects.create(application=application, lecturer=lecturer, marks=marks)
+
+    def crosstab(self, *query):
+        result = analytics.crosstab(*query)
+        with mock.patch.object(analytics, 'np', None):
+            self.assertEqual(analytics.crosstab(*query), result)
+        return result
+
+    def test_cells_and_margins(self):
+        result = self.crosstab(['school', 'exam_type'], {}, [0, 50, 100])
+        self.assertEqual(result['total'], 5)
+        self.assertEqual([tuple(cell['key'].values()) for cell in result['cells']],
+                         [(None, 'resit'), ('SOB', 'resit'), ('SOB', 'retake'), ('SOE', 'resit')])
+        sob_resit = result['cells'][1]
+        self.assertEqual((sob_resit['count'], sob_resit['mean_mark'], sob_resit['mark_percentiles']),
+                         (2, 45.0, {'p0': 40.0, 'p50': 45.0, 'p100': 50.0}))
+
+        resit = result['margins']['exam_type'][0]
+        self.assertEqual((resit['value'], resit['count'], resit['verified_rate'], resit['marked_rate']),
+                         ('resit', 4, 0.25, 0.75))
+        self.assertEqual(resit['mark_percentiles'], {'p0': 40.0, 'p50': 50.0, 'p100': 80.0})
+        unmarked = result['margins']['school'][0]
+        self.assertEqual((unmarked['value'], unmarked['mean_mark'], unmarked['mark_percentiles']),
+                         (None, None, {'p0': None, 'p50': None, 'p100': None}))
+
+    def test_filters_and_no_percentiles(self):
+        result = self.crosstab(['school'], {'exam_type': ['resit']}, [])
+        self.assertEqual([(cell['key']['school'], cell['count']) for cell in result['cells']],
+                         [(None, 1), ('SOB', 2), ('SOE', 1)])
+        self.assertEqual(result['cells'][1]['mark_percentiles'], {})
+
+    def test_percentiles_are_capped(self):
+        params = QueryDict('percentiles=' + ','.join(str(p) for p in range(20)))
+        with self.assertRaisesMessage(ValueError, 'at most 10 percentiles'):
+            analytics.parse_query(params)
+
+
+class StreamReplayTests(TestCase):
+    def test_replay_pages_up_to_the_hub_position(self):
+        student, other = make_student(1), make_student(2)
+        pks = []
+        for n in range(7):
+            pks.append(Notification.objects.create(student=student, title=f'Update {n}', message='').pk)
+            Notification.objects.create(student=other, title=f'Other {n}', message='')
+
+        events = _replay_rows((pks[0], 0), (pks[5], 0), 2, student.pk)
+        self.assertEqual([pk for _, pk, _ in events], pks[1:6])
+
+
+@override_settings(NOTIFICATION_STREAM={'POLL_INTERVAL': 0.05})
+class NotificationStreamAppTests(TransactionTestCase):
+    # Committed rows: the hub polls from a pool thread
+    def setUp(self):
+        self.passed = []
+
+        async def django_application(scope, receive, send):
+            self.passed.append(scope['path'])
+
+        self.app = NotificationStreamApp(django_application)
+
+    async def request(self, path, cookie=None, disconnect=None):
+        scope = {'type': 'http', 'method': 'GET', 'path': path, 'root_path': '', 'query_string': b'',
+                 'headers': [(b'cookie', cookie.encode())] if cookie else [], 'server': ('testserver', 80)}
+        disconnect = disconnect or asyncio.Event()
+        messages = asyncio.Queue()
+
+        async def receive():
+            await disconnect.wait()
+            return {'type': 'http.disconnect'}
+
+        task = asyncio.ensure_future(self.app(scope, receive, messages.put))
+        return task, messages
+
+    async def test_serves_the_stream_path_only(self):
+        task, messages = await self.request(reverse('student_notification_stream'))
+        await task
+        self.assertEqual((await messages.get())['status'], 401)
+        await self.request(reverse('student_dashboard'))
+        await asyncio.sleep(0)
+        self.assertEqual(self.passed, [reverse('student_dashboard')])
+
+    async def test_streams_events_until_disconnect(self):
+        student = await sync_to_async(make_student)()
+        client = Client()
+        await sync_to_async(client.force_login)(student.user)
+        cookie = f'sessionid={client.cookies["sessionid"].value}'
+        disconnect = asyncio.Event()
+        task, messages = await self.request(reverse('student_notification_stream'), cookie, disconnect)
+
+        self.assertEqual((await messages.get())['status'], 200)
+        self.assertTrue((await messages.get())['body'].startswith(b'retry:'))
+        self.assertEqual(hub.count, 1)
+        await sync_to_async(Notification.objects.create)(student=student, title='Marks released', message='')
+        body = (await asyncio.wait_for(messages.get(), 5))['body']
+        self.assertIn(b'event: notification', body)
+        self.assertIn(b'Marks released', body)
+
+        disconnect.set()
+        await asyncio.wait_for(task, 5)
+        self.assertEqual(hub.count, 0)
+        self.assertEqual(self.passed, [])
+
+    def test_wsgi_requests_are_rejected(self):
+        student = make_student()
+        self.client.force_login(student.user)
+        response = self.client.get(reverse('student_notification_stream'))
+        self.assertEqual(response.status_code, 501)
+        self.assertIn('exam_tracking.asgi', response.json()['error'])
+
+
+@override_settings(CACHES=LOCAL_CACHES)
+class ApplicationCacheTests(TestCase):
+    def setUp(self):
+        self.application = make_application(status='pending')
+
+    def approve_concurrently(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            transition_applications(ExamApplication.objects.filter(pk=self.application.pk), 'approved')
+
+    def test_stale_read_does_not_refill_the_cache(self):
+        select_related = ExamApplication.objects.select_related
+
+        def read_then_commit(*relations):
+            # Loaded before a concurrent commit and its invalidation
+            stale = select_related(*relations).get(pk=self.application.pk)
+            self.approve_concurrently()
+            queryset = mock.Mock()
+            queryset.filter.return_value.first.return_value = stale
+            return queryset
+
+        with mock.patch.object(ExamApplication.objects, 'select_related', side_effect=read_then_commit):
+            self.assertEqual(get_cached_application(self.application.application_id).status, 'pending')
+        self.assertEqual(get_cached_application(self.application.application_id).status, 'approved')
+
+    def test_review_of_cached_copy_keeps_concurrent_changes(self):
+        cached = get_cached_application(self.application.application_id)
+        ExamApplication.objects.filter(pk=self.application.pk).update(auto_verified=True)
+        self.approve_concurrently()
+
+        form = ApplicationReviewForm({'decision': 'rejected', 'comments': 'Missing receipt'})
+        self.assertTrue(form.is_valid(), form.errors)
+        review_application(cached, form, make_officer())
+
+        self.application.refresh_from_db()
+        self.assertEqual(self.application.status, 'rejected')
+        self.assertTrue(self.application.auto_verified)
+        event = ApplicationStatusEvent.objects.filter(application=self.application).latest('pk')
+        self.assertEqual((event.from_status, event.to_status), ('approved', 'rejected'))
+
+
+@override_settings(CACHES=LOCAL_CACHES)
+class SingleFlightTests(SimpleTestCase):
+    def test_local_locks_are_dropped_after_use(self):
+        for n in range(50):
+            self.assertEqual(single_flight(f'tests:{n}', lambda: n), n)
+        self.assertEqual(_local_locks, {})
+
+    def test_waiting_threads_share_one_computation(self):
+        started, release, calls = threading.Event(), threading.Event(), []
+
+        def compute():
+            calls.append(1)
+            started.set()
+            release.wait(5)
+            return 'value'
+
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(single_flight('tests:shared', compute)))
+                   for _ in range(4)]
+        threads[0].start()
+        started.wait(5)
+        for thread in threads[1:]:
+            thread.start()
+        release.set()
+        for thread in threads:
+            thread.join(5)
+        self.assertEqual((results, len(calls)), (['value'] * 4, 1))
+        self.assertEqual(_local_locks, {})
+
+
+@override_settings(CACHES=LOCAL_CACHES)
+class WorkflowTests(TestCase):
+    def test_failed_submission_leaves_nothing_behind(self):
+        student = make_student()
+        self.client.force_login(student.user)
+        data = application_data(SimpleUploadedFile('receipt.pdf', b'%PDF-1.4 receipt'))
+        with mock.patch('exam_portal.workflow.notify_student', side_effect=RuntimeError):
+            with self.assertRaises(RuntimeError):
+                self.client.post(reverse('student_apply_exam'), data)
+        self.assertFalse(ExamApplication.objects.exists())
+        self.assertFalse(ApplicationStatusEvent.objects.exists())
+
+    def test_failed_review_keeps_status_and_event_log(self):
+        application = make_application(status='pending')
+        events = ApplicationStatusEvent.objects.count()
+        form = ApplicationReviewForm({'decision': 'approved', 'comments': ''})
+        self.assertTrue(form.is_valid(), form.errors)
+        with mock.patch('exam_portal.workflow.notify_student', side_effect=RuntimeError):
+            with self.assertRaises(RuntimeError):
+                review_application(application, form, make_officer())
+        application.refresh_from_db()
+        self.assertEqual(application.status, 'pending')
+        self.assertEqual(ApplicationStatusEvent.objects.count(), events)
+
+
+@override_settings(NOTIFICATIONS={'COALESCE_WINDOW': 600})
+class NotificationCoalescingTests(TestCase):
+    def setUp(self):
+        self.application = make_application()
+        self.student = self.application.student
+
+    def notifications(self):
+        # Students also get a welcome notification of their own
+        return Notification.objects.filter(application=self.application)
+
+    def notify(self, title):
+        return notify_student(self.student, title, f'{title} message', application=self.application)
+
+    def test_replacement_discards_pending_email(self):
+        first = self.notify('Submitted')
+        EmailOutbox.objects.create(notification=first, to_email=self.student.email, subject='Sent before',
+                                   body='', status='sent')
+        second = self.notify('Approved')
+
+        self.assertEqual(list(self.notifications()), [second])
+        self.assertEqual(second.update_count, 2)
+        self.assertEqual(second.coalesce_until, first.coalesce_until)
+        pending = EmailOutbox.objects.filter(status='pending', notification__application=self.application)
+        self.assertEqual(list(pending.values_list('subject', 'notification')), [('Approved', second.pk)])
+        # Sent email stays in the history
+        self.assertTrue(EmailOutbox.objects.filter(subject='Sent before', notification=None).exists())
+
+    def test_expired_window_starts_a_new_row(self):
+        first = self.notify('Submitted')
+        Notification.objects.filter(pk=first.pk).update(coalesce_until=timezone.now() - timedelta(seconds=1))
+        second = self.notify('Approved')
+
+        first.refresh_from_db()
+        self.assertIsNone(first.coalesce_key)
+        self.assertEqual((second.coalesce_key, second.update_count),
+                         (coalesce_key(self.student, self.application), 1))
+        self.assertEqual(EmailOutbox.objects.filter(notification__in=[first, second], status='pending').count(), 2)
+
+    def race(self, lost_reads):
+        """Let the first ``lost_reads`` lookups miss a row another writer inserted"""
+        select_for_update = Notification.objects.select_for_update
+        reads = iter(range(lost_reads))
+
+        def read():
+            return Notification.objects.none() if next(reads, None) is not None else select_for_update()
+
+        winner = self.notify('Submitted')
+        return winner, mock.patch.object(Notification.objects, 'select_for_update', side_effect=read)
+
+    def test_writer_losing_the_insert_race_merges_into_the_winner(self):
+        winner, race = self.race(1)
+        with race:
+            loser = self.notify('Approved')
+        self.assertEqual(list(self.notifications()), [loser])
+        self.assertEqual((loser.title, loser.update_count), ('Approved', 2))
+        self.assertFalse(EmailOutbox.objects.filter(notification=winner.pk).exists())
+
+    def test_insert_race_gives_up_after_the_last_attempt(self):
+        winner, race = self.race(COALESCE_ATTEMPTS)
+        with race, self.assertRaises(IntegrityError):
+            self.notify('Approved')
+        self.assertEqual(list(self.notifications()), [winner])
+
+
+@override_settings(CACHES=LOCAL_CACHES)
+class ApiTests(TestCase):
+    def setUp(self):
+        self.lecturer = make_lecturer()
+        self.applications = [make_application(1), make_application(2),
+                             make_application(3, assigned_lecturer=self.lecturer)]
+        self.client.force_login(make_officer().user)
+
+    def get(self, url, etag=None):
+        return self.client.get(url, headers={'if-none-match': etag} if etag else {})
+
+    def ids(self, response):
+        return [row['id'] for row in response.json()['results']]
+
+    def test_unchanged_list_and_detail_are_not_modified(self):
+        for url in (reverse('api_applications'), reverse('api_application', args=['APP00002'])):
+            with self.subTest(url):
+                response = self.get(url)
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(self.get(url, response['ETag']).status_code, 304)
+
+    def test_etags_change_after_update_and_delete(self):
+        list_url, detail_url = reverse('api_applications'), reverse('api_application', args=['APP00002'])
+        list_etag, detail_etag = self.get(list_url)['ETag'], self.get(detail_url)['ETag']
+
+        with self.captureOnCommitCallbacks(execute=True):
+            transition_applications(ExamApplication.objects.filter(application_id='APP00002'), 'approved')
+        response = self.get(detail_url, detail_etag)
+        self.assertEqual((response.status_code, response.json()['status']), (200, 'approved'))
+        response = self.get(list_url, list_etag)
+        self.assertEqual(response.status_code, 200)
+
+        # Deleting the oldest row leaves the latest updated_at as it was
+        list_etag = response['ETag']
+        with self.captureOnCommitCallbacks(execute=True):
+            self.applications[0].delete()
+        response = self.get(list_url, list_etag)
+        self.assertEqual((response.status_code, self.ids(response)), (200, ['APP00003', 'APP00002']))
+
+    def test_cursor_paging(self):
+        response = self.get(reverse('api_applications') + '?limit=2&fields=id,status')
+        self.assertEqual(response.json()['results'], [{'id': 'APP00003', 'status': 'submitted'},
+                                                      {'id': 'APP00002', 'status': 'submitted'}])
+        response = self.get(response.json()['next'])
+        self.assertEqual((self.ids(response), response.json()['next']), (['APP00001'], None))
+
+    def test_students_and_lecturers_see_only_their_rows(self):
+        for user, own, other in ((self.applications[0].student.user, 'APP00001', 'APP00002'),
+                                 (self.lecturer.user, 'APP00003', 'APP00001')):
+            with self.subTest(user.username):
+                self.client.force_login(user)
+                self.assertEqual(self.ids(self.get(reverse('api_applications'))), [own])
+                self.assertEqual(self.get(reverse('api_application', args=[own])).status_code, 200)
+                self.assertEqual(self.get(reverse('api_application', args=[other])).status_code, 404)
@@ -0,0 +1,173 @@
+# ============================================================================
+# uploads.py - Upload Handlers
+# ============================================================================
+#
+# Drop-in replacements for Django's default upload handlers that validate
+# supporting documents while their chunks stream in:
+#   - the type is taken from the magic bytes of the first chunk, not from
+#     the client-supplied content type
+#   - the file is rejected as soon as its running size passes MAX_SIZE, or
+#     MAX_IMAGE_SIZE for images that ingest.py recompresses before storing
+#     (phone photos are often 8-12 MB); the rest of the upload is drained
+#     and discarded rather than stored
+#   - a SHA-256 of the content is computed along the way
+# Results are attached to the UploadedFile as ``upload_error``,
+# ``content_hash`` and ``content_type``, so forms never re-read the file.
+#
+# The handlers are installed per view with @document_uploads, not in
+# FILE_UPLOAD_HANDLERS: a rejected file is emptied, which only views that
+# check ``upload_error`` can tell apart from an empty upload.
+#
+# Configure with settings.DOCUMENT_UPLOADS (merged over DEFAULTS).
+
+import hashlib
+from functools import wraps
+
+from django.core.files.uploadhandler import MemoryFileUploadHandler, TemporaryFileUploadHandler
+from django.views.decorators.csrf import csrf_exempt, csrf_protect
+
+from .ocr import JPEG_MAGIC, PDF_MAGIC, PNG_MAGIC
+
+DEFAULTS = {
+    'MAX_SIZE': 5 * 1024 * 1024,
+    'MAX_IMAGE_SIZE': 16 * 1024 * 1024,
+}
+
+MAGIC_CONTENT_TYPES = (
+    (PDF_MAGIC, 'application/pdf'),
+    (JPEG_MAGIC, 'image/jpeg'),
+    (PNG_MAGIC, 'image/png'),
+)
+
+TYPE_ERROR = 'Only PDF and image files (JPG, PNG) are allowed.'
+
+
+def upload_config():
+    from django.conf import settings
+    return {**DEFAULTS, **getattr(settings, 'DOCUMENT_UPLOADS', {})}
+
+
+def sniff_content_type(header):
+    """Content type from a file's leading bytes, or None if not allowed"""
+    for magic, content_type in MAGIC_CONTENT_TYPES:
+        if header.startswith(magic):
+            return content_type
+    return None
+
+
+def max_upload_size(content_type):
+    """Size cap for an upload of ``content_type``"""
+    from .ingest import recompresses
+
+    config = upload_config()
+    return config['MAX_IMAGE_SIZE'] if recompresses(content_type) else config['MAX_SIZE']
+
+
+def size_error(max_size):
+    return f'File size must not exceed {max_size // (1024 * 1024)}MB.'
+
+
+class DocumentCheckMixin:
+    """Validate and hash each chunk that this handler consumes"""
+
+    def new_file(self, *args, **kwargs):
+        # Set up first: the memory handler's new_file raises
+        # StopFutureHandlers when it takes the file.
+        self.max_size = upload_config()['MAX_SIZE']
+        self.content_hasher = hashlib.sha256()
+        self.detected_type = None
+        self.upload_error = None
+        super().new_file(*args, **kwargs)
+
+    def receive_data_chunk(self, raw_data, start):
+        if self.upload_error is not None:
+            return None
+        remaining = super().receive_data_chunk(raw_data, start)
+        # Anything returned is passed on to the next handler, which checks
+        # it instead.
+        if remaining is not None:
+            return remaining
+
+        if start == 0:
+            self.detected_type = sniff_content_type(raw_data)
+            if self.detected_type is None:
+                self.upload_error = TYPE_ERROR
+            else:
+                self.max_size = max_upload_size(self.detected_type)
+        if self.upload_error is None and start + len(raw_data) > self.max_size:
+            self.upload_error = size_error(self.max_size)
+
+        if self.upload_error is None:
+            self.content_hasher.update(raw_data)
+        else:
+            # Drop what was kept; later chunks are swallowed above
+            self.file.seek(0)
+            self.file.truncate()
+        return None
+
+    def file_complete(self, file_size):
+        uploaded = super().file_complete(file_size)
+        if uploaded is None:
+            return None
+        if self.upload_error is None and self.detected_type is None:
+            self.upload_error = TYPE_ERROR
+        uploaded.upload_error = self.upload_error
+        if self.upload_error is None:
+            uploaded.content_type = self.detected_type
+            uploaded.content_hash = self.content_hasher.hexdigest()
+        return uploaded
+
+
+class DocumentMemoryFileUploadHandler(DocumentCheckMixin, MemoryFileUploadHandler):
+    pass
+
+
+class DocumentTemporaryFileUploadHandler(DocumentCheckMixin, TemporaryFileUploadHandler):
+    pass
+
+
+def document_uploads(view_func):
+    """
+    Stream the view's uploads through the document handlers. The CSRF check
+    reads request.POST, so it is moved inside, after the handlers are set.
+    """
+    protected = csrf_protect(view_func)
+
+    @csrf_exempt
+    @wraps(view_func)
+    def wrapper(request, *args, **kwargs):
+        request.upload_handlers = [
+            DocumentMemoryFileUploadHandler(request),
+            DocumentTemporaryFileUploadHandler(request),
+        ]
+        return protected(request, *args, **kwargs)
+    return wrapper
+
+
+def document_error(uploaded):
+    """Validation message for an uploaded document, or None if acceptable"""
+    if hasattr(uploaded, 'upload_error'):
+        return uploaded.upload_error
+
+    # Not streamed through the handlers above, e.g. built in code
+    uploaded.seek(0)
+    content_type = sniff_content_type(uploaded.read(8))
+    uploaded.seek(0)
+    if content_type is None:
+        return TYPE_ERROR
+    max_size = max_upload_size(content_type)
+    if uploaded.size > max_size:
+        return size_error(max_size)
+    uploaded.content_type = content_type
+    return None
+
+
+def content_hash(uploaded):
+    """SHA-256 of an uploaded file, reusing the digest computed on upload"""
+    digest = getattr(uploaded, 'content_hash', None)
+    if digest is None:
+        hasher = hashlib.sha256()
+        for chunk in uploaded.chunks():
+            hasher.update(chunk)
+        digest = hasher.hexdigest()
+    return digest
@@ -1,6 +1,6 @@
 
 from django.urls import path
-from . import views
+from . import api, streams, views
 
 urlpatterns = [
     # ========================================================================
@@ -17,6 +17,7 @@ urlpatterns = [
     
     # Students Management
     path('admin/students/', views.admin_students_list, name='admin_students_list'),
+    path('admin/students/export/', views.admin_students_export, name='admin_students_export'),
     path('admin/students/create/', views.admin_student_create, name='admin_student_create'),
     path('admin/students/<int:student_id>/edit/', views.admin_student_edit, name='admin_student_edit'),
     path('admin/students/<int:student_id>/delete/', views.admin_student_delete, name='admin_student_delete'),
@@ -31,7 +32,17 @@ urlpatterns = [
     
     # Applications Management
     path('admin/applications/', views.admin_applications_list, name='admin_applications_list'),
+    path('admin/applications/export/', views.admin_applications_export, name='admin_applications_export'),
     path('admin/applications/<str:app_id>/', views.admin_application_detail, name='admin_application_detail'),
+    path('admin/analytics/', views.admin_analytics, name='admin_analytics'),
+    path('admin/stage-latency/', views.admin_stage_latency, name='admin_stage_latency'),
+    path('admin/audit/', views.admin_audit_log, name='admin_audit_log'),
+    path('admin/reports/', views.admin_reports, name='admin_reports'),
+    path('admin/reports/<int:report_id>/status/', views.admin_report_status, name='admin_report_status'),
+    path('admin/reports/<int:report_id>/download/', views.admin_report_download, name='admin_report_download'),
+    
+    # Monitoring
+    path('admin/metrics/', views.admin_metrics, name='admin_metrics'),
     
     # ========================================================================
     # STUDENT URLS
@@ -41,6 +52,8 @@ urlpatterns = [
     path('student/applications/', views.student_applications, name='student_applications'),
     path('student/applications/<str:app_id>/', views.student_application_detail, name='student_application_detail'),
     path('student/notifications/', views.student_notifications, name='student_notifications'),
+    path('student/notifications/stream/', streams.student_notification_stream,
+         name='student_notification_stream'),
     
     # ========================================================================
     # EXAM OFFICER URLS
@@ -56,4 +69,26 @@ urlpatterns = [
     path('lecturer/assignments/', views.lecturer_assignments, name='lecturer_assignments'),
     path('lecturer/assignments/<str:app_id>/mark/', views.lecturer_mark_exam, name='lecturer_mark_exam'),
     path('lecturer/units/', views.lecturer_unit_assignments, name='lecturer_unit_assignments'),
+    
+    # ========================================================================
+    # DOCUMENT URLS
+    # ========================================================================
+    path('documents/<str:app_id>/', views.application_document, name='application_document'),
+    path('documents/<str:app_id>/preview/', views.application_document_preview,
+         {'size': 'preview'}, name='application_document_preview'),
+    path('documents/<str:app_id>/thumbnail/', views.application_document_preview,
+         {'size': 'thumbnail'}, name='application_document_thumbnail'),
+    
+    # ========================================================================
+    # JSON API URLS
+    # ========================================================================
+    path('api/applications/', api.applications, name='api_applications'),
+    path('api/applications/<str:app_id>/', api.application, name='api_application'),
+    path('api/applications/<str:app_id>/review/', api.application_review, name='api_application_review'),
+    path('api/applications/<str:app_id>/marking/', api.application_marking, name='api_application_marking'),
+    path('api/notifications/', api.notifications, name='api_notifications'),
+    path('api/notifications/<int:notification_id>/', api.notification, name='api_notification'),
+    path('api/markings/', api.markings, name='api_markings'),
+    path('api/unit-assignments/', api.unit_assignments, name='api_unit_assignments'),
+    path('api/unit-assignments/<int:assignment_id>/', api.unit_assignment, name='api_unit_assignment'),
 ]
\ No newline at end of file
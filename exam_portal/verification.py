@@ -0,0 +1,234 @@
+# ============================================================================
+# verification.py - Keyword Matching and Auto-Verification Scoring
+# ============================================================================
+#
+# Each exam type has a weighted keyword dictionary (medical terms for
+# special exams, payment terms for retakes, ...). An Aho-Corasick automaton
+# per exam type finds every keyword in one pass over the OCR text; it is
+# built once per process and reused. The score is
+#
+#     keyword_score = min(1, matched weight / TARGET_WEIGHT)
+#     score         = keyword_score * OCR engine confidence
+#
+# and an application is auto-verified when score >= THRESHOLD. The
+# student's registration number and the unit code count as extra keywords.
+#
+# Configure with settings.OCR_VERIFICATION (merged over DEFAULTS). Uses the
+# pyahocorasick C extension when installed, else a pure-Python automaton.
+
+from collections import deque, namedtuple
+
+try:
+    import ahocorasick
+except ImportError:  # pragma: no cover - optional dependency
+    ahocorasick = None
+
+DEFAULTS = {
+    'KEYWORDS': {
+        'special': {
+            'medical': 3, 'hospital': 3, 'doctor': 2, 'clinic': 2, 'patient': 2,
+            'diagnosis': 2, 'admitted': 2, 'sick leave': 3, 'certificate': 1,
+            'death certificate': 3, 'bereavement': 3, 'burial permit': 3,
+            'treatment': 1, 'discharge': 2,
+        },
+        'retake': {
+            'receipt': 3, 'payment': 3, 'amount paid': 3, 'fee': 2, 'fees': 2,
+            'mpesa': 2, 'transaction': 2, 'bank': 1, 'retake': 2, 'invoice': 2,
+        },
+        'resit': {
+            'resit': 3, 'supplementary': 3, 'results': 2, 'transcript': 2,
+            'fail': 1, 'receipt': 2, 'payment': 2, 'approval': 2,
+        },
+    },
+    # Weight of the student's registration number / the unit code if found
+    'REGISTRATION_WEIGHT': 3,
+    'UNIT_CODE_WEIGHT': 2,
+    # Matched weight that earns a full keyword score
+    'TARGET_WEIGHT': 6,
+    'THRESHOLD': 0.6,
+}
+
+Verification = namedtuple('Verification', ['score', 'keywords', 'verified'])
+
+
+def verification_config():
+    from django.conf import settings
+    config = {**DEFAULTS, **getattr(settings, 'OCR_VERIFICATION', {})}
+    config['KEYWORDS'] = {**DEFAULTS['KEYWORDS'], **config['KEYWORDS']}
+    return config
+
+
+def normalize(text):
+    """Lowercase and collapse whitespace so multi-word keywords match"""
+    return ' '.join(text.lower().split())
+
+
+def is_whole_word(text, start, end):
+    """Whether ``text[start:end]`` is not part of a longer word"""
+    return not ((start > 0 and text[start - 1].isalnum()) or (end < len(text) and text[end].isalnum()))
+
+
+def contains_word(text, term):
+    """Whether normalized ``term`` occurs in normalized ``text`` as a whole word"""
+    start = text.find(term)
+    while start != -1:
+        if is_whole_word(text, start, start + len(term)):
+            return True
+        start = text.find(term, start + 1)
+    return False
+
+
+# ============================================================================
+# Aho-Corasick automaton
+# ============================================================================
+
+class KeywordAutomaton:
+    """Finds every occurrence of a fixed keyword set in one pass"""
+
+    def __init__(self, keywords):
+        keywords = sorted({normalize(keyword) for keyword in keywords if keyword.strip()})
+        if ahocorasick is not None:
+            self._automaton = ahocorasick.Automaton()
+            for keyword in keywords:
+                self._automaton.add_word(keyword, keyword)
+            if keywords:
+                self._automaton.make_automaton()
+            self._keywords = keywords
+            return
+
+        self._automaton = None
+        self._goto = [{}]
+        self._fail = [0]
+        self._out = [()]
+        for keyword in keywords:
+            node = 0
+            for char in keyword:
+                next_node = self._goto[node].get(char)
+                if next_node is None:
+                    next_node = len(self._goto)
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._out.append(())
+                    self._goto[node][char] = next_node
+                node = next_node
+            self._out[node] = (keyword,)
+
+        # Breadth-first pass wiring failure links and merged outputs
+        queue = deque(self._goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for char, next_node in self._goto[node].items():
+                queue.append(next_node)
+                fail = self._fail[node]
+                while fail and char not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[next_node] = self._goto[fail].get(char, 0)
+                self._out[next_node] += self._out[self._fail[next_node]]
+
+    def iter(self, text):
+        """Yield ``(end_index, keyword)`` for every match in normalized ``text``"""
+        if self._automaton is not None:
+            if self._keywords:
+                yield from self._automaton.iter(text)
+            return
+
+        goto, fail, out = self._goto, self._fail, self._out
+        node = 0
+        for index, char in enumerate(text):
+            while node and char not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(char, 0)
+            if out[node]:
+                for keyword in out[node]:
+                    yield index, keyword
+
+    def find_words(self, text):
+        """Distinct keywords occurring in ``text`` as whole words"""
+        found = set()
+        for end, keyword in self.iter(text):
+            if keyword not in found and is_whole_word(text, end - len(keyword) + 1, end + 1):
+                found.add(keyword)
+        return found
+
+
+# ============================================================================
+# Scoring
+# ============================================================================
+
+class Verifier:
+    """
+    Scores OCR text against the keyword dictionaries. Picklable, so it can
+    be shipped to worker processes; automata are built lazily per process.
+    """
+
+    def __init__(self, config=None):
+        self.config = config or verification_config()
+        self._automata = {}
+
+    def __getstate__(self):
+        return {'config': self.config, '_automata': {}}
+
+    def automaton(self, exam_type):
+        """``(automaton, weights)`` for an exam type, built on first use"""
+        entry = self._automata.get(exam_type)
+        if entry is None:
+            keywords = self.config['KEYWORDS'].get(exam_type, {})
+            weights = {normalize(keyword): weight for keyword, weight in keywords.items()}
+            entry = self._automata[exam_type] = (KeywordAutomaton(weights), weights)
+        return entry
+
+    def score(self, text, exam_type, confidence=1.0, registration_number=None, unit_code=None):
+        text = normalize(text or '')
+        automaton, weights = self.automaton(exam_type)
+        found = automaton.find_words(text)
+        matched_weight = sum(weights[keyword] for keyword in found)
+        keywords = sorted(found)
+
+        for term, weight in ((registration_number, self.config['REGISTRATION_WEIGHT']),
+                             (unit_code, self.config['UNIT_CODE_WEIGHT'])):
+            if term and contains_word(text, normalize(term)):
+                matched_weight += weight
+                keywords.append(term)
+
+        keyword_score = min(1.0, matched_weight / self.config['TARGET_WEIGHT'])
+        score = round(keyword_score * confidence, 4)
+        return Verification(score, keywords, score >= self.config['THRESHOLD'])
+
+    def score_application(self, application, text, confidence=1.0):
+        return self.score(text, application.exam_type, confidence,
+                          registration_number=application.student.registration_number,
+                          unit_code=application.unit_code)
+
+
+_verifier = None
+
+
+def get_verifier():
+    """Process-wide verifier built from the current settings"""
+    global _verifier
+    if _verifier is None:
+        _verifier = Verifier()
+    return _verifier
+
+
+# ============================================================================
+# Process-pool entry points (bulk re-verification)
+# ============================================================================
+
+_pool_verifier = None
+
+
+def init_pool_verifier(verifier):
+    global _pool_verifier
+    _pool_verifier = verifier
+
+
+def score_rows(rows):
+    """
+    Score ``(key, text, exam_type, confidence, registration_number,
+    unit_code)`` rows; returns ``(key, score, keywords, verified)`` tuples.
+    """
+    return [
+        (key, *_pool_verifier.score(text, exam_type, confidence, registration_number, unit_code))
+        for key, text, exam_type, confidence, registration_number, unit_code in rows
+    ]
@@ -3,18 +3,42 @@
 # ============================================================================
 
 from django.shortcuts import render, redirect, get_object_or_404
+from django.urls import reverse
 from django.contrib.auth import authenticate, login, logout
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
+from django.conf import settings
 from django.db.models import Q, Count
-from django.http import JsonResponse, HttpResponse
+from django.db.models.functions import ExtractMonth
+from django.http import JsonResponse, HttpResponse, Http404
+from django.views.decorators.http import require_safe
 from django.core.paginator import Paginator
 from django.utils import timezone
 from datetime import datetime, timedelta
+import asyncio
 import json
 
+from asgiref.sync import sync_to_async
+
 from .models import *
 from .forms import *
+from .decorators import role_required, role_dashboard_url
+from .cache import get_application_or_404
+from .singleflight import single_flight
+from .overload import with_snapshot, get_search_query, controller as overload_controller
+from . import metrics
+from .serving import serve_document
+from .uploads import document_uploads
+from .exports import EXPORT_FORMATS, export_response
+from .reports import request_report
+from . import analytics
+from .events import stage_latency, update_stage_latency
+from . import audit
+from .workflow import submit_application, review_application, mark_application
+from .querypool import run_queries, gather_queries
+
+# Rows fetched per database round trip when streaming exports
+EXPORT_CHUNK_SIZE = 2000
 
 
 # ============================================================================
@@ -24,7 +48,9 @@ from .forms import *
 def login_view(request):
     """Login view that redirects to appropriate dashboard"""
     if request.user.is_authenticated:
-        return redirect('dashboard_redirect')
+        dashboard = role_dashboard_url(request)
+        if dashboard:
+            return redirect(dashboard)
     
     if request.method == 'POST':
         username = request.POST.get('username')
@@ -35,7 +61,7 @@ def login_view(request):
         if user is not None:
             login(request, user)
             messages.success(request, f'Welcome back, {user.username}!')
-            return redirect('dashboard_redirect')
+            return redirect(role_dashboard_url(request) or 'dashboard_redirect')
         else:
             messages.error(request, 'Invalid username or password.')
     
@@ -45,23 +71,9 @@ def login_view(request):
 @login_required
 def dashboard_redirect(request):
     """Redirect users to their specific dashboard based on user type"""
-    user = request.user
-    
-    # Check if user is superuser/admin
-    if user.is_superuser or user.is_staff:
-        return redirect('admin_dashboard')
-    
-    # Check user profile type
-    try:
-        profile = user.profile
-        if profile.user_type == 'student':
-            return redirect('student_dashboard')
-        elif profile.user_type == 'officer':
-            return redirect('officer_dashboard')
-        elif profile.user_type == 'lecturer':
-            return redirect('lecturer_dashboard')
-    except:
-        pass
+    dashboard = role_dashboard_url(request)
+    if dashboard:
+        return redirect(dashboard)
     
     messages.error(request, 'User profile not found. Please contact administrator.')
     return redirect('login')
@@ -78,61 +90,55 @@ def logout_view(request):
 # ADMIN DASHBOARD & VIEWS
 # ============================================================================
 
-@login_required
-def admin_dashboard(request):
-    """Admin dashboard with system overview"""
-    if not (request.user.is_superuser or request.user.is_staff):
-        messages.error(request, 'Access denied.')
-        return redirect('dashboard_redirect')
-    
-    # Statistics
-    total_students = Student.objects.count()
-    total_officers = ExamOfficer.objects.count()
-    total_lecturers = Lecturer.objects.count()
-    total_applications = ExamApplication.objects.count()
-    
-    # Recent applications
-    recent_applications = ExamApplication.objects.select_related('student').order_by('-submitted_at')[:10]
-    
-    # Applications by status
-    status_stats = ExamApplication.objects.values('status').annotate(count=Count('id'))
-    
-    # Applications by exam type
-    exam_type_stats = ExamApplication.objects.values('exam_type').annotate(count=Count('id'))
-    
+def _admin_dashboard_stats():
+    """Aggregates shown on the admin dashboard, queried concurrently"""
     # Monthly application trends (last 6 months)
     six_months_ago = timezone.now() - timedelta(days=180)
     monthly_apps = ExamApplication.objects.filter(
         submitted_at__gte=six_months_ago
-    ).extra(
-        select={'month': 'EXTRACT(month FROM submitted_at)'}
+    ).annotate(
+        month=ExtractMonth('submitted_at')
     ).values('month').annotate(count=Count('id')).order_by('month')
     
+    return run_queries({
+        'total_students': Student.objects.count,
+        'total_officers': ExamOfficer.objects.count,
+        'total_lecturers': Lecturer.objects.count,
+        'total_applications': ExamApplication.objects.count,
+        # Applications by status
+        'status_stats': lambda: list(ExamApplication.objects.values('status').annotate(count=Count('id'))),
+        # Applications by exam type
+        'exam_type_stats': lambda: list(ExamApplication.objects.values('exam_type').annotate(count=Count('id'))),
+        'monthly_apps': lambda: list(monthly_apps),
+    })
+
+
+@role_required('admin')
+async def admin_dashboard(request):
+    """Admin dashboard with system overview"""
+    stats, recent = await asyncio.gather(
+        sync_to_async(with_snapshot)('admin_dashboard', lambda: single_flight(
+            'admin_dashboard', _admin_dashboard_stats, timeout=settings.DASHBOARD_CACHE_TIMEOUT
+        )),
+        gather_queries({
+            # Recent applications
+            'recent_applications': lambda: list(
+                ExamApplication.objects.select_related('student').order_by('-submitted_at')[:10]
+            ),
+        }),
+    )
+    
     context = {
-        'total_students': total_students,
-        'total_officers': total_officers,
-        'total_lecturers': total_lecturers,
-        'total_applications': total_applications,
-        'recent_applications': recent_applications,
-        'status_stats': status_stats,
-        'exam_type_stats': exam_type_stats,
-        'monthly_apps': monthly_apps,
+        **stats,
+        **recent,
     }
     
-    return render(request, 'admin/dashboard.html', context)
+    return await sync_to_async(render)(request, 'admin/dashboard.html', context)
 
 
-@login_required
-def admin_students_list(request):
-    """Admin view to manage students"""
-    if not (request.user.is_superuser or request.user.is_staff):
-        messages.error(request, 'Access denied.')
-        return redirect('dashboard_redirect')
-    
-    students = Student.objects.all().order_by('-created_at')
-    
-    # Search and filter
-    search_query = request.GET.get('search', '')
+def filter_students(request, students):
+    """Apply the admin students list filters; returns the queryset and filter values"""
+    search_query = get_search_query(request)
     school_filter = request.GET.get('school', '')
     program_filter = request.GET.get('program', '')
     
@@ -150,6 +156,19 @@ def admin_students_list(request):
     if program_filter:
         students = students.filter(program=program_filter)
     
+    filters = {
+        'search_query': search_query,
+        'school_filter': school_filter,
+        'program_filter': program_filter,
+    }
+    return students.order_by('-created_at'), filters
+
+
+@role_required('admin')
+def admin_students_list(request):
+    """Admin view to manage students"""
+    students, filters = filter_students(request, Student.objects.all())
+    
     # Pagination
     paginator = Paginator(students, 20)
     page_number = request.GET.get('page')
@@ -157,9 +176,7 @@ def admin_students_list(request):
     
     context = {
         'students': students_page,
-        'search_query': search_query,
-        'school_filter': school_filter,
-        'program_filter': program_filter,
+        **filters,
         'school_choices': Student.SCHOOL_CHOICES,
         'program_choices': Student.PROGRAM_CHOICES,
     }
@@ -167,17 +184,38 @@ def admin_students_list(request):
     return render(request, 'admin/students_list.html', context)
 
 
-@login_required
+@role_required('admin')
+def admin_students_export(request):
+    """Admin streams the filtered students list as CSV or XLSX"""
+    export_format = request.GET.get('format', 'csv')
+    if export_format not in EXPORT_FORMATS:
+        return HttpResponse('Unsupported export format', status=400)
+    
+    students, _ = filter_students(request, Student.objects.all())
+    schools = dict(Student.SCHOOL_CHOICES)
+    programs = dict(Student.PROGRAM_CHOICES)
+    rows = students.values_list(
+        'registration_number', 'first_name', 'last_name', 'email', 'phone_number',
+        'school', 'program', 'created_at',
+    ).iterator(chunk_size=EXPORT_CHUNK_SIZE)
+    
+    header = ['Registration Number', 'First Name', 'Last Name', 'Email', 'Phone Number',
+              'School', 'Program', 'Created At']
+    rows = (
+        (*row[:5], schools.get(row[5], row[5]), programs.get(row[6], row[6]), row[7])
+        for row in rows
+    )
+    return export_response(request, export_format, 'students', header, rows)
+
+
+@role_required('admin')
 def admin_student_create(request):
     """Admin creates a new student"""
-    if not (request.user.is_superuser or request.user.is_staff):
-        messages.error(request, 'Access denied.')
-        return redirect('dashboard_redirect')
-    
     if request.method == 'POST':
         form = StudentCreationForm(request.POST)
         if form.is_valid():
-            form.save()
+            student = form.save()
+            audit.record('student.create', student)
             messages.success(request, 'Student created successfully!')
             return redirect('admin_students_list')
     else:
@@ -186,19 +224,16 @@ def admin_student_create(request):
     return render(request, 'admin/student_form.html', {'form': form, 'action': 'Create'})
 
 
-@login_required
+@role_required('admin')
 def admin_student_edit(request, student_id):
     """Admin edits student details"""
-    if not (request.user.is_superuser or request.user.is_staff):
-        messages.error(request, 'Access denied.')
-        return redirect('dashboard_redirect')
-    
     student = get_object_or_404(Student, id=student_id)
     
     if request.method == 'POST':
         form = StudentEditForm(request.POST, instance=student)
         if form.is_valid():
             form.save()
+            audit.record('student.edit', student, changes=audit.form_changes(form))
             messages.success(request, 'Student updated successfully!')
             return redirect('admin_students_list')
     else:
@@ -207,16 +242,14 @@ def admin_student_edit(request, student_id):
     return render(request, 'admin/student_form.html', {'form': form, 'action': 'Edit', 'student': student})
 
 
-@login_required
+@role_required('admin')
 def admin_student_delete(request, student_id):
     """Admin deletes a student"""
-    if not (request.user.is_superuser or request.user.is_staff):
-        messages.error(request, 'Access denied.')
-        return redirect('dashboard_redirect')
-    
     student = get_object_or_404(Student, id=student_id)
     
     if request.method == 'POST':
+        audit.record('student.delete', student,
+                     changes={'registration_number': student.registration_number, 'email': student.email})
         student.user.delete()  # This will cascade delete the student
         messages.success(request, 'Student deleted successfully!')
         return redirect('admin_students_list')
@@ -224,17 +257,13 @@ def admin_student_delete(request, student_id):
     return render(request, 'admin/student_confirm_delete.html', {'student': student})
 
 
-@login_required
+@role_required('admin')
 def admin_officers_list(request):
     """Admin view to manage exam officers"""
-    if not (request.user.is_superuser or request.user.is_staff):
-        messages.error(request, 'Access denied.')
-        return redirect('dashboard_redirect')
-    
     officers = ExamOfficer.objects.all().order_by('-created_at')
     
     # Search and filter
-    search_query = request.GET.get('search', '')
+    search_query = get_search_query(request)
     dept_filter = request.GET.get('department', '')
     
     if search_query:
@@ -262,17 +291,14 @@ def admin_officers_list(request):
     return render(request, 'admin/officers_list.html', context)
 
 
-@login_required
+@role_required('admin')
 def admin_officer_create(request):
     """Admin creates a new exam officer"""
-    if not (request.user.is_superuser or request.user.is_staff):
-        messages.error(request, 'Access denied.')
-        return redirect('dashboard_redirect')
-    
     if request.method == 'POST':
         form = OfficerCreationForm(request.POST)
         if form.is_valid():
-            form.save()
+            officer = form.save()
+            audit.record('officer.create', officer)
             messages.success(request, 'Exam Officer created successfully!')
             return redirect('admin_officers_list')
     else:
@@ -281,17 +307,13 @@ def admin_officer_create(request):
     return render(request, 'admin/officer_form.html', {'form': form, 'action': 'Create'})
 
 
-@login_required
+@role_required('admin')
 def admin_lecturers_list(request):
     """Admin view to manage lecturers"""
-    if not (request.user.is_superuser or request.user.is_staff):
-        messages.error(request, 'Access denied.')
-        return redirect('dashboard_redirect')
-    
     lecturers = Lecturer.objects.all().order_by('-created_at')
     
     # Search and filter
-    search_query = request.GET.get('search', '')
+    search_query = get_search_query(request)
     dept_filter = request.GET.get('department', '')
     
     if search_query:
@@ -319,17 +341,14 @@ def admin_lecturers_list(request):
     return render(request, 'admin/lecturers_list.html', context)
 
 
-@login_required
+@role_required('admin')
 def admin_lecturer_create(request):
     """Admin creates a new lecturer"""
-    if not (request.user.is_superuser or request.user.is_staff):
-        messages.error(request, 'Access denied.')
-        return redirect('dashboard_redirect')
-    
     if request.method == 'POST':
         form = LecturerCreationForm(request.POST)
         if form.is_valid():
-            form.save()
+            lecturer = form.save()
+            audit.record('lecturer.create', lecturer)
             messages.success(request, 'Lecturer created successfully!')
             return redirect('admin_lecturers_list')
     else:
@@ -338,19 +357,11 @@ def admin_lecturer_create(request):
     return render(request, 'admin/lecturer_form.html', {'form': form, 'action': 'Create'})
 
 
-@login_required
-def admin_applications_list(request):
-    """Admin view to see all applications"""
-    if not (request.user.is_superuser or request.user.is_staff):
-        messages.error(request, 'Access denied.')
-        return redirect('dashboard_redirect')
-    
-    applications = ExamApplication.objects.select_related('student', 'assigned_lecturer').order_by('-submitted_at')
-    
-    # Filters
+def filter_applications(request, applications):
+    """Apply the admin applications list filters; returns the queryset and filter values"""
     status_filter = request.GET.get('status', '')
     exam_type_filter = request.GET.get('exam_type', '')
-    search_query = request.GET.get('search', '')
+    search_query = get_search_query(request)
     
     if status_filter:
         applications = applications.filter(status=status_filter)
@@ -365,15 +376,28 @@ def admin_applications_list(request):
             Q(unit_code__icontains=search_query)
         )
     
+    filters = {
+        'status_filter': status_filter,
+        'exam_type_filter': exam_type_filter,
+        'search_query': search_query,
+    }
+    return applications.order_by('-submitted_at'), filters
+
+
+@role_required('admin')
+def admin_applications_list(request):
+    """Admin view to see all applications"""
+    applications, filters = filter_applications(
+        request, ExamApplication.objects.select_related('student', 'assigned_lecturer')
+    )
+    
     paginator = Paginator(applications, 25)
     page_number = request.GET.get('page')
     applications_page = paginator.get_page(page_number)
     
     context = {
         'applications': applications_page,
-        'status_filter': status_filter,
-        'exam_type_filter': exam_type_filter,
-        'search_query': search_query,
+        **filters,
         'status_choices': ExamApplication.STATUS_CHOICES,
         'exam_type_choices': ExamApplication.EXAM_TYPE_CHOICES,
     }
@@ -381,17 +405,37 @@ def admin_applications_list(request):
     return render(request, 'admin/applications_list.html', context)
 
 
-@login_required
+@role_required('admin')
+def admin_applications_export(request):
+    """Admin streams the filtered applications list as CSV or XLSX"""
+    export_format = request.GET.get('format', 'csv')
+    if export_format not in EXPORT_FORMATS:
+        return HttpResponse('Unsupported export format', status=400)
+    
+    applications, _ = filter_applications(request, ExamApplication.objects.all())
+    statuses = dict(ExamApplication.STATUS_CHOICES)
+    exam_types = dict(ExamApplication.EXAM_TYPE_CHOICES)
+    # values_list joins student and lecturer in the same query
+    rows = applications.values_list(
+        'application_id', 'student__registration_number', 'student__first_name', 'student__last_name',
+        'exam_type', 'unit_code', 'unit_name', 'year_of_study', 'year_taken', 'semester_taken',
+        'status', 'auto_verified', 'assigned_lecturer__lecturer_id', 'submitted_at', 'updated_at',
+    ).iterator(chunk_size=EXPORT_CHUNK_SIZE)
+    
+    header = ['Application ID', 'Registration Number', 'First Name', 'Last Name', 'Exam Type',
+              'Unit Code', 'Unit Name', 'Year of Study', 'Year Taken', 'Semester Taken',
+              'Status', 'Auto Verified', 'Assigned Lecturer', 'Submitted At', 'Updated At']
+    rows = (
+        (*row[:4], exam_types.get(row[4], row[4]), *row[5:10], statuses.get(row[10], row[10]), *row[11:])
+        for row in rows
+    )
+    return export_response(request, export_format, 'applications', header, rows)
+
+
+@role_required('admin')
 def admin_application_detail(request, app_id):
     """Admin views application details"""
-    if not (request.user.is_superuser or request.user.is_staff):
-        messages.error(request, 'Access denied.')
-        return redirect('dashboard_redirect')
-    
-    application = get_object_or_404(
-        ExamApplication.objects.select_related('student', 'assigned_lecturer'),
-        application_id=app_id
-    )
+    application = get_application_or_404(app_id)
     
     try:
         ocr_result = application.ocr_result
@@ -410,72 +454,173 @@ def admin_application_detail(request, app_id):
         'ocr_result': ocr_result,
         'reviews': reviews,
         'marking': marking,
+        'preview': document_preview(application),
     }
     
     return render(request, 'admin/application_detail.html', context)
 
 
-# ============================================================================
-# STUDENT VIEWS
-# ============================================================================
+@role_required('admin')
+def admin_metrics(request):
+    """Admin view of shared metrics and this worker's load state"""
+    return JsonResponse({
+        'metrics': metrics.snapshot(),
+        'overload': overload_controller.state(),
+    })
 
-@login_required
-def student_dashboard(request):
-    """Student dashboard"""
+
+@require_safe
+@role_required('admin')
+def admin_analytics(request):
+    """Admin cross-tab of applications, cached per filter signature"""
     try:
-        student = request.user.student_profile
-    except:
-        messages.error(request, 'Student profile not found.')
-        return redirect('login')
+        dimensions, filters, percentiles = analytics.parse_query(request.GET)
+    except ValueError as exc:
+        return JsonResponse({'error': str(exc)}, status=400)
+    
+    signature = analytics.query_signature(dimensions, filters, percentiles)
+    result = single_flight(
+        f'analytics:{signature}',
+        lambda: analytics.crosstab(dimensions, filters, percentiles),
+        timeout=analytics.analytics_config()['CACHE_TIMEOUT'],
+    )
+    return JsonResponse(result)
+
+
+@require_safe
+@role_required('admin')
+def admin_stage_latency(request):
+    """Admin view of p50/p90/p99 time-in-status per school, officer and lecturer"""
+    scope = request.GET.get('scope', '')
+    if scope and scope not in dict(StageLatencyBucket.SCOPE_CHOICES):
+        return JsonResponse({'error': 'scope must be school, officer or lecturer'}, status=400)
     
-    # Get applications
-    applications = student.applications.all().order_by('-submitted_at')[:5]
+    # Only events logged since the last call are folded in
+    update_stage_latency()
+    return JsonResponse({'unit': 'seconds', 'latency': stage_latency(scope or None)})
+
+
+@require_safe
+@role_required('admin')
+def admin_audit_log(request):
+    """Admin query of the audit trail by actor, object and time range"""
+    # Include events still buffered in this worker
+    audit.buffer.flush()
+    try:
+        result = audit.query_events(request.GET)
+    except ValueError as exc:
+        return JsonResponse({'error': str(exc)}, status=400)
+    return JsonResponse(result)
+
+
+# ============================================================================
+# REPORT VIEWS
+# ============================================================================
+
+def report_status(report):
+    """JSON-ready status of a report for polling clients"""
+    status = {
+        'id': report.pk,
+        'status': report.status,
+        'attempts': report.attempts,
+        'error': report.error,
+        'application_count': report.application_count,
+        'size': report.size,
+        'created_at': report.created_at.isoformat(),
+        'finished_at': report.finished_at.isoformat() if report.finished_at else None,
+        'status_url': reverse('admin_report_status', args=[report.pk]),
+    }
+    if report.status == 'done':
+        status['download_url'] = reverse('admin_report_download', args=[report.pk])
+    return status
+
+
+@role_required('admin')
+def admin_reports(request):
+    """Admin requests PDF summary reports and lists recent ones"""
+    if request.method == 'POST':
+        form = ReportRequestForm(request.POST)
+        if form.is_valid():
+            report = request_report(form.cleaned_data, request.user)
+            if 'application/json' in request.headers.get('Accept', ''):
+                return JsonResponse(report_status(report), status=200 if report.status == 'done' else 202)
+            if report.status == 'done':
+                return redirect('admin_report_download', report_id=report.pk)
+            messages.info(request, 'Report queued. It will be ready to download here shortly.')
+            return redirect('admin_reports')
+    else:
+        form = ReportRequestForm()
     
-    # Get unread notifications
-    unread_notifications = student.notifications.filter(is_read=False).count()
+    context = {
+        'form': form,
+        'reports': Report.objects.select_related('requested_by')[:50],
+    }
     
-    # Statistics
-    total_applications = student.applications.count()
-    approved_applications = student.applications.filter(status='approved').count()
-    pending_applications = student.applications.filter(status__in=['submitted', 'under_review']).count()
+    return render(request, 'admin/reports.html', context)
+
+
+@require_safe
+@role_required('admin')
+def admin_report_status(request, report_id):
+    """Polling endpoint for a requested report"""
+    report = get_object_or_404(Report, pk=report_id)
+    return JsonResponse(report_status(report))
+
+
+@require_safe
+@role_required('admin')
+def admin_report_download(request, report_id):
+    """Admin downloads a generated report"""
+    report = get_object_or_404(Report, pk=report_id, status='done')
+    filename = (f"report-{report.school}-{report.year_taken}-S{report.semester_taken}-"
+                f"{report.exam_type or 'all'}.pdf")
+    # Artifact names include the data version, so they never change
+    return serve_document(request, report.artifact, etag=report.data_version,
+                          filename=filename, immutable=True)
+
+
+# ============================================================================
+# STUDENT VIEWS
+# ============================================================================
+
+def _student_dashboard_data(student):
+    """A student's dashboard rows and counts, queried concurrently"""
+    return run_queries({
+        # Get applications
+        'applications': lambda: list(student.applications.all().order_by('-submitted_at')[:5]),
+        # Get unread notifications
+        'unread_notifications': student.notifications.filter(is_read=False).count,
+        # Statistics
+        'total_applications': student.applications.count,
+        'approved_applications': student.applications.filter(status='approved').count,
+        'pending_applications': student.applications.filter(status__in=['submitted', 'under_review']).count,
+    })
+
+
+@role_required('student')
+async def student_dashboard(request):
+    """Student dashboard"""
+    student = request.role_profile
     
     context = {
+        **await sync_to_async(with_snapshot)(f'student_dashboard:{student.pk}',
+                                             lambda: _student_dashboard_data(student)),
         'student': student,
-        'applications': applications,
-        'unread_notifications': unread_notifications,
-        'total_applications': total_applications,
-        'approved_applications': approved_applications,
-        'pending_applications': pending_applications,
     }
     
-    return render(request, 'student/dashboard.html', context)
+    return await sync_to_async(render)(request, 'student/dashboard.html', context)
 
 
-@login_required
+@document_uploads
+@role_required('student')
 def student_apply_exam(request):
     """Student submits exam application"""
-    try:
-        student = request.user.student_profile
-    except:
-        messages.error(request, 'Student profile not found.')
-        return redirect('login')
+    student = request.role_profile
     
     if request.method == 'POST':
         form = ExamApplicationForm(request.POST, request.FILES)
         if form.is_valid():
-            application = form.save(commit=False)
-            application.student = student
-            application.save()
-            
-            # Create notification
-            Notification.objects.create(
-                student=student,
-                application=application,
-                notification_type='status_update',
-                title='Application Submitted',
-                message=f'Your exam application {application.application_id} has been submitted successfully.'
-            )
-            
+            application = submit_application(form, student)
             messages.success(request, f'Application {application.application_id} submitted successfully!')
             return redirect('student_applications')
     else:
@@ -484,14 +629,10 @@ def student_apply_exam(request):
     return render(request, 'student/apply_exam.html', {'form': form})
 
 
-@login_required
+@role_required('student')
 def student_applications(request):
     """Student views all their applications"""
-    try:
-        student = request.user.student_profile
-    except:
-        messages.error(request, 'Student profile not found.')
-        return redirect('login')
+    student = request.role_profile
     
     applications = student.applications.all().order_by('-submitted_at')
     
@@ -513,20 +654,12 @@ def student_applications(request):
     return render(request, 'student/applications.html', context)
 
 
-@login_required
+@role_required('student')
 def student_application_detail(request, app_id):
     """Student views application detail"""
-    try:
-        student = request.user.student_profile
-    except:
-        messages.error(request, 'Student profile not found.')
-        return redirect('login')
+    student = request.role_profile
     
-    application = get_object_or_404(
-        ExamApplication.objects.select_related('assigned_lecturer'),
-        application_id=app_id,
-        student=student
-    )
+    application = get_application_or_404(app_id, student_id=student.pk)
     
     try:
         marking = application.marking
@@ -536,26 +669,25 @@ def student_application_detail(request, app_id):
     context = {
         'application': application,
         'marking': marking,
+        'preview': document_preview(application),
     }
     
     return render(request, 'student/application_detail.html', context)
 
 
-@login_required
+@role_required('student')
 def student_notifications(request):
     """Student views notifications"""
-    try:
-        student = request.user.student_profile
-    except:
-        messages.error(request, 'Student profile not found.')
-        return redirect('login')
+    student = request.role_profile
     
     notifications = student.notifications.all().order_by('-created_at')
     
     # Mark as read if requested
     mark_as_read = request.GET.get('mark_read')
     if mark_as_read:
-        notifications.update(is_read=True)
+        count = notifications.filter(is_read=False).update(is_read=True, updated_at=timezone.now())
+        if count:
+            audit.record('notifications.read', student, changes={'count': count})
     
     paginator = Paginator(notifications, 15)
     page_number = request.GET.get('page')
@@ -572,47 +704,48 @@ def student_notifications(request):
 # EXAM OFFICER VIEWS
 # ============================================================================
 
-@login_required
-def officer_dashboard(request):
+def _officer_dashboard_stats():
+    """Application counts shown on the officer dashboard, queried concurrently"""
+    return run_queries({
+        'total_pending': ExamApplication.objects.filter(status='submitted').count,
+        'under_review': ExamApplication.objects.filter(status='under_review').count,
+        'approved_today': ExamApplication.objects.filter(
+            status='approved',
+            updated_at__date=timezone.now().date()
+        ).count,
+    })
+
+
+@role_required('officer')
+async def officer_dashboard(request):
     """Exam officer dashboard"""
-    try:
-        officer = request.user.officer_profile
-    except:
-        messages.error(request, 'Officer profile not found.')
-        return redirect('login')
-    
-    # Get applications for review
-    pending_applications = ExamApplication.objects.filter(
-        status__in=['submitted', 'under_review']
-    ).select_related('student').order_by('-submitted_at')[:10]
-    
-    # Statistics
-    total_pending = ExamApplication.objects.filter(status='submitted').count()
-    under_review = ExamApplication.objects.filter(status='under_review').count()
-    approved_today = ExamApplication.objects.filter(
-        status='approved',
-        updated_at__date=timezone.now().date()
-    ).count()
+    officer = request.role_profile
+    
+    stats, pending = await asyncio.gather(
+        sync_to_async(with_snapshot)('officer_dashboard', lambda: single_flight(
+            'officer_dashboard', _officer_dashboard_stats, timeout=settings.DASHBOARD_CACHE_TIMEOUT
+        )),
+        gather_queries({
+            # Get applications for review
+            'pending_applications': lambda: list(ExamApplication.objects.filter(
+                status__in=['submitted', 'under_review']
+            ).select_related('student').order_by('-submitted_at')[:10]),
+        }),
+    )
     
     context = {
+        **stats,
+        **pending,
         'officer': officer,
-        'pending_applications': pending_applications,
-        'total_pending': total_pending,
-        'under_review': under_review,
-        'approved_today': approved_today,
     }
     
-    return render(request, 'officer/dashboard.html', context)
+    return await sync_to_async(render)(request, 'officer/dashboard.html', context)
 
 
-@login_required
+@role_required('officer')
 def officer_review_applications(request):
     """Officer reviews applications"""
-    try:
-        officer = request.user.officer_profile
-    except:
-        messages.error(request, 'Officer profile not found.')
-        return redirect('login')
+    officer = request.role_profile
     
     applications = ExamApplication.objects.filter(
         status__in=['submitted', 'under_review']
@@ -641,59 +774,17 @@ def officer_review_applications(request):
     return render(request, 'officer/review_applications.html', context)
 
 
-@login_required
+@role_required('officer')
 def officer_application_review(request, app_id):
     """Officer reviews a specific application"""
-    try:
-        officer = request.user.officer_profile
-    except:
-        messages.error(request, 'Officer profile not found.')
-        return redirect('login')
+    officer = request.role_profile
     
-    application = get_object_or_404(
-        ExamApplication.objects.select_related('student'),
-        application_id=app_id
-    )
+    application = get_application_or_404(app_id)
     
     if request.method == 'POST':
         form = ApplicationReviewForm(request.POST)
         if form.is_valid():
-            review = form.save(commit=False)
-            review.application = application
-            review.reviewed_by = officer
-            review.save()
-            
-            # Update application status
-            if review.decision == 'approved':
-                application.status = 'approved'
-                # Find and assign lecturer
-                lecturers = Lecturer.objects.filter(
-                    unit_assignments__unit_code=application.unit_code,
-                    unit_assignments__active=True
-                )
-                if lecturers.exists():
-                    application.assigned_lecturer = lecturers.first()
-                
-                # Create notification
-                Notification.objects.create(
-                    student=application.student,
-                    application=application,
-                    notification_type='status_update',
-                    title='Application Approved',
-                    message=f'Your application {application.application_id} has been approved.'
-                )
-            elif review.decision == 'rejected':
-                application.status = 'rejected'
-                # Create notification
-                Notification.objects.create(
-                    student=application.student,
-                    application=application,
-                    notification_type='officer_message',
-                    title='Application Rejected',
-                    message=f'Your application {application.application_id} has been rejected. Reason: {review.comments}'
-                )
-            
-            application.save()
+            review_application(application, form, officer)
             messages.success(request, 'Review submitted successfully!')
             return redirect('officer_review_applications')
     else:
@@ -708,6 +799,7 @@ def officer_application_review(request, app_id):
         'application': application,
         'form': form,
         'ocr_result': ocr_result,
+        'preview': document_preview(application),
     }
     
     return render(request, 'officer/application_review.html', context)
@@ -717,50 +809,42 @@ def officer_application_review(request, app_id):
 # LECTURER VIEWS
 # ============================================================================
 
-@login_required
-def lecturer_dashboard(request):
+def _lecturer_dashboard_data(lecturer):
+    """A lecturer's dashboard rows and counts, queried concurrently"""
+    return run_queries({
+        # Get assigned applications
+        'assigned_applications': lambda: list(lecturer.assigned_applications.filter(
+            status__in=['approved', 'exam_received']
+        ).select_related('student').order_by('-updated_at')[:10]),
+        # Statistics
+        'total_assigned': lecturer.assigned_applications.count,
+        'pending_marking': lecturer.assigned_applications.filter(
+            status__in=['approved', 'exam_received']
+        ).count,
+        'completed_marking': lecturer.markings.count,
+        # Unit assignments
+        'unit_assignments': lambda: list(lecturer.unit_assignments.filter(active=True)),
+    })
+
+
+@role_required('lecturer')
+async def lecturer_dashboard(request):
     """Lecturer dashboard"""
-    try:
-        lecturer = request.user.lecturer_profile
-    except:
-        messages.error(request, 'Lecturer profile not found.')
-        return redirect('login')
-    
-    # Get assigned applications
-    assigned_applications = lecturer.assigned_applications.filter(
-        status__in=['approved', 'exam_received']
-    ).select_related('student').order_by('-updated_at')[:10]
-    
-    # Statistics
-    total_assigned = lecturer.assigned_applications.count()
-    pending_marking = lecturer.assigned_applications.filter(
-        status__in=['approved', 'exam_received']
-    ).count()
-    completed_marking = lecturer.markings.count()
-    
-    # Unit assignments
-    unit_assignments = lecturer.unit_assignments.filter(active=True)
+    lecturer = request.role_profile
     
     context = {
+        **await sync_to_async(with_snapshot)(f'lecturer_dashboard:{lecturer.pk}',
+                                             lambda: _lecturer_dashboard_data(lecturer)),
         'lecturer': lecturer,
-        'assigned_applications': assigned_applications,
-        'total_assigned': total_assigned,
-        'pending_marking': pending_marking,
-        'completed_marking': completed_marking,
-        'unit_assignments': unit_assignments,
     }
     
-    return render(request, 'lecturer/dashboard.html', context)
+    return await sync_to_async(render)(request, 'lecturer/dashboard.html', context)
 
 
-@login_required
+@role_required('lecturer')
 def lecturer_assignments(request):
     """Lecturer views all assigned applications"""
-    try:
-        lecturer = request.user.lecturer_profile
-    except:
-        messages.error(request, 'Lecturer profile not found.')
-        return redirect('login')
+    lecturer = request.role_profile
     
     applications = lecturer.assigned_applications.select_related('student').order_by('-updated_at')
     
@@ -781,20 +865,12 @@ def lecturer_assignments(request):
     return render(request, 'lecturer/assignments.html', context)
 
 
-@login_required
+@role_required('lecturer')
 def lecturer_mark_exam(request, app_id):
     """Lecturer marks exam"""
-    try:
-        lecturer = request.user.lecturer_profile
-    except:
-        messages.error(request, 'Lecturer profile not found.')
-        return redirect('login')
+    lecturer = request.role_profile
     
-    application = get_object_or_404(
-        ExamApplication.objects.select_related('student'),
-        application_id=app_id,
-        assigned_lecturer=lecturer
-    )
+    application = get_application_or_404(app_id, assigned_lecturer_id=lecturer.pk)
     
     try:
         marking = application.marking
@@ -804,24 +880,7 @@ def lecturer_mark_exam(request, app_id):
     if request.method == 'POST':
         form = ExamMarkingForm(request.POST, instance=marking)
         if form.is_valid():
-            marking = form.save(commit=False)
-            marking.application = application
-            marking.lecturer = lecturer
-            marking.save()
-            
-            # Update application status
-            application.status = 'marking_complete'
-            application.save()
-            
-            # Create notification
-            Notification.objects.create(
-                student=application.student,
-                application=application,
-                notification_type='status_update',
-                title='Marking Complete',
-                message=f'Your exam for {application.unit_code} has been marked.'
-            )
-            
+            mark_application(application, form, lecturer)
             messages.success(request, 'Marks submitted successfully!')
             return redirect('lecturer_assignments')
     else:
@@ -836,14 +895,10 @@ def lecturer_mark_exam(request, app_id):
     return render(request, 'lecturer/mark_exam.html', context)
 
 
-@login_required
+@role_required('lecturer')
 def lecturer_unit_assignments(request):
     """Lecturer manages unit assignments"""
-    try:
-        lecturer = request.user.lecturer_profile
-    except:
-        messages.error(request, 'Lecturer profile not found.')
-        return redirect('login')
+    lecturer = request.role_profile
     
     assignments = lecturer.unit_assignments.all().order_by('-created_at')
     
@@ -851,4 +906,72 @@ def lecturer_unit_assignments(request):
         'assignments': assignments,
     }
     
-    return render(request, 'lecturer/unit_assignments.html', context)
\ No newline at end of file
+    return render(request, 'lecturer/unit_assignments.html', context)
+
+
+# ============================================================================
+# DOCUMENT VIEWS
+# ============================================================================
+
+# Role -> application field that must match the role row
+DOCUMENT_OWNERSHIP = {
+    'student': 'student_id',
+    'lecturer': 'assigned_lecturer_id',
+}
+
+
+def _document_application(request, app_id):
+    """Application whose document the logged in user may see, else 404"""
+    field = DOCUMENT_OWNERSHIP.get(request.role)
+    ownership = {field: request.role_profile.pk} if field else {}
+    return get_application_or_404(app_id, **ownership)
+
+
+def document_preview(application):
+    """Rendered DocumentPreview for an application's document, or None"""
+    if not application.document_hash:
+        return None
+    return DocumentPreview.objects.filter(
+        content_hash=application.document_hash, status='done'
+    ).first()
+
+
+@require_safe
+@role_required('admin', 'officer', 'student', 'lecturer')
+def application_document(request, app_id):
+    """Serve an application's supporting document to users who may see it"""
+    application = _document_application(request, app_id)
+    
+    document = application.supporting_document
+    if not document:
+        raise Http404('No supporting document')
+    
+    extension = document.name.rsplit('.', 1)[-1] if '.' in document.name else 'bin'
+    return serve_document(
+        request,
+        document,
+        etag=application.document_hash or None,
+        filename=f'{application.application_id}.{extension}',
+        # Content-addressed files never change under the same name
+        immutable=document.storage.is_content_addressed(document.name),
+    )
+
+
+@require_safe
+@role_required('admin', 'officer', 'student', 'lecturer')
+def application_document_preview(request, app_id, size):
+    """Serve the rendered preview or thumbnail of an application's document"""
+    application = _document_application(request, app_id)
+    
+    preview = document_preview(application)
+    if preview is None:
+        raise Http404('No preview available')
+    
+    image = preview.thumbnail if size == 'thumbnail' else preview.preview
+    return serve_document(
+        request,
+        image,
+        etag=f'{preview.content_hash}-{size}',
+        filename=f'{application.application_id}-{size}.{image.name.rsplit(".", 1)[-1]}',
+        immutable=True,
+    )
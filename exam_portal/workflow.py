@@ -0,0 +1,128 @@
+# ============================================================================
+# workflow.py - Application Submission, Review and Marking Steps
+# ============================================================================
+#
+# The write side of the application lifecycle, shared by the HTML views and
+# the JSON API (api.py) so both notify, audit and enqueue the same way.
+# Each step takes a validated form and returns the saved object.
+# Students are notified through notify_student (notifications.py), which
+# coalesces bursts per application and queues the email (outbox.py).
+#
+# Every step runs in one transaction, so the application's UPDATE, the
+# status event logged by its post_save signal (models.py), the audit entry
+# and the notification with its queued email commit or roll back together.
+# Applications handed in by views usually come from the application cache
+# (cache.py). Steps that change one re-read it locked and save only the
+# fields they set, so a stale copy never reverts another writer's changes.
+
+from django.db import transaction
+
+from . import audit
+from .ingest import ingest_document
+from .models import ExamApplication, Lecturer
+from .notifications import notify_student
+from .ocr import enqueue_ocr
+from .previews import enqueue_preview
+
+
+def submit_application(form, student):
+    """Save a valid ExamApplicationForm as a new application of ``student``"""
+    application = form.save(commit=False)
+    application.student = student
+    # Images are recompressed and stripped of EXIF before storage
+    application.supporting_document, application.document_hash = ingest_document(
+        form.cleaned_data['supporting_document']
+    )
+    with transaction.atomic():
+        return _submit(application, student)
+
+
+def _submit(application, student):
+    application.save()
+    audit.record('application.create', application)
+
+    # OCR and previews run off the request path (run_ocr_workers,
+    # run_preview_workers)
+    enqueue_ocr(application)
+    enqueue_preview(application)
+
+    notify_student(
+        student,
+        'Application Submitted',
+        f'Your exam application {application.application_id} has been submitted successfully.',
+        application=application,
+    )
+    return application
+
+
+def _locked(application):
+    return ExamApplication.objects.select_for_update().get(pk=application.pk)
+
+
+def review_application(application, form, officer):
+    """Record a valid ApplicationReviewForm and apply its decision"""
+    with transaction.atomic():
+        return _review(_locked(application), form, officer)
+
+
+def _review(application, form, officer):
+    review = form.save(commit=False)
+    review.application = application
+    review.reviewed_by = officer
+    review.save()
+    audit.record('application.review', review,
+                 changes={'decision': review.decision, 'comments': review.comments})
+
+    if review.decision == 'approved':
+        application.status = 'approved'
+        # Find and assign lecturer
+        lecturers = Lecturer.objects.filter(
+            unit_assignments__unit_code=application.unit_code,
+            unit_assignments__active=True
+        )
+        if lecturers.exists():
+            application.assigned_lecturer = lecturers.first()
+
+        notify_student(
+            application.student,
+            'Application Approved',
+            f'Your application {application.application_id} has been approved.',
+            application=application,
+        )
+    elif review.decision == 'rejected':
+        application.status = 'rejected'
+        notify_student(
+            application.student,
+            'Application Rejected',
+            f'Your application {application.application_id} has been rejected. Reason: {review.comments}',
+            notification_type='officer_message',
+            application=application,
+        )
+
+    application.save(update_fields=['status', 'assigned_lecturer', 'status_changed_at', 'updated_at'])
+    return review
+
+
+def mark_application(application, form, lecturer):
+    """Save a valid ExamMarkingForm and complete the application's marking"""
+    with transaction.atomic():
+        return _mark(_locked(application), form, lecturer)
+
+
+def _mark(application, form, lecturer):
+    marking = form.save(commit=False)
+    marking.application = application
+    marking.lecturer = lecturer
+    marking.save()
+    audit.record('application.mark', marking, changes=audit.form_changes(form))
+
+    application.status = 'marking_complete'
+    application.save(update_fields=['status', 'status_changed_at', 'updated_at'])
+
+    notify_student(
+        application.student,
+        'Marking Complete',
+        f'Your exam for {application.unit_code} has been marked.',
+        application=application,
+    )
+    return marking
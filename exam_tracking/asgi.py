@@ -13,4 +13,10 @@ from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'exam_tracking.settings')
 
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+# Imported once Django is set up. Serves the notification stream without
+# holding a thread per connection (exam_portal/streams.py)
+from exam_portal.streams import NotificationStreamApp  # noqa: E402
+
+application = NotificationStreamApp(django_application)
@@ -31,10 +31,13 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'exam_portal.overload.OverloadMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'exam_portal.events.StatusActorMiddleware',
+    'exam_portal.audit.AuditMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -59,17 +62,103 @@ TEMPLATES = [
 WSGI_APPLICATION = 'exam_tracking.wsgi.application'
 
 
+# Authentication
+# The backend joins the profile and role row onto the session user
+
+AUTHENTICATION_BACKENDS = [
+    'exam_portal.backends.RoleAwareModelBackend',
+]
+
+LOGIN_URL = 'login'
+
+
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
+# Transactions take SQLite's write lock up front: a transaction that reads
+# and then writes (queue claims, notification coalescing) waits up to
+# 'timeout' seconds for other writers instead of failing with "database is
+# locked"
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        'OPTIONS': {
+            'transaction_mode': 'IMMEDIATE',
+            'timeout': 20,
+        },
     }
 }
 
 
+# Cache
+# 'shared' is a WAL-mode SQLite file (exam_portal/sqlite_cache.py) that every
+# worker process on the node reads and writes, with LRU eviction past
+# MAX_ENTRIES / MAX_SIZE. It backs the read-through application cache
+# (exam_portal/cache.py). 'default' stays a per-process LocMemCache.
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'shared': {
+        'BACKEND': 'exam_portal.sqlite_cache.SQLiteCache',
+        'LOCATION': BASE_DIR / 'var' / 'cache.sqlite3',
+        'TIMEOUT': 300,
+        'OPTIONS': {
+            'MAX_ENTRIES': 20000,
+            'MAX_SIZE': 64 * 1024 * 1024,
+        },
+    },
+}
+
+APPLICATION_CACHE_ALIAS = 'shared'
+
+# Cold-cache recomputation of expensive aggregates is coalesced through a
+# lock in this cache (exam_portal/singleflight.py)
+SINGLE_FLIGHT_CACHE_ALIAS = 'shared'
+
+# Seconds dashboard aggregates stay cached
+DASHBOARD_CACHE_TIMEOUT = 30
+
+# Dashboard aggregates run concurrently on MAX_WORKERS threads per process,
+# each holding its own database connection (exam_portal/querypool.py).
+# 0 runs them one after another.
+QUERY_POOL = {
+    'MAX_WORKERS': 4,
+}
+
+# Shared counters and gauges (exam_portal/metrics.py), served at admin/metrics/
+METRICS_CACHE_ALIAS = 'shared'
+
+
+# Load shedding (exam_portal/overload.py)
+# A worker is overloaded past MAX_IN_FLIGHT concurrent requests or an average
+# DB query latency of DB_LATENCY_MS, and recovers below RECOVERY_RATIO of both.
+
+OVERLOAD = {
+    'MAX_IN_FLIGHT': 32,
+    'DB_LATENCY_MS': 250,
+    'RECOVERY_RATIO': 0.5,
+    'RETRY_AFTER': 30,
+    'SNAPSHOT_REFRESH': 30,
+    # Non-critical admin pages answered with 503 while overloaded
+    'SHED_VIEWS': [
+        'admin_students_list',
+        'admin_officers_list',
+        'admin_lecturers_list',
+        'admin_applications_list',
+        'admin_application_detail',
+        'admin_students_export',
+        'admin_applications_export',
+        'admin_analytics',
+        'admin_audit_log',
+    ],
+    # Never shed
+    'PRIORITY_VIEWS': ['student_apply_exam', 'lecturer_mark_exam'],
+}
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 
@@ -110,6 +199,108 @@ STATICFILES_DIRS= [
 ]
 
 MEDIA_URL = '/media/'
+MEDIA_ROOT = BASE_DIR / 'media'
+
+# OCR auto-verification (exam_portal/verification.py). KEYWORDS maps an
+# exam type to {keyword: weight} and replaces that type's default dictionary.
+OCR_VERIFICATION = {
+    'TARGET_WEIGHT': 6,
+    'THRESHOLD': 0.6,
+}
+
+# Supporting documents are type-checked by magic bytes, size-limited and
+# SHA-256 hashed while they stream in (exam_portal/uploads.py)
+DOCUMENT_UPLOADS = {
+    'MAX_SIZE': 5 * 1024 * 1024,
+    # Images are recompressed before storage (DOCUMENT_INGEST)
+    'MAX_IMAGE_SIZE': 16 * 1024 * 1024,
+}
+
+# Supporting documents are stored once per content hash under
+# MEDIA_ROOT/<PREFIX>/ab/cd/ (exam_portal/storage.py)
+DOCUMENT_STORAGE = {
+    'PREFIX': 'cas',
+    'SHARD_DEPTH': 2,
+    'SHARD_WIDTH': 2,
+    # pack_documents archives old documents here; point it at cold storage
+    'ARCHIVE_ROOT': BASE_DIR / 'var' / 'archive',
+}
+
+# Uploaded images are recompressed before storage (exam_portal/ingest.py).
+# Set KEEP_ORIGINALS to also keep untouched originals under ORIGINALS_ROOT.
+DOCUMENT_INGEST = {
+    'RECOMPRESS_IMAGES': True,
+    'MAX_DPI': 200,
+    'QUALITY': 80,
+    'KEEP_ORIGINALS': False,
+    'ORIGINALS_ROOT': BASE_DIR / 'var' / 'originals',
+}
+
+# First-page previews rendered by run_preview_workers (exam_portal/previews.py)
+DOCUMENT_PREVIEWS = {
+    'PREVIEW_SIZE': 1024,
+    'THUMBNAIL_SIZE': 200,
+    'QUALITY': 75,
+}
+
+# Documents are only served through the access-checked application_document
+# view (exam_portal/serving.py). Behind nginx use 'x-accel-redirect' with an
+# ``internal`` location at INTERNAL_URL aliased to MEDIA_ROOT; behind Apache
+# with mod_xsendfile use 'x-sendfile'. Never expose MEDIA_ROOT at MEDIA_URL.
+DOCUMENT_SERVING = {
+    'BACKEND': 'django',
+    'INTERNAL_URL': '/protected-media/',
+    'MAX_AGE': 7 * 24 * 60 * 60,
+}
+
+# Cross-tab analytics served at admin/analytics/ (exam_portal/analytics.py);
+# NumPy is used when installed
+ANALYTICS = {
+    'CACHE_TIMEOUT': 300,
+    'PERCENTILES': [50, 90],
+}
+
+# PDF summary reports rendered by run_report_workers (exam_portal/reports.py)
+REPORTS = {
+    'PREFIX': 'reports',
+}
+
+# Audit trail (exam_portal/audit.py), queried at admin/audit/. Each worker
+# buffers events and bulk-inserts them every FLUSH_SIZE events or
+# FLUSH_INTERVAL seconds; while the database is down they are appended to
+# FALLBACK_PATH for replay_audit_log.
+AUDIT = {
+    'FLUSH_SIZE': 200,
+    'FLUSH_INTERVAL': 5,
+    'FALLBACK_PATH': BASE_DIR / 'var' / 'audit-fallback.jsonl',
+}
+
+# Within COALESCE_WINDOW seconds of an application's first notification,
+# later ones for the same student and application replace it
+# (exam_portal/notifications.py). 0 keeps every notification.
+NOTIFICATIONS = {
+    'COALESCE_WINDOW': 600,
+}
+
+# Email (exam_portal/outbox.py). Notifications queue their email in the
+# outbox and run_email_workers delivers it through EMAIL_BACKEND. Messages
+# are written to var/emails/ until an SMTP server is configured (README).
+EMAIL_BACKEND = 'django.core.mail.backends.filebased.EmailBackend'
+EMAIL_FILE_PATH = BASE_DIR / 'var' / 'emails'
+DEFAULT_FROM_EMAIL = 'Exam Tracking System <noreply@exam-tracking.local>'
+
+EMAIL_OUTBOX = {
+    'DIGEST_DELAY': 60,
+    'RETRY_BACKOFF': 30,
+}
+
+# Server-Sent Events at student/notifications/stream/ (exam_portal/streams.py),
+# served by the ASGI application. One poller per process checks for new
+# notifications and status events every POLL_INTERVAL seconds.
+NOTIFICATION_STREAM = {
+    'POLL_INTERVAL': 1.0,
+    'HEARTBEAT': 20,
+}
 
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
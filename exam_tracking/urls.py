@@ -3,6 +3,8 @@ from django.contrib import admin
 from django.urls import path, include
 
 urlpatterns = [
-    path('admin/', admin.site.urls),
+    # Portal URLs first: Django admin's catch-all would otherwise swallow
+    # the portal's own admin/... pages
     path('', include("exam_portal.urls")),
+    path('admin/', admin.site.urls),
 ]